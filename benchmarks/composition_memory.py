@@ -0,0 +1,98 @@
+"""
+Benchmark peak memory used to compose page from rendered components.
+
+Page displays many keyed components, each rendering large html fragment,
+so that composed page is about ``--size`` megabytes. Benchmark measures
+time and peak memory traced by ``tracemalloc`` while ``build_response``
+composes the page, after all components are rendered. Memory allocated
+by lxml for parsed trees is not traced by ``tracemalloc``, so measured
+peak shows html strings and response kept in memory during composition.
+
+Usage:
+
+    $ python benchmarks/composition_memory.py --size 5 --components 500
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from flask import Flask
+from jembe import Jembe, Component
+from jembe.app import get_processor
+
+
+def create_app(no_of_components: int, fragment_size: int) -> Flask:
+    app = Flask(__name__)
+    app.secret_key = "benchmark"
+    jmb = Jembe(app)
+
+    row = "<li>{}</li>".format("x" * 90)
+    rows = row * max(1, fragment_size // len(row))
+
+    class Item(Component):
+        def display(self) -> "jembe.DisplayResponse":
+            # plain string so that benchmark is not dominated by jinja2
+            return "<ul>{}</ul>".format(rows)
+
+    @jmb.page("page", Component.Config(components=dict(item=Item)))
+    class Page(Component):
+        def __init__(self, size: int = no_of_components):
+            super().__init__()
+
+        def display(self) -> "jembe.DisplayResponse":
+            return self.render_template_string(
+                "<html><body>"
+                "{% for i in range(size) %}{{component('item').key(i)}}{% endfor %}"
+                "</body></html>"
+            )
+
+    return app
+
+
+def compose(app: Flask):
+    with app.test_request_context("/page"):
+        processor = get_processor().process_request()
+        rendered = sum(len(r.html or "") for r in processor.renderers.values())
+        tracemalloc.reset_peak()
+        memory_start = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        response = processor.build_response()
+        duration = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - memory_start
+    return rendered, len(response), duration, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=float, default=5, help="page size in MB")
+    parser.add_argument("--components", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fragment_size = int(args.size * 1024 * 1024 / args.components)
+    app = create_app(args.components, fragment_size)
+    tracemalloc.start()
+    compose(app)
+    durations, peaks = [], []
+    for _ in range(args.repeat):
+        rendered, response_size, duration, peak = compose(app)
+        durations.append(duration)
+        peaks.append(peak)
+    tracemalloc.stop()
+
+    print(
+        "components={} rendered={:.2f}MB response={:.2f}MB "
+        "compose median={:.3f}s peak memory median={:.2f}MB ({:.2f}x page)".format(
+            args.components,
+            rendered / 1024 / 1024,
+            response_size / 1024 / 1024,
+            statistics.median(durations),
+            statistics.median(peaks) / 1024 / 1024,
+            statistics.median(peaks) / response_size,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
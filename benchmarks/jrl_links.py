@@ -0,0 +1,81 @@
+"""
+Benchmark generating JRL links in component template.
+
+Page template ``templates/jrl_links.html`` renders two JRL links to
+keyed subcomponent for every row and JRL links calling page action for
+pagination. With default parameters page contains 2000 links.
+
+Usage:
+
+    $ python benchmarks/jrl_links.py --rows 990 --pages 20 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import List
+
+from flask import Flask
+from jembe import Jembe, Component, action
+
+
+def create_app(rows: int, pages: int) -> Flask:
+    app = Flask(
+        __name__,
+        template_folder=os.path.join(os.path.dirname(__file__), "templates"),
+    )
+    app.secret_key = "benchmark"
+    jmb = Jembe(app)
+
+    class Item(Component):
+        def __init__(self, id: int = 0, mode: str = "view", tags: List[str] = []):
+            super().__init__()
+
+        def display(self) -> "jembe.DisplayResponse":
+            return "<div>{}</div>".format(self.state.id)
+
+    @jmb.page(
+        "page",
+        Component.Config(template="jrl_links.html", components=dict(item=Item)),
+    )
+    class Page(Component):
+        def __init__(self, size: int = rows, pages: int = pages, page: int = 0):
+            super().__init__()
+
+        @action
+        def goto(self, page: int):
+            self.state.page = page
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=990)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(args.rows, args.pages)
+    client = app.test_client()
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        r = client.get("/page")
+        timings.append(time.perf_counter() - start)
+        assert r.status_code == 200
+        assert r.data.count(b"$jmb.") == 2 * args.rows + args.pages
+
+    print(
+        "jrl_links links={} repeat={} min={:.3f}s median={:.3f}s".format(
+            2 * args.rows + args.pages,
+            args.repeat,
+            min(timings),
+            statistics.median(timings),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark application startup and url matching with and without
+``JEMBE_COMPONENT_ROUTER`` and ``JEMBE_LAZY_COMPONENTS``.
+
+Page has many child components, each with its own url params. Benchmark
+measures time to register the page and build the url map, and time to
+match urls of all components against it.
+
+Usage:
+
+    $ python benchmarks/router.py --components 500 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+from flask import Flask
+from jembe import Jembe, Component
+
+
+def create_app(no_of_components: int, router: bool, lazy: bool) -> Flask:
+    app = Flask(__name__)
+    app.config["JEMBE_COMPONENT_ROUTER"] = router
+    app.config["JEMBE_LAZY_COMPONENTS"] = lazy
+    jmb = Jembe(app)
+
+    class Item(Component):
+        def __init__(self, id: int, name: str = "item"):
+            super().__init__()
+
+    jmb.add_page(
+        "page",
+        Component,
+        Component.Config(
+            components={"item{}".format(i): Item for i in range(no_of_components)}
+        ),
+    )
+    # force werkzeug to compile url map
+    app.url_map.bind("localhost").match("/page")
+    return app
+
+
+def match_all(app: Flask, no_of_components: int):
+    jmb = app.extensions["jembe"].jembe
+    for i in range(no_of_components):
+        url = "/page.k/item{}.k/{}".format(i, i)
+        with app.test_request_context(url):
+            assert jmb.get_component_full_name() == "/page/item{}".format(i)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--components", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for router, lazy in ((False, False), (True, False), (True, True)):
+        startup, matching = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            app = create_app(args.components, router, lazy)
+            startup.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            match_all(app, args.components)
+            matching.append(time.perf_counter() - start)
+
+        print(
+            "router={} lazy={} components={} startup median={:.3f}s "
+            "match median={:.3f}s".format(
+                router,
+                lazy,
+                args.components,
+                statistics.median(startup),
+                statistics.median(matching),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
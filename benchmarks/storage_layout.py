@@ -0,0 +1,95 @@
+"""
+Benchmark store and exists throughput of flat and sharded DiskStorage.
+
+Stores ``--files`` empty files into one subdir of a flat DiskStorage and of
+a DiskStorage with ``--shard-levels`` hash prefix dirs, then measures
+``exists`` of random stored and missing files (missing files are probed
+by ``_get_unique_filename`` for every stored file). Files are created in
+``--dir`` (temporary dir by default), which needs free inodes for twice
+the number of files. With default 1M files benchmark runs for minutes.
+
+Usage:
+
+    $ python benchmarks/storage_layout.py --files 1000000 --shard-levels 2
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from io import BytesIO
+
+from jembe import DiskStorage
+
+
+def bench_layout(folder: str, files: int, shard_levels: int, probes: int):
+    storage = DiskStorage("bench", folder, shard_levels=shard_levels)
+    names = ["file{}.txt".format(i) for i in range(files)]
+    empty = BytesIO(b"")
+
+    start = time.perf_counter()
+    for i, name in enumerate(names):
+        storage.store_file(empty, "files", name)
+        if (i + 1) % 100000 == 0:
+            print("  stored {} files".format(i + 1), flush=True)
+    store_duration = time.perf_counter() - start
+
+    sample = [
+        "files/{}".format(name) for name in random.sample(names, min(probes, files))
+    ]
+    missing = ["files/missing{}.txt".format(i) for i in range(len(sample))]
+    start = time.perf_counter()
+    for path in sample:
+        storage.exists(path)
+    for path in missing:
+        storage.exists(path)
+    exists_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    listed = len(storage.listdir("files"))
+    listdir_duration = time.perf_counter() - start
+    assert listed == files
+
+    return dict(
+        store=files / store_duration,
+        exists=(len(sample) + len(missing)) / exists_duration,
+        listdir=listdir_duration,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=1000000)
+    parser.add_argument("--shard-levels", type=int, default=2)
+    parser.add_argument("--probes", type=int, default=100000)
+    parser.add_argument("--dir", help="directory in which storages are created")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="jembe-storage-", dir=args.dir)
+    try:
+        for shard_levels in (0, args.shard_levels):
+            print("shard_levels={}".format(shard_levels), flush=True)
+            result = bench_layout(
+                os.path.join(root, str(shard_levels)),
+                args.files,
+                shard_levels,
+                args.probes,
+            )
+            print(
+                "shard_levels={} files={} store={:.0f} files/s "
+                "exists={:.0f} calls/s listdir={:.2f}s".format(
+                    shard_levels,
+                    args.files,
+                    result["store"],
+                    result["exists"],
+                    result["listdir"],
+                ),
+                flush=True,
+            )
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
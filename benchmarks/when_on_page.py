@@ -0,0 +1,105 @@
+"""
+Benchmark redisplaying of components with ``RedisplayFlag.WHEN_ON_PAGE``.
+
+Page displays many keyed components that must be redisplayed whenever
+they are on the page. Benchmark measures x-jembe request that calls
+action on the page component without redisplaying it, so that all
+components are checked and redisplayed by the processor after the
+action is executed.
+
+Usage:
+
+    $ python benchmarks/when_on_page.py --components 1000 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+from flask import Flask, json
+from jembe import Jembe, Component, action, redisplay
+
+
+def create_app(no_of_components: int) -> Flask:
+    app = Flask(__name__)
+    app.secret_key = "benchmark"
+    jmb = Jembe(app)
+
+    class Item(Component):
+        def __init__(self, value: int = 0):
+            super().__init__()
+
+        @redisplay(when_on_page=True)
+        def display(self) -> "jembe.DisplayResponse":
+            # plain string so that benchmark is not dominated by jinja2
+            return "<div>{}: {}</div>".format(self.key, self.state.value)
+
+    @jmb.page("page", Component.Config(components=dict(item=Item)))
+    class Page(Component):
+        def __init__(self, size: int = no_of_components):
+            super().__init__()
+
+        @action
+        def refresh(self):
+            return False
+
+        def display(self) -> "jembe.DisplayResponse":
+            return self.render_template_string(
+                "<html><body>"
+                "{% for i in range(size) %}{{component('item').key(i)}}{% endfor %}"
+                "</body></html>"
+            )
+
+    return app
+
+
+def x_jembe_data(no_of_components: int) -> str:
+    return json.dumps(
+        dict(
+            components=[dict(execName="/page", state=dict(size=no_of_components))]
+            + [
+                dict(execName="/page/item.{}".format(i), state=dict(value=0))
+                for i in range(no_of_components)
+            ],
+            commands=[
+                dict(
+                    type="call",
+                    componentExecName="/page",
+                    actionName="refresh",
+                    args=list(),
+                    kwargs=dict(),
+                )
+            ],
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--components", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(args.components)
+    client = app.test_client()
+    data = x_jembe_data(args.components)
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        r = client.post("/page", data=data, headers={"x-jembe": True})
+        timings.append(time.perf_counter() - start)
+        assert r.status_code == 200
+        assert len(json.loads(r.data)) == args.components
+
+    print(
+        "when_on_page components={} repeat={} min={:.3f}s median={:.3f}s".format(
+            args.components,
+            args.repeat,
+            min(timings),
+            statistics.median(timings),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
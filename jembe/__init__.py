@@ -25,7 +25,7 @@ from .exceptions import (
     InternalServerError,
     JembeError
 )
-from .files import File, Storage, DiskStorage
+from .files import File, Storage, DiskStorage, DedupDiskStorage
 from .utils import page_url, run_only_once, call_window_open
 
 __all__ = (
@@ -64,6 +64,7 @@ __all__ = (
     "File",
     "Storage",
     "DiskStorage",
+    "DedupDiskStorage",
     "page_url",
     "run_only_once",
     "call_window_open",
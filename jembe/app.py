@@ -1,16 +1,62 @@
-from typing import Sequence, TYPE_CHECKING, Optional, Tuple, Type, List, Dict, Any
-from os import path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    TYPE_CHECKING,
+    Tuple,
+    Type,
+    Union,
+)
+import gc
+import tracemalloc
+from os import makedirs, path
+from threading import Lock
+from time import perf_counter
 from .defaults import (
+    DEFAULT_JEMBE_CACHE_VERSION_LOCK_TIMEOUT,
+    DEFAULT_JEMBE_CACHE_VERSION_WORKERS,
+    DEFAULT_JEMBE_COMPONENT_ROUTER,
+    DEFAULT_JEMBE_LAZY_COMPONENTS,
     DEFAULT_JEMBE_MEDIA_FOLDER,
+    DEFAULT_JEMBE_MEMORY_PROFILE,
+    DEFAULT_JEMBE_METRICS,
+    DEFAULT_JEMBE_METRICS_ACCESS,
+    DEFAULT_JEMBE_PUBLIC_FILES_MAX_AGE,
+    DEFAULT_JEMBE_REQUEST_RECORDER,
+    DEFAULT_JEMBE_REQUEST_RECORDER_BACKUP_COUNT,
+    DEFAULT_JEMBE_REQUEST_RECORDER_MAX_BYTES,
+    DEFAULT_JEMBE_REQUEST_RECORDER_REDACT,
+    DEFAULT_JEMBE_SLOW_REQUEST_THRESHOLD,
+    DEFAULT_JEMBE_TEMP_CLEANUP_INTERVAL,
+    DEFAULT_JEMBE_TEMPLATE_BYTECODE_CACHE,
+    DEFAULT_JEMBE_UPLOAD_ALLOWED_CONTENT_TYPES,
+    DEFAULT_JEMBE_UPLOAD_ALLOWED_EXTENSIONS,
+    DEFAULT_JEMBE_UPLOAD_MAX_FILE_SIZE,
+    DEFAULT_JEMBE_UPLOAD_MAX_REQUEST_SIZE,
     PRIVATE_STORAGE_NAME,
     PUBLIC_STORAGE_NAME,
     TEMP_STORAGE_NAME,
 )
-from flask import Blueprint, request
+from flask import Blueprint, request, url_for
+from jinja2 import FileSystemBytecodeCache, TemplateNotFound
 from .processor import Processor
-from .exceptions import JembeError
+from .metrics import Metrics, process_profiled_request
+from .recorder import RequestRecorder
+from .cleanup import TempStorageSweeper
+from .cache_versions import CacheVersions
+from .router import ComponentRouter
+from .exceptions import JembeError, NotFound
 from flask import g, current_app
-from .common import ComponentRef, exec_name_to_full_name, import_by_name
+from .common import (
+    ComponentRef,
+    exec_name_to_full_name,
+    import_by_name,
+    process_memory_usage,
+)
 
 
 if TYPE_CHECKING:  # pragma: no cover
@@ -95,6 +141,24 @@ class Jembe:
 
             .. warning:: When You manually define storages, you must define all storages used by your application including at least one temporary storage.
 
+        router:
+            Optional ``ComponentRouter`` used when ``JEMBE_COMPONENT_ROUTER`` Flask
+            config variable is set to ``True``.
+
+            Instead of one url rule per component, every page registers a single
+            url rule and components are resolved from the url path by the router.
+            Use it for applications with many components to reduce startup time
+            and url matching cost.
+
+        lazy:
+            When ``JEMBE_LAZY_COMPONENTS`` Flask config variable is set to ``True``
+            only url rules of pages are registred at startup. Page components are
+            imported and registred on the first request to the page or by
+            calling ``Jembe.warmup``. Lazy mode always uses ``router``.
+
+        pages_startup_time:
+            Time in seconds spent registering components of every page.
+
     Raises:
         JembeError: More then one Jembe extension is initialised for a Flask instance;
         JembeError: Storage is initialised before associating Jembe with Flask instance;
@@ -106,6 +170,11 @@ class Jembe:
 
     X_JEMBE = "X-Jembe"
     X_RELATED_UPLOAD = "X-Jembe-Related-Upload"
+    # chunked upload headers, chunk position is sent with Content-Range header
+    X_UPLOAD_ID = "X-Jembe-Upload-Id"
+    X_UPLOAD_FILE = "X-Jembe-Upload-File"
+    X_UPLOAD_INDEX = "X-Jembe-Upload-Index"
+    X_UPLOAD_FILENAME = "X-Jembe-Upload-Filename"
 
     def __init__(
         self,
@@ -120,6 +189,41 @@ class Jembe:
         self._unregistred_pages: Dict[str, "jembe.ComponentRef"] = {}
 
         self._storages: Dict[str, "jembe.Storage"]
+        # single url rule per page router, when enabled by JEMBE_COMPONENT_ROUTER
+        self.router: Optional["ComponentRouter"] = None
+        # register page components on first use, enabled by JEMBE_LAZY_COMPONENTS
+        self.lazy: bool = False
+        self._lazy_pages: Dict[str, Tuple["Blueprint", "jembe.ComponentRef"]] = {}
+        self._lazy_pages_lock = Lock()
+        # time in seconds spent registering components of every page
+        self.pages_startup_time: Dict[str, float] = {}
+        # records x-jembe requests, enabled by JEMBE_REQUEST_RECORDER
+        self.recorder: Optional["RequestRecorder"] = None
+        # processor metrics, enabled by JEMBE_METRICS
+        self.metrics: Optional["Metrics"] = None
+        # who can read /jembe/metrics, None (nobody), "local" or callable
+        # returning True for allowed request, JEMBE_METRICS_ACCESS
+        self.metrics_access: Optional[Union[str, Callable[[], bool]]] = None
+        # log requests slower than threshold in ms, JEMBE_SLOW_REQUEST_THRESHOLD
+        self.slow_request_threshold: Optional[float] = None
+        # attribute traced memory allocations to components, JEMBE_MEMORY_PROFILE
+        self.memory_profile: bool = False
+        # upload limits in bytes, JEMBE_UPLOAD_MAX_FILE_SIZE and
+        # JEMBE_UPLOAD_MAX_REQUEST_SIZE (defaults to Flask MAX_CONTENT_LENGTH)
+        self.upload_max_file_size: Optional[int] = None
+        self.upload_max_request_size: Optional[int] = None
+        # allowed file extensions (without dot) and content types ("image/*")
+        # of uploaded files, JEMBE_UPLOAD_ALLOWED_EXTENSIONS and
+        # JEMBE_UPLOAD_ALLOWED_CONTENT_TYPES, None allows all
+        self.upload_allowed_extensions: Optional[Set[str]] = None
+        self.upload_allowed_content_types: Optional[Set[str]] = None
+        # removes abandoned temp storage dirs, enabled by JEMBE_TEMP_CLEANUP_INTERVAL
+        self.temp_sweeper: Optional["TempStorageSweeper"] = None
+        # seconds public storage files requested by versioned url are cached
+        # by browsers and proxies as immutable, JEMBE_PUBLIC_FILES_MAX_AGE
+        self.public_files_max_age: Optional[int] = DEFAULT_JEMBE_PUBLIC_FILES_MAX_AGE
+        # cache version generators, JEMBE_CACHE_VERSION_WORKERS processes
+        self.cache_versions = CacheVersions()
         self.extensions: Dict[str, Any] = dict()
         self.initialised_extensions: List[str] = []
 
@@ -164,6 +268,95 @@ class Jembe:
         # Init storages
         self._init_storages(storages)
 
+        bytecode_cache = self.__flask.config.get(
+            "JEMBE_TEMPLATE_BYTECODE_CACHE", DEFAULT_JEMBE_TEMPLATE_BYTECODE_CACHE
+        )
+        if bytecode_cache:
+            self.set_template_bytecode_cache(bytecode_cache)
+
+        if self.__flask.config.get("JEMBE_METRICS", DEFAULT_JEMBE_METRICS):
+            self.metrics = Metrics()
+        self.metrics_access = self.__flask.config.get(
+            "JEMBE_METRICS_ACCESS", DEFAULT_JEMBE_METRICS_ACCESS
+        )
+        self.slow_request_threshold = self.__flask.config.get(
+            "JEMBE_SLOW_REQUEST_THRESHOLD", DEFAULT_JEMBE_SLOW_REQUEST_THRESHOLD
+        )
+        self.memory_profile = self.__flask.config.get(
+            "JEMBE_MEMORY_PROFILE", DEFAULT_JEMBE_MEMORY_PROFILE
+        )
+        if self.memory_profile and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self.upload_max_file_size = self.__flask.config.get(
+            "JEMBE_UPLOAD_MAX_FILE_SIZE", DEFAULT_JEMBE_UPLOAD_MAX_FILE_SIZE
+        )
+        self.upload_max_request_size = self.__flask.config.get(
+            "JEMBE_UPLOAD_MAX_REQUEST_SIZE", DEFAULT_JEMBE_UPLOAD_MAX_REQUEST_SIZE
+        )
+        allowed_extensions = self.__flask.config.get(
+            "JEMBE_UPLOAD_ALLOWED_EXTENSIONS", DEFAULT_JEMBE_UPLOAD_ALLOWED_EXTENSIONS
+        )
+        if allowed_extensions is not None:
+            self.upload_allowed_extensions = {
+                ext.lower().lstrip(".") for ext in allowed_extensions
+            }
+        allowed_content_types = self.__flask.config.get(
+            "JEMBE_UPLOAD_ALLOWED_CONTENT_TYPES",
+            DEFAULT_JEMBE_UPLOAD_ALLOWED_CONTENT_TYPES,
+        )
+        if allowed_content_types is not None:
+            self.upload_allowed_content_types = {
+                ct.lower() for ct in allowed_content_types
+            }
+
+        self.public_files_max_age = self.__flask.config.get(
+            "JEMBE_PUBLIC_FILES_MAX_AGE", DEFAULT_JEMBE_PUBLIC_FILES_MAX_AGE
+        )
+
+        self.cache_versions.workers = self.__flask.config.get(
+            "JEMBE_CACHE_VERSION_WORKERS", DEFAULT_JEMBE_CACHE_VERSION_WORKERS
+        )
+        self.cache_versions.lock_timeout = self.__flask.config.get(
+            "JEMBE_CACHE_VERSION_LOCK_TIMEOUT", DEFAULT_JEMBE_CACHE_VERSION_LOCK_TIMEOUT
+        )
+
+        temp_cleanup_interval = self.__flask.config.get(
+            "JEMBE_TEMP_CLEANUP_INTERVAL", DEFAULT_JEMBE_TEMP_CLEANUP_INTERVAL
+        )
+        if temp_cleanup_interval:
+            self.temp_sweeper = TempStorageSweeper(self.__flask, temp_cleanup_interval)
+
+        recorder_filename = self.__flask.config.get(
+            "JEMBE_REQUEST_RECORDER", DEFAULT_JEMBE_REQUEST_RECORDER
+        )
+        if recorder_filename:
+            self.recorder = RequestRecorder(
+                self.__flask,
+                recorder_filename,
+                redact_state=self.__flask.config.get(
+                    "JEMBE_REQUEST_RECORDER_REDACT",
+                    DEFAULT_JEMBE_REQUEST_RECORDER_REDACT,
+                ),
+                max_bytes=self.__flask.config.get(
+                    "JEMBE_REQUEST_RECORDER_MAX_BYTES",
+                    DEFAULT_JEMBE_REQUEST_RECORDER_MAX_BYTES,
+                ),
+                backup_count=self.__flask.config.get(
+                    "JEMBE_REQUEST_RECORDER_BACKUP_COUNT",
+                    DEFAULT_JEMBE_REQUEST_RECORDER_BACKUP_COUNT,
+                ),
+            )
+
+        self.lazy = self.__flask.config.get(
+            "JEMBE_LAZY_COMPONENTS", DEFAULT_JEMBE_LAZY_COMPONENTS
+        )
+        if self.lazy or self.__flask.config.get(
+            "JEMBE_COMPONENT_ROUTER", DEFAULT_JEMBE_COMPONENT_ROUTER
+        ):
+            # lazy pages can't add url rules after blueprint is registred
+            self.router = ComponentRouter(self.__flask.url_map)
+
         # register all unregistred pages added to app before associating
         # app with flask instance
         if self._unregistred_pages:
@@ -171,6 +364,18 @@ class Jembe:
                 self._register_page(name, component)
             self._unregistred_pages = {}
 
+    def set_template_bytecode_cache(self, directory: str):
+        """Stores compiled Jinja2 templates in directory relative to application root.
+
+        Bytecode is reused by all processes started from the same application
+        directory, see ``jembe compile-templates`` command.
+        """
+        if self.flask is None:
+            raise JembeError("Jembe is not initialised with Flask instance")
+        directory = path.join(self.flask.root_path, directory)
+        makedirs(directory, exist_ok=True)
+        self.flask.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
     def _init_storages(self, storages: Optional[Sequence["jembe.Storage"]]):
         if not self.flask:
             raise JembeError(
@@ -269,15 +474,105 @@ class Jembe:
 
         return decorator
 
+    def cache_version(
+        self,
+        cache_name: str,
+        placeholder: Optional[Callable[["jembe.File"], "jembe.File"]] = None,
+    ):
+        """
+        Registers generator of cache version, used as decorator:
+
+        .. code-block:: python
+
+            @jmb.cache_version("thumb_200")
+            def thumb_200(src: str, dst: str):
+                with Image.open(src) as image:
+                    image.thumbnail((200, 200))
+                    image.save(dst)
+
+        Generator is called with disk paths of the original file and of the
+        cache version in process pool when ``File.get_cache_version`` does
+        not find cache version, see ``jembe.cache_versions``.
+
+        Args:
+            cache_name: Name of the cache version
+            placeholder: Returns file used while cache version is generated,
+                defaults to the original file
+        """
+
+        def decorator(generate: Callable[[str, str], None]):
+            self.cache_versions.register(cache_name, generate, placeholder)
+            return generate
+
+        return decorator
+
     def _register_page(self, name: str, component_ref: ComponentRef):
         if self.flask is None:  # pragma: no cover
             raise NotImplementedError()
 
+        page_ref = (
+            component_ref[0] if isinstance(component_ref, tuple) else component_ref
+        )
+        bp = Blueprint(
+            name,
+            # string references are not imported until page is used
+            page_ref.rsplit(".", 1)[0]
+            if isinstance(page_ref, str)
+            else page_ref.__module__,
+            template_folder="templates",
+            static_folder="static",
+            static_url_path=f"/{name}/static",
+        )
+        if self.router is not None:
+            bp.add_url_rule(
+                self.router.url_rule(name),
+                ComponentRouter.ENDPOINT,
+                jembe_master_view,
+                methods=["GET", "POST"],
+            )
+        if self.lazy:
+            # components are registred on first use of the page
+            self._lazy_pages[name] = (bp, component_ref)
+        else:
+            self._register_page_components(bp, name, component_ref)
+        self.flask.register_blueprint(bp)
+
+    def _register_page_components(
+        self, bp: "Blueprint", name: str, component_ref: ComponentRef
+    ):
+        start = perf_counter()
         # go down component hiearchy
-        bp: Optional["Blueprint"] = None
         component_refs: List[
             Tuple[str, ComponentRef, Optional["jembe.ComponentConfig"]]
         ] = [(name, component_ref, None)]
+        registred: List["jembe.ComponentConfig"] = []
+        try:
+            self._register_components(bp, component_refs, registred)
+        except BaseException:
+            # roll back partially registred page so that it is registred
+            # again (or fails again) on next use
+            for component_config in reversed(registred):
+                self.components_configs.pop(component_config.full_name, None)
+                if self.router is not None:
+                    self.router.remove(component_config)
+            raise
+
+        self.pages_startup_time[name] = perf_counter() - start
+        if self.flask is not None:
+            self.flask.logger.debug(
+                "Jembe page '%s' registred in %.3fs",
+                name,
+                self.pages_startup_time[name],
+            )
+
+    def _register_components(
+        self,
+        bp: "Blueprint",
+        component_refs: List[
+            Tuple[str, ComponentRef, Optional["jembe.ComponentConfig"]]
+        ],
+        registred: List["jembe.ComponentConfig"],
+    ):
         while component_refs:
             component_name, curent_ref, parent_config = component_refs.pop(0)
             if isinstance(curent_ref, tuple):
@@ -312,23 +607,19 @@ class Jembe:
                 )
             # fill components_configs
             self.components_configs[component_config.full_name] = component_config
+            registred.append(component_config)
 
-            if bp is None:
-                bp = Blueprint(
-                    component_name,
-                    component_class.__module__,
-                    template_folder="templates",
-                    static_folder="static",
-                    static_url_path=f"/{component_name}/static",
+            if self.router is not None:
+                self.router.add(component_config)
+                component_config.endpoint = f"{bp.name}.{ComponentRouter.ENDPOINT}"
+            else:
+                bp.add_url_rule(
+                    component_config.url_path,
+                    component_config.full_name,
+                    jembe_master_view,
+                    methods=["GET", "POST"],
                 )
-
-            bp.add_url_rule(
-                component_config.url_path,
-                component_config.full_name,
-                jembe_master_view,
-                methods=["GET", "POST"],
-            )
-            component_config.endpoint = f"{bp.name}.{component_config.full_name}"
+                component_config.endpoint = f"{bp.name}.{component_config.full_name}"
 
             if component_config.components:
                 component_refs.extend(
@@ -336,16 +627,185 @@ class Jembe:
                     for name, cref in component_config.components.items()
                 )
 
-        if bp:
-            self.flask.register_blueprint(bp)
+    def _ensure_page_registred(self, page_name: str):
+        """Registers components of the lazy page on its first use"""
+        if page_name not in self._lazy_pages:
+            return
+        with self._lazy_pages_lock:
+            if page_name in self._lazy_pages:
+                bp, component_ref = self._lazy_pages[page_name]
+                self._register_page_components(bp, page_name, component_ref)
+                del self._lazy_pages[page_name]
+
+    def warmup(self) -> Dict[str, float]:
+        """Registers components of all pages not registred yet.
+
+        In lazy mode (``JEMBE_LAZY_COMPONENTS``) components of a page are
+        imported and registred on the first request to the page. Call
+        ``warmup`` to register them upfront, for example in the master process
+        before forking workers.
+
+        Returns:
+            Time in seconds spent registering components of every page.
+        """
+        for page_name in tuple(self._lazy_pages.keys()):
+            self._ensure_page_registred(page_name)
+        return dict(self.pages_startup_time)
+
+    def compile_templates(self) -> Tuple[Dict[str, str], List[str]]:
+        """Compiles templates of all registred components.
+
+        For every component the first existing template from
+        ``ComponentConfig.template`` is compiled, the same one
+        ``Component.render_template`` would use. Compiled templates are
+        stored in Jinja2 cache and in bytecode cache when it is configured
+        with ``JEMBE_TEMPLATE_BYTECODE_CACHE``.
+
+        Returns:
+            Tuple of compiled template names by component full name and
+            list of full names of components whose template is required
+            (see ``ComponentConfig.template_required``) but does not exist.
+        """
+        if self.flask is None:
+            raise JembeError("Jembe is not initialised with Flask instance")
+        self.warmup()
+        jinja_env = self.flask.jinja_env
+        templates: Dict[str, str] = {}
+        missing: List[str] = []
+        for full_name, component_config in self.components_configs.items():
+            for template_name in component_config.template:
+                try:
+                    jinja_env.get_template(template_name)
+                except TemplateNotFound:
+                    continue
+                templates[full_name] = template_name
+                break
+            else:
+                if component_config.template_required:
+                    missing.append(full_name)
+        return templates, missing
+
+    def preload(self, freeze: bool = True) -> Dict[str, Any]:
+        """Loads everything components need to process requests.
+
+        Intended to be called in the master process of preforking servers
+        (like ``gunicorn --preload``) so that workers share loaded data
+        via copy-on-write instead of loading it again after fork:
+
+        - registers components of all pages (see ``warmup``);
+        - compiles templates of all components into Jinja2 cache;
+        - inspects component classes for default template context;
+        - moves all objects to permanent generation with ``gc.freeze()``
+          so that garbage collector doesn't touch (and copy) their memory.
+
+        .. code-block:: python
+            :caption: gunicorn.conf.py
+
+            from jembe.common import process_memory_usage
+
+            def on_starting(server):
+                jmb.preload()
+
+            def post_worker_init(worker):
+                worker.log.info("Memory: %s", process_memory_usage())
+
+        Args:
+            freeze: Call ``gc.freeze()`` after preloading. Defaults to True.
+
+        Returns:
+            Dict with startup time per page, number of compiled templates
+            and memory usage (shared and private bytes) of the current process.
+        """
+        if self.flask is None:
+            raise JembeError("Jembe is not initialised with Flask instance")
+        from .component import context_property_names
+
+        pages_startup_time = self.warmup()
+        for component_config in self.components_configs.values():
+            context_property_names(component_config.component_class)
+        templates, _ = self.compile_templates()
+        cache_size = getattr(self.flask.jinja_env.cache, "capacity", None)
+        if cache_size is not None and len(templates) > cache_size:
+            self.flask.logger.warning(
+                "Jembe preloaded %s templates but Jinja2 cache size is %s",
+                len(templates),
+                cache_size,
+            )
+
+        if freeze:
+            gc.collect()
+            gc.freeze()
+
+        report = dict(
+            pages=pages_startup_time,
+            templates=len(set(templates.values())),
+            memory=process_memory_usage(),
+        )
+        self.flask.logger.info("Jembe preloaded: %s", report)
+        return report
 
     def get_component_config(self, exec_name: str) -> "jembe.ComponentConfig":
-        try:
-            return self.components_configs[exec_name_to_full_name(exec_name)]
-        except KeyError:
-            raise JembeError(
-                f"Component {exec_name_to_full_name(exec_name)} does not exist"
+        full_name = exec_name_to_full_name(exec_name)
+        component_config = self.find_component_config(full_name)
+        if component_config is None:
+            raise JembeError(f"Component {full_name} does not exist")
+        return component_config
+
+    def find_component_config(
+        self, full_name: str
+    ) -> Optional["jembe.ComponentConfig"]:
+        """Returns component config by full name or None when it does not exist.
+
+        Components of the lazy page are registred on the first lookup, so
+        components_configs should not be accessed directly.
+        """
+        self._ensure_page_registred(full_name.strip("/").split("/")[0])
+        return self.components_configs.get(full_name)
+
+    def component_url(self, full_name: str, url_params: Dict[str, Any]) -> str:
+        """Returns url of the component from its raw url params.
+
+        Args:
+            full_name: Full name of the component
+            url_params: Url params of the component and its parents by
+                url param identifier (``component_key__1``, ``name__1`` etc.)
+        """
+        self._ensure_page_registred(full_name.split("/")[1])
+        component_config = self.components_configs[full_name]
+        if self.router is not None:
+            url_params = self.router.build(component_config, url_params)
+        return url_for(component_config.endpoint, **url_params)
+
+    def get_component_full_name(self) -> str:
+        """Returns full name of the component requested by current HTTP request.
+
+        When component router is used, request view args are populated
+        with component url params resolved from the url path.
+        """
+        if "jmb_component_full_name" in g:
+            return g.jmb_component_full_name
+        endpoint_name = request.endpoint[len(request.blueprint) + 1 :]
+        if self.router is not None and endpoint_name == ComponentRouter.ENDPOINT:
+            self._ensure_page_registred(request.blueprint)
+            full_name, request.view_args = self.router.resolve(
+                request.blueprint,
+                request.view_args.get(ComponentRouter.PATH_PARAM, ""),
             )
+            endpoint_name = full_name
+        g.jmb_component_full_name = endpoint_name
+        return endpoint_name
+
+    def send_file(self, storage_name: str, file_path: str) -> "Response":
+        """Sends file from storage in response to direct HTTP request.
+
+        File requests are handled without processor and components, access
+        to the file is checked by its storage.
+        """
+        try:
+            storage = self.get_storage(storage_name)
+        except JembeError:
+            raise NotFound()
+        return storage.send_file(file_path)
 
     def get_storage_by_type(
         self, storage_type: "jembe.Storage.Type", storage_name: Optional[str] = None
@@ -405,10 +865,10 @@ def get_processor():
     if "jmb_processor" not in g:
         if not (request.endpoint and request.blueprint):
             raise JembeError("Request {} can't be handled by jembe processor")
-        component_full_name = request.endpoint[len(request.blueprint) + 1 :]
         jembe_state = current_app.extensions.get("jembe", None)
         if jembe_state is None:
             raise JembeError("Jembe extension is not initialised")
+        component_full_name = jembe_state.jembe.get_component_full_name()
         return Processor(jembe_state.jembe, component_full_name, request)
     return g.jmb_processor
 
@@ -510,4 +970,19 @@ def get_private_storage(storage_name: Optional[str] = None) -> "jembe.Storage":
 
 def jembe_master_view(**kwargs) -> "Response":
     """Process HTTP request with Jembe Processors"""
-    return get_processor().process_request().build_response()
+    if (
+        request.blueprint == "jembe"
+        and request.method in ("GET", "HEAD")
+        and "jmb_processor" not in g
+    ):
+        # files are sent without processing components
+        jmb = get_jembe()
+        if jmb.get_component_full_name() == "/jembe/file":
+            view_args = request.view_args or dict()
+            return jmb.send_file(
+                view_args["storage_name__1"], view_args["file_path__1"]
+            )
+    processor = get_processor()
+    if processor.profile is not None:
+        return process_profiled_request(processor)
+    return processor.process_request().build_response()
@@ -0,0 +1,332 @@
+"""
+Benchmark suite for the processor and the composition pipeline.
+
+Every scenario builds synthetic Flask application with Jembe components
+(deep nesting, wide keyed lists, many listeners, heavy state) and returns
+a function that executes one measured operation. Results are returned as
+a dict ready to be saved as JSON and compared between commits:
+
+.. code-block:: bash
+
+    $ jembe bench --output before.json
+    $ git checkout feature
+    $ jembe bench --output after.json --compare before.json
+"""
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from flask import Flask, json
+from .app import Jembe, get_processor
+from .component import Component
+from .component_config import action, listener, redisplay
+from .exceptions import JembeError
+
+if TYPE_CHECKING:  # pragma: no cover
+    import jembe
+
+__all__ = ("SCENARIOS", "run", "compare")
+
+# scenario receives scale factor and returns function to be measured
+Scenario = Callable[[float], Callable[[], Any]]
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(name: str) -> Callable[[Scenario], Scenario]:
+    def decorator(setup: Scenario) -> Scenario:
+        SCENARIOS[name] = setup
+        return setup
+
+    return decorator
+
+
+# root of benchmark applications, removed when interpreter exits
+_root_path = tempfile.TemporaryDirectory(prefix="jembe-bench-")
+
+
+def _create_app() -> Tuple[Flask, Jembe]:
+    app = Flask(__name__, root_path=_root_path.name)
+    app.secret_key = "jembe-bench"
+    app.config["JEMBE_MEDIA_FOLDER"] = "media"
+    return app, Jembe(app)
+
+
+def _size(base: int, scale: float) -> int:
+    return max(1, int(base * scale))
+
+
+def _check(response, expected_status: int = 200):
+    if response.status_code != expected_status:
+        raise JembeError(
+            f"Benchmark request returned {response.status_code}: {response.data[:200]}"
+        )
+    return response
+
+
+def _x_jembe_post(client, url: str, components: List[dict], commands: List[dict]):
+    return _check(
+        client.post(
+            url,
+            data=json.dumps(dict(components=components, commands=commands)),
+            headers={"x-jembe": True},
+        )
+    )
+
+
+def _call_command(exec_name: str, action_name: str) -> dict:
+    return dict(
+        type="call",
+        componentExecName=exec_name,
+        actionName=action_name,
+        args=list(),
+        kwargs=dict(),
+    )
+
+
+class _Item(Component):
+    def __init__(self, value: int = 0):
+        super().__init__()
+
+    @action
+    def increase(self):
+        self.state.value += 1
+
+    def display(self) -> "jembe.DisplayResponse":
+        # plain string so that benchmark is not dominated by jinja2
+        return f"<div>{self.key}: {self.state.value}</div>"
+
+
+def _keyed_list_app(size: int, item_class=_Item) -> Flask:
+    app, jmb = _create_app()
+
+    @jmb.page("page", Component.Config(components=dict(item=item_class)))
+    class Page(Component):
+        def __init__(self, size: int = size):
+            super().__init__()
+
+        @action
+        def refresh(self):
+            return False
+
+        @action
+        def ping(self):
+            self.emit("ping")
+            return False
+
+        def display(self) -> "jembe.DisplayResponse":
+            return self.render_template_string(
+                "<html><body>"
+                "{% for i in range(size) %}{{component('item').key(i)}}{% endfor %}"
+                "</body></html>"
+            )
+
+    return app
+
+
+def _keyed_list_components(size: int) -> List[dict]:
+    return [dict(execName="/page", state=dict(size=size))] + [
+        dict(execName=f"/page/item.{i}", state=dict(value=0)) for i in range(size)
+    ]
+
+
+@scenario("get_deep_nesting")
+def deep_nesting(scale: float) -> Callable[[], Any]:
+    """GET page with components nested deep in hiearchy"""
+    depth = _size(30, scale)
+    app, jmb = _create_app()
+
+    class Node(Component):
+        def display(self) -> "jembe.DisplayResponse":
+            return self.render_template_string("<div>{{component('child')}}</div>")
+
+    class Leaf(Component):
+        def display(self) -> "jembe.DisplayResponse":
+            return "<b>leaf</b>"
+
+    component_ref: Any = Leaf
+    for _ in range(depth):
+        component_ref = (Node, Component.Config(components=dict(child=component_ref)))
+    jmb.add_page("deep", *component_ref)
+    client = app.test_client()
+    url = "/deep" + "/child" * depth
+    return lambda: _check(client.get(url))
+
+
+@scenario("get_wide_keyed_list")
+def wide_keyed_list(scale: float) -> Callable[[], Any]:
+    """GET page displaying many keyed components"""
+    client = _keyed_list_app(_size(500, scale)).test_client()
+    return lambda: _check(client.get("/page"))
+
+
+@scenario("x_jembe_action")
+def x_jembe_action(scale: float) -> Callable[[], Any]:
+    """x-jembe action round-trip on one of many components on the page"""
+    size = _size(200, scale)
+    client = _keyed_list_app(size).test_client()
+    components = _keyed_list_components(size)
+    commands = [_call_command(f"/page/item.{size // 2}", "increase")]
+    return lambda: _x_jembe_post(client, "/page", components, commands)
+
+
+@scenario("emit_fan_out")
+def emit_fan_out(scale: float) -> Callable[[], Any]:
+    """Event emited by the page and received by many listeners"""
+
+    class Listener(_Item):
+        @listener(event="ping")
+        def on_ping(self, event):
+            self.state.value += 1
+
+    size = _size(300, scale)
+    client = _keyed_list_app(size, Listener).test_client()
+    components = _keyed_list_components(size)
+    commands = [_call_command("/page", "ping")]
+    return lambda: _x_jembe_post(client, "/page", components, commands)
+
+
+@scenario("redisplay_when_on_page")
+def redisplay_when_on_page(scale: float) -> Callable[[], Any]:
+    """Components redisplayed whenever they are on the page"""
+
+    class OnPageItem(_Item):
+        @redisplay(when_on_page=True)
+        def display(self) -> "jembe.DisplayResponse":
+            return super().display()
+
+    size = _size(300, scale)
+    client = _keyed_list_app(size, OnPageItem).test_client()
+    components = _keyed_list_components(size)
+    commands = [_call_command("/page", "refresh")]
+    return lambda: _x_jembe_post(client, "/page", components, commands)
+
+
+@scenario("build_response")
+def build_response(scale: float) -> Callable[[], Any]:
+    """Composition of rendered components html into page response"""
+    app = _keyed_list_app(_size(500, scale))
+
+    def run():
+        with app.test_request_context("/page"):
+            processor = get_processor().process_request()
+            start = time.perf_counter()
+            processor.build_response()
+            return time.perf_counter() - start
+
+    return run
+
+
+@scenario("state_dump_load")
+def state_dump_load(scale: float) -> Callable[[], Any]:
+    """Dump and load of heavy component state"""
+    size = _size(1000, scale)
+    app, _ = _create_app()
+
+    class Heavy(Component):
+        def __init__(
+            self,
+            rows: List[Tuple[int, str, float]] = [],
+            names: List[str] = [],
+            lookup: Dict[str, int] = {},
+        ):
+            super().__init__()
+
+    state = dict(
+        rows=[(i, f"row {i}", i / 3) for i in range(size)],
+        names=[f"name {i}" for i in range(size)],
+        lookup={f"key {i}": i for i in range(size)},
+    )
+    config = Heavy.Config._jembe_init_(
+        _name="heavy", _component_class=Heavy, _parent=None
+    )
+
+    def run():
+        with app.app_context():
+            for name, value in state.items():
+                dumped = json.loads(json.dumps(Heavy.dump_init_param(name, value)))
+                Heavy.load_init_param(config, name, dumped)
+
+    return run
+
+
+def run(
+    scenarios: Optional[Iterable[str]] = None,
+    repeat: int = 5,
+    scale: float = 1.0,
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Runs benchmark scenarios and returns results ready for JSON dump.
+
+    Every scenario is executed once to warm up caches and than ``repeat``
+    times. Scenario can measure only part of its execution by returning
+    time in seconds.
+
+    Args:
+        scenarios: Names of scenarios to run, defaults to all ``SCENARIOS``.
+        repeat: Number of measured executions of every scenario.
+        scale: Multiplies number of components, listeners, state size etc.
+        progress: Optional callback called with result of every scenario.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in scenarios if scenarios is not None else SCENARIOS.keys():
+        scenario = SCENARIOS.get(name)
+        if scenario is None:
+            raise JembeError(f"Benchmark scenario '{name}' does not exist")
+        execute = scenario(scale)
+        execute()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            measured = execute()
+            elapsed = time.perf_counter() - start
+            timings.append(measured if isinstance(measured, float) else elapsed)
+        results[name] = dict(
+            min=min(timings),
+            median=statistics.median(timings),
+            mean=statistics.mean(timings),
+            timings=timings,
+        )
+        if progress is not None:
+            progress(name, results[name])
+    return dict(
+        jembe=_jembe_version(),
+        python=platform.python_version(),
+        created=datetime.now(timezone.utc).isoformat(),
+        repeat=repeat,
+        scale=scale,
+        results=results,
+    )
+
+
+def compare(
+    baseline: Dict[str, Any], results: Dict[str, Any], stat: str = "median"
+) -> Dict[str, float]:
+    """Returns ratio of results and baseline timing for every common scenario.
+
+    Ratio lower than 1.0 means that scenario is faster than in baseline.
+    """
+    return {
+        name: result[stat] / baseline["results"][name][stat]
+        for name, result in results["results"].items()
+        if name in baseline.get("results", {}) and baseline["results"][name][stat] > 0
+    }
+
+
+def _jembe_version() -> str:
+    try:
+        import importlib.metadata
+
+        return importlib.metadata.version("jembe")
+    except Exception:
+        return "unknown"
@@ -0,0 +1,236 @@
+"""
+Generates cache versions of files (thumbnails, previews) in background.
+
+Generators are registered by cache name with ``Jembe.cache_version``
+decorator:
+
+.. code-block:: python
+
+    @jmb.cache_version("thumb_200")
+    def thumb_200(src: str, dst: str):
+        with Image.open(src) as image:
+            image.thumbnail((200, 200))
+            image.save(dst)
+
+Generator receives disk path of the original file and disk path into which
+cache version must be written, it runs in a local process pool so it must
+be module level function. ``File.get_cache_version`` returns cache version
+when it is generated, otherwise it starts generation and returns placeholder
+(or original file when generator does not define placeholder).
+
+Generation of the same cache version is started only once across
+concurrent requests and processes by creating lock file for it. Lock older
+than ``JEMBE_CACHE_VERSION_LOCK_TIMEOUT`` seconds is considered abandoned by
+crashed worker. When generator raises an exception the error is logged,
+empty failure marker is left and placeholder is returned without starting
+generation again until marker is older than
+``JEMBE_CACHE_VERSION_LOCK_TIMEOUT``. Lock and failure markers and files
+being generated are kept in ``.CACHE_STATE`` dir of the storage which is
+never served, so that only finished cache versions are in served ``CACHE``.
+
+Pool size is set by ``JEMBE_CACHE_VERSION_WORKERS``, when it is 0 cache
+versions are generated inline during the request. Workers are started with
+``forkserver`` (``spawn`` where it is not available) instead of forking
+the application process, because fork of a process running threads (threaded
+server, database pools) can copy locks held by other threads and deadlock
+the worker. Process pool is shut down at interpreter exit.
+"""
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional
+import atexit
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from threading import Lock
+from uuid import uuid4
+from flask import current_app
+from .defaults import (
+    DEFAULT_JEMBE_CACHE_VERSION_LOCK_TIMEOUT,
+    DEFAULT_JEMBE_CACHE_VERSION_WORKERS,
+    DEFAULT_STORAGE_CACHE_STATE_FOLDER,
+)
+from .exceptions import JembeError
+
+if TYPE_CHECKING:  # pragma: no cover
+    import jembe
+
+__all__ = ("CacheVersionGenerator", "CacheVersions")
+
+LOCK_EXTENSION = "lock"
+FAILED_EXTENSION = "failed"
+
+
+class CacheVersionGenerator(NamedTuple):
+    # generator(original disk path, cache version disk path)
+    generate: Callable[[str, str], None]
+    # returns file displayed while cache version is generated
+    placeholder: Optional[Callable[["jembe.File"], "jembe.File"]] = None
+
+
+def _generate(generate: Callable[[str, str], None], src: str, dst: str, state: str):
+    """
+    Generates cache version into temporary file in state dir and renames it
+    to dst, leaves failure marker when generator raises an exception
+    """
+    # keeps extension so that generator can use it to choose file format
+    tmp = os.path.join(
+        os.path.dirname(state), "{}.{}".format(uuid4().hex, os.path.basename(dst))
+    )
+    try:
+        generate(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        open("{}.{}".format(state, FAILED_EXTENSION), "w").close()
+        raise
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        os.remove("{}.{}".format(state, LOCK_EXTENSION))
+
+
+def _has_failed(failed: str, timeout: float) -> bool:
+    """Returns True when generation failed less than timeout seconds ago"""
+    try:
+        if time.time() - os.path.getmtime(failed) <= timeout:
+            return True
+        os.remove(failed)
+    except FileNotFoundError:
+        pass
+    return False
+
+
+def _acquire_lock(lock: str, timeout: float) -> bool:
+    for _ in range(2):
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) <= timeout:
+                    return False
+                # abandoned by crashed worker
+                os.remove(lock)
+            except FileNotFoundError:
+                # generation just finished
+                return False
+    return False
+
+
+def _get_mp_context() -> multiprocessing.context.BaseContext:
+    """Context starting pool workers without forking application process"""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+class CacheVersions:
+    """Registry of cache version generators and process pool running them"""
+
+    def __init__(self):
+        self.generators: Dict[str, CacheVersionGenerator] = dict()
+        self.workers: int = DEFAULT_JEMBE_CACHE_VERSION_WORKERS
+        self.lock_timeout: float = DEFAULT_JEMBE_CACHE_VERSION_LOCK_TIMEOUT
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._executor_lock = Lock()
+        self._futures: List[Future] = []
+
+    def __contains__(self, cache_name: str) -> bool:
+        return cache_name in self.generators
+
+    def register(
+        self,
+        cache_name: str,
+        generate: Callable[[str, str], None],
+        placeholder: Optional[Callable[["jembe.File"], "jembe.File"]] = None,
+    ):
+        self.generators[cache_name] = CacheVersionGenerator(generate, placeholder)
+
+    def get(
+        self, original: "jembe.File", cache_file: "jembe.File", cache_name: str
+    ) -> "jembe.File":
+        """
+        Returns cache_file when it exists, otherwise starts its generation
+        (unless it recently failed) and returns placeholder or original file
+        """
+        from .files import DiskStorage
+
+        if cache_file.exists():
+            return cache_file
+        storage = cache_file.storage
+        if not isinstance(storage, DiskStorage):
+            raise JembeError(
+                "Cache versions can only be generated in DiskStorage, "
+                "storage '{}' is not DiskStorage".format(storage.name)
+            )
+        generator = self.generators[cache_name]
+        dst = storage._disk_path(cache_file.path)
+        # state of dst inside state dir: <state dir>/<dst path in storage>
+        state = os.path.join(
+            storage.folder,
+            DEFAULT_STORAGE_CACHE_STATE_FOLDER,
+            os.path.relpath(dst, storage.folder),
+        )
+        lock = "{}.{}".format(state, LOCK_EXTENSION)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        os.makedirs(os.path.dirname(state), exist_ok=True)
+        failed = "{}.{}".format(state, FAILED_EXTENSION)
+        if not _has_failed(failed, self.lock_timeout) and _acquire_lock(
+            lock, self.lock_timeout
+        ):
+            src = storage._disk_path(original.path)
+            logger = current_app.logger
+            error_message = (
+                "Jembe can't generate cache version '{}' of '{}':'{}'".format(
+                    cache_name, storage.name, original.path
+                )
+            )
+            if not self.workers:
+                try:
+                    _generate(generator.generate, src, dst, state)
+                    return cache_file
+                except Exception as e:
+                    logger.error(error_message, exc_info=e)
+            else:
+                try:
+                    future = self._get_executor().submit(
+                        _generate, generator.generate, src, dst, state
+                    )
+                except BaseException:
+                    os.remove(lock)
+                    raise
+
+                def log_error(future: Future):
+                    if future.exception() is not None:
+                        logger.error(error_message, exc_info=future.exception())
+
+                future.add_done_callback(log_error)
+                self._futures = [f for f in self._futures if not f.done()] + [future]
+        if generator.placeholder is not None:
+            return generator.placeholder(original)
+        return original
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            # pool of the parent process can't be used after fork
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=_get_mp_context()
+                )
+                self._executor_pid = os.getpid()
+                self._futures = []
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def wait(self, timeout: Optional[float] = None):
+        """Waits for cache versions being generated by this process"""
+        wait(self._futures, timeout)
+
+    def shutdown(self):
+        """Waits for running generations and shuts down process pool"""
+        with self._executor_lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown()
+            self._executor = None
+            self._futures = []
+            atexit.unregister(self.shutdown)
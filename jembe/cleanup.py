@@ -0,0 +1,276 @@
+"""
+Removes abandoned upload and session dirs from temporary storages.
+
+Files uploaded by jembe client are stored in ``UPLOADS/<fileUploadResponseId>``
+and files of components work in progress in ``WORKINPROGRESS/<session id>``
+dirs of temporary storage. Dirs not modified longer than
+``JEMBE_TEMP_UPLOADS_MAX_AGE`` and ``JEMBE_TEMP_SESSIONS_MAX_AGE`` seconds are
+removed. When ``JEMBE_TEMP_STORAGE_MAX_SIZE`` (in bytes) is set and storage is
+still larger, least recently modified dirs are removed until it fits.
+
+Files are removed in batches of ``JEMBE_TEMP_CLEANUP_BATCH_SIZE`` files with
+``JEMBE_TEMP_CLEANUP_BATCH_PAUSE`` seconds pause between batches, so that
+cleanup does not saturate disk I/O of the running application.
+
+Cleanup is run with ``jembe cleanup-temp`` command (from cron for example) or
+by background sweeper thread started in every application process when
+``JEMBE_TEMP_CLEANUP_INTERVAL`` (in seconds) is set.
+"""
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Optional
+import os
+import time
+from threading import Event, Lock, Thread
+from flask import current_app
+from .defaults import (
+    DEFAULT_JEMBE_TEMP_CLEANUP_BATCH_PAUSE,
+    DEFAULT_JEMBE_TEMP_CLEANUP_BATCH_SIZE,
+    DEFAULT_JEMBE_TEMP_SESSIONS_MAX_AGE,
+    DEFAULT_JEMBE_TEMP_STORAGE_MAX_SIZE,
+    DEFAULT_JEMBE_TEMP_UPLOADS_MAX_AGE,
+    DEFAULT_SESSION_TEMP_STORAGE_SUBDIR,
+    DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    import jembe
+    from flask import Flask
+
+__all__ = (
+    "TempEntry",
+    "TempStorageSweeper",
+    "cleanup_options",
+    "cleanup_temp_storage",
+    "scan_temp_storage",
+)
+
+
+class TempEntry(NamedTuple):
+    """Upload or session dir of temporary storage"""
+
+    path: str
+    size: int
+    files: int
+    # newest modification time of the dir and files inside it
+    mtime: float
+
+
+def cleanup_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns keyword arguments of cleanup_temp_storage from Flask config"""
+    return dict(
+        uploads_max_age=config.get(
+            "JEMBE_TEMP_UPLOADS_MAX_AGE", DEFAULT_JEMBE_TEMP_UPLOADS_MAX_AGE
+        ),
+        sessions_max_age=config.get(
+            "JEMBE_TEMP_SESSIONS_MAX_AGE", DEFAULT_JEMBE_TEMP_SESSIONS_MAX_AGE
+        ),
+        max_size=config.get(
+            "JEMBE_TEMP_STORAGE_MAX_SIZE", DEFAULT_JEMBE_TEMP_STORAGE_MAX_SIZE
+        ),
+        batch_size=config.get(
+            "JEMBE_TEMP_CLEANUP_BATCH_SIZE", DEFAULT_JEMBE_TEMP_CLEANUP_BATCH_SIZE
+        ),
+        batch_pause=config.get(
+            "JEMBE_TEMP_CLEANUP_BATCH_PAUSE", DEFAULT_JEMBE_TEMP_CLEANUP_BATCH_PAUSE
+        ),
+    )
+
+
+def _scan(storage: "jembe.Storage", path: str) -> TempEntry:
+    if not storage.isdir(path):
+        return TempEntry(path, storage.getsize(path), 1, storage.getmtime(path))
+    size, files, mtime = 0, 0, storage.getmtime(path)
+    for name in storage.listdir(path):
+        child = _scan(storage, "/".join((path, name)))
+        size += child.size
+        files += child.files
+        mtime = max(mtime, child.mtime)
+    return TempEntry(path, size, files, mtime)
+
+
+def scan_temp_storage(storage: "jembe.Storage") -> List[TempEntry]:
+    """Returns upload and session dirs of temporary storage"""
+    entries = []
+    for root in (
+        DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER,
+        DEFAULT_SESSION_TEMP_STORAGE_SUBDIR,
+    ):
+        if not storage.isdir(root):
+            continue
+        for name in storage.listdir(root):
+            try:
+                entries.append(_scan(storage, "/".join((root, name))))
+            except FileNotFoundError:
+                # removed by concurrent request or cleanup
+                pass
+    return entries
+
+
+def _remove_tree(storage: "jembe.Storage", path: str) -> Iterator[int]:
+    """Removes path file by file yielding size of every removed file"""
+    if not storage.isdir(path):
+        size = storage.getsize(path)
+        storage.remove_raw(path)
+        yield size
+        return
+    for name in storage.listdir(path):
+        yield from _remove_tree(storage, "/".join((path, name)))
+    storage.rmdir(path)
+
+
+def cleanup_temp_storage(
+    storage: "jembe.Storage",
+    uploads_max_age: Optional[float] = DEFAULT_JEMBE_TEMP_UPLOADS_MAX_AGE,
+    sessions_max_age: Optional[float] = DEFAULT_JEMBE_TEMP_SESSIONS_MAX_AGE,
+    max_size: Optional[int] = DEFAULT_JEMBE_TEMP_STORAGE_MAX_SIZE,
+    batch_size: int = DEFAULT_JEMBE_TEMP_CLEANUP_BATCH_SIZE,
+    batch_pause: float = DEFAULT_JEMBE_TEMP_CLEANUP_BATCH_PAUSE,
+    dry_run: bool = False,
+    now: Optional[float] = None,
+    stop: Optional[Event] = None,
+) -> Dict[str, Any]:
+    """
+    Removes upload and session dirs older than max ages (in seconds, None
+    keeps them regardless of age) and, when max_size is set, least recently
+    modified dirs until storage size is below max_size.
+
+    Must be called inside Flask application context.
+
+    Returns:
+        Report with number of removed dirs and files, bytes reclaimed and
+        size of upload and session dirs before and after cleanup.
+    """
+    now = time.time() if now is None else now
+    entries = scan_temp_storage(storage)
+    max_ages = {
+        DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER: uploads_max_age,
+        DEFAULT_SESSION_TEMP_STORAGE_SUBDIR: sessions_max_age,
+    }
+    expired, kept = [], []
+    for entry in entries:
+        max_age = max_ages[entry.path.split("/")[0]]
+        if max_age is not None and now - entry.mtime > max_age:
+            expired.append(entry)
+        else:
+            kept.append(entry)
+    if max_size is not None:
+        kept.sort(key=lambda e: e.mtime)
+        kept_size = sum(e.size for e in kept)
+        while kept and kept_size > max_size:
+            entry = kept.pop(0)
+            kept_size -= entry.size
+            expired.append(entry)
+
+    size = sum(e.size for e in entries)
+    report: Dict[str, Any] = dict(
+        storage=storage.name,
+        dry_run=dry_run,
+        scanned=len(entries),
+        size_before=size,
+        removed=0,
+        files=0,
+        bytes_reclaimed=0,
+        errors=0,
+    )
+    if dry_run:
+        report.update(
+            removed=len(expired),
+            files=sum(e.files for e in expired),
+            bytes_reclaimed=sum(e.size for e in expired),
+        )
+    else:
+        in_batch = 0
+        for entry in expired:
+            try:
+                for file_size in _remove_tree(storage, entry.path):
+                    report["files"] += 1
+                    report["bytes_reclaimed"] += file_size
+                    in_batch += 1
+                    if in_batch >= batch_size:
+                        in_batch = 0
+                        if stop is not None and stop.wait(batch_pause):
+                            break
+                        elif stop is None:
+                            time.sleep(batch_pause)
+                else:
+                    report["removed"] += 1
+            except FileNotFoundError:
+                # removed by concurrent request or cleanup
+                report["removed"] += 1
+            except OSError as e:
+                # written to by concurrent request or permission problem
+                report["errors"] += 1
+                current_app.logger.warning(
+                    "Jembe temp cleanup can't remove '{}': {}".format(entry.path, e)
+                )
+            if stop is not None and stop.is_set():
+                break
+    report["size_after"] = size - report["bytes_reclaimed"]
+    return report
+
+
+class TempStorageSweeper:
+    """
+    Runs cleanup of all temporary storages of Flask application in background
+    daemon thread every interval seconds.
+
+    Thread is started on first request of every process (so that it is
+    started in workers of pre-forking servers) and every process runs its
+    own sweeper.
+    """
+
+    def __init__(self, app: "Flask", interval: float):
+        self.app = app
+        self.interval = interval
+        self._stop = Event()
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+        self._pid: Optional[int] = None
+        app.before_request(self.start)
+
+    def start(self):
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                self._pid = os.getpid()
+                self._stop.clear()
+                self._thread = Thread(
+                    target=self._run, name="jembe-temp-sweeper", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sweep()
+
+    def sweep(self) -> List[Dict[str, Any]]:
+        """Cleans temporary storages and logs reclaimed bytes"""
+        from .files import Storage
+
+        reports = []
+        with self.app.app_context():
+            jmb = self.app.extensions["jembe"].jembe
+            options = cleanup_options(self.app.config)
+            for storage in jmb.get_storages():
+                if storage.type != Storage.Type.TEMP:
+                    continue
+                try:
+                    report = cleanup_temp_storage(storage, stop=self._stop, **options)
+                except Exception:
+                    current_app.logger.exception("Jembe temp cleanup failed")
+                    continue
+                if report["removed"] or report["errors"]:
+                    current_app.logger.info(
+                        "Jembe temp cleanup of '{}' removed {} dirs, "
+                        "reclaimed {} bytes".format(
+                            storage.name, report["removed"], report["bytes_reclaimed"]
+                        )
+                    )
+                reports.append(report)
+        return reports
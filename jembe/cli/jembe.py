@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 import click
 import importlib.metadata
 from getpass import getuser
@@ -46,3 +47,236 @@ def startproject( name, description):
     echo("To package project for deployment run:")
     secho("\t$ python -m build", bold=True)
     echo()
+
+
+def load_jembe(app_import_path: Optional[str]):
+    """Loads Flask application like ``flask`` command and returns its Jembe instance"""
+    from flask.cli import ScriptInfo
+
+    app = ScriptInfo(app_import_path=app_import_path).load_app()
+    jembe_state = app.extensions.get("jembe", None)
+    if jembe_state is None:
+        raise click.ClickException("Jembe extension is not initialised")
+    return app, jembe_state.jembe
+
+
+@jembe.command("compile-templates")
+@click.option(
+    "--app",
+    "app_import_path",
+    envvar="FLASK_APP",
+    help="Flask application to load, same as FLASK_APP.",
+)
+@click.option(
+    "--cache-dir",
+    help="Bytecode cache directory relative to application root. "
+    "Defaults to JEMBE_TEMPLATE_BYTECODE_CACHE config variable.",
+)
+def compile_templates(app_import_path, cache_dir):
+    """Compiles templates of all components into Jinja2 bytecode cache"""
+    app, jmb = load_jembe(app_import_path)
+    cache_dir = cache_dir or app.config.get("JEMBE_TEMPLATE_BYTECODE_CACHE")
+    if not cache_dir:
+        raise click.UsageError(
+            "Set --cache-dir or JEMBE_TEMPLATE_BYTECODE_CACHE config variable"
+        )
+
+    with app.app_context():
+        jmb.set_template_bytecode_cache(cache_dir)
+        templates, missing = jmb.compile_templates()
+
+    for full_name in missing:
+        secho(f"Template for component {full_name} does not exist", fg="red", err=True)
+    echo(f"Compiled {len(set(templates.values()))} templates into {cache_dir}")
+    if missing:
+        raise click.ClickException(f"{len(missing)} component templates are missing")
+
+
+@jembe.command()
+@click.option(
+    "--scenario",
+    "-s",
+    "scenarios",
+    multiple=True,
+    help="Scenario to run, can be repeated. Defaults to all scenarios.",
+)
+@click.option("--repeat", default=5, show_default=True, help="Measured runs.")
+@click.option(
+    "--scale",
+    default=1.0,
+    show_default=True,
+    help="Multiplies number of components, listeners and state size.",
+)
+@click.option("--output", "-o", type=click.Path(), help="Save results as JSON.")
+@click.option(
+    "--compare",
+    type=click.Path(exists=True),
+    help="JSON results of previous run to compare with.",
+)
+def bench(scenarios, repeat, scale, output, compare):
+    """Runs Jembe processor benchmark suite"""
+    import json
+    from jembe import bench as jembe_bench
+
+    def progress(name, result):
+        echo(
+            f"{name:<28} min={result['min'] * 1000:9.2f}ms "
+            f"median={result['median'] * 1000:9.2f}ms"
+        )
+
+    results = jembe_bench.run(scenarios if scenarios else None, repeat, scale, progress)
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        echo(f"Results saved to {output}")
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)
+        echo()
+        for name, ratio in jembe_bench.compare(baseline, results).items():
+            secho(
+                f"{name:<28} {ratio:6.2f}x",
+                fg="green" if ratio < 0.95 else "red" if ratio > 1.05 else None,
+            )
+
+
+@jembe.command()
+@click.argument("records", type=click.Path())
+@click.option(
+    "--app",
+    "app_import_path",
+    envvar="FLASK_APP",
+    help="Flask application to load, same as FLASK_APP.",
+)
+@click.option("--repeat", default=1, show_default=True, help="Replays per request.")
+@click.option("--output", "-o", type=click.Path(), help="Save report as JSON.")
+def replay(records, app_import_path, repeat, output):
+    """Replays x-jembe requests recorded with JEMBE_REQUEST_RECORDER"""
+    import json
+    from jembe.recorder import read_records, replay as replay_records
+
+    try:
+        records = read_records(records)
+    except FileNotFoundError as e:
+        raise click.BadParameter(str(e), param_hint="RECORDS")
+    app, _ = load_jembe(app_import_path)
+    report = replay_records(app, records, repeat)
+    echo(json.dumps(report, indent=2))
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+@jembe.command("cleanup-temp")
+@click.option(
+    "--app",
+    "app_import_path",
+    envvar="FLASK_APP",
+    help="Flask application to load, same as FLASK_APP.",
+)
+@click.option(
+    "--storage",
+    "storage_names",
+    multiple=True,
+    help="Temporary storage to clean, can be repeated. Defaults to all.",
+)
+@click.option(
+    "--uploads-max-age",
+    type=float,
+    help="Seconds. Defaults to JEMBE_TEMP_UPLOADS_MAX_AGE config variable.",
+)
+@click.option(
+    "--sessions-max-age",
+    type=float,
+    help="Seconds. Defaults to JEMBE_TEMP_SESSIONS_MAX_AGE config variable.",
+)
+@click.option(
+    "--max-size",
+    type=int,
+    help="Bytes. Defaults to JEMBE_TEMP_STORAGE_MAX_SIZE config variable.",
+)
+@click.option("--dry-run", is_flag=True, help="Only report what would be removed.")
+def cleanup_temp(
+    app_import_path, storage_names, uploads_max_age, sessions_max_age, max_size, dry_run
+):
+    """Removes abandoned upload and session dirs from temporary storages"""
+    from jembe.files import Storage
+    from jembe.cleanup import cleanup_options, cleanup_temp_storage
+
+    app, jmb = load_jembe(app_import_path)
+    options = cleanup_options(app.config)
+    for name, value in (
+        ("uploads_max_age", uploads_max_age),
+        ("sessions_max_age", sessions_max_age),
+        ("max_size", max_size),
+    ):
+        if value is not None:
+            options[name] = value
+
+    with app.app_context():
+        for storage in jmb.get_storages():
+            if storage.type != Storage.Type.TEMP or (
+                storage_names and storage.name not in storage_names
+            ):
+                continue
+            report = cleanup_temp_storage(storage, dry_run=dry_run, **options)
+            echo(
+                "{}{}: removed {} of {} dirs ({} files), reclaimed {} bytes, "
+                "{} bytes left".format(
+                    "[dry run] " if dry_run else "",
+                    storage.name,
+                    report["removed"],
+                    report["scanned"],
+                    report["files"],
+                    report["bytes_reclaimed"],
+                    report["size_after"],
+                )
+            )
+            if report["errors"]:
+                secho(
+                    f"{report['errors']} dirs could not be removed", fg="red", err=True
+                )
+
+
+@jembe.command("migrate-storage")
+@click.option(
+    "--app",
+    "app_import_path",
+    envvar="FLASK_APP",
+    help="Flask application to load, same as FLASK_APP.",
+)
+@click.option(
+    "--storage",
+    "storage_names",
+    multiple=True,
+    help="Disk storage to migrate, can be repeated. Defaults to all.",
+)
+@click.option("--dry-run", is_flag=True, help="Only report what would be moved.")
+def migrate_storage(app_import_path, storage_names, dry_run):
+    """Moves files of disk storages into layout of their shard_levels"""
+    from jembe.files import DiskStorage
+
+    app, jmb = load_jembe(app_import_path)
+    with app.app_context():
+        for storage in jmb.get_storages():
+            if not isinstance(storage, DiskStorage) or (
+                storage_names and storage.name not in storage_names
+            ):
+                continue
+            report = storage.migrate_layout(dry_run=dry_run)
+            echo(
+                "{}{} (shard levels {}): moved {} of {} files".format(
+                    "[dry run] " if dry_run else "",
+                    storage.name,
+                    storage.shard_levels,
+                    report["moved"],
+                    report["files"],
+                )
+            )
+            if report["conflicts"]:
+                secho(
+                    f"{report['conflicts']} files not moved, file with the same "
+                    "path already exists",
+                    fg="red",
+                    err=True,
+                )
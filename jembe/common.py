@@ -8,6 +8,7 @@ from typing import (
     get_args,
     get_origin,
     Protocol,
+    Optional,
 )
 import re
 import collections
@@ -304,3 +305,30 @@ def _dump_load_unspecified_warning(ttype):
         "you should be more specific in other to enable proper transformation"
         "into and out json"
     )
+
+
+def process_memory_usage() -> Optional[Dict[str, int]]:
+    """
+    Returns memory of the current process in bytes, split in memory shared
+    with other processes (forked workers) and private memory.
+
+    Returns None when memory usage can't be obtained (non Linux systems).
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            lines = smaps.readlines()
+    except OSError:
+        return None
+    usage = dict(rss=0, shared=0, private=0)
+    for line in lines:
+        field, _, value = line.partition(":")
+        if not value.strip().endswith("kB"):
+            continue
+        size = int(value.split()[0]) * 1024
+        if field == "Rss":
+            usage["rss"] = size
+        elif field.startswith("Shared_"):
+            usage["shared"] += size
+        elif field.startswith("Private_"):
+            usage["private"] += size
+    return usage
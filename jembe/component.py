@@ -11,7 +11,7 @@ from typing import (
 )
 import re
 from urllib.parse import quote_plus
-from functools import cached_property
+from functools import cached_property, lru_cache
 from copy import deepcopy, copy
 from abc import ABCMeta
 from inspect import Parameter, signature, getmembers, Signature
@@ -98,6 +98,91 @@ class ComponentState(dict):
         }
 
 
+# matches double quotes not escaped inside json strings
+_JRL_DOUBLE_QUOTE_RE = re.compile('(?<!\\\\)"')
+# types of jrl params whose dumped value can be cached by their value
+_JRL_CACHEABLE_PARAM_TYPES = (str, int, float, bool, type(None))
+
+
+@lru_cache(maxsize=1024)
+def _jrl_formatter(
+    name: str, key: str, merge_existing_params: bool, action: str
+) -> str:
+    """
+    Returns format string for JRL of the component reference
+    with {kwargs} and {action_kwargs} replacement fields.
+    """
+
+    def _escape(value: str) -> str:
+        return value.replace("{", "{{").replace("}", "}}")
+
+    jrl = (
+        "component{reset}('{name}'{{kwargs}})".format(
+            reset="_reset" if not merge_existing_params else "",
+            name=_escape(name if not key or name == ".." else f"{name}.{key}"),
+        )
+        if name != "."
+        else ""
+    )
+    jrl += (
+        ".call('{name}'{{action_kwargs}})".format(name=_escape(action))
+        if action != ComponentConfig.DEFAULT_DISPLAY_ACTION
+        else ".display()"
+    )
+    if jrl.startswith("."):
+        jrl = jrl[1:]
+    return jrl
+
+
+def _dump_jrl_params(params: dict) -> str:
+    """Dumps params to json with single instead of double quotes"""
+    params_json = dumps(params, separators=(",", ":"))
+    if "\\" not in params_json:
+        # nothing is escaped so all double quotes can be replaced
+        return params_json.replace('"', "'")
+    return _JRL_DOUBLE_QUOTE_RE.sub("'", params_json)
+
+
+@lru_cache(maxsize=4096)
+def _dump_jrl_params_cached(fingerprint: Tuple[Tuple[str, type, Any], ...]) -> str:
+    return _dump_jrl_params({name: value for name, _type, value in fingerprint})
+
+
+@lru_cache(maxsize=None)
+def context_property_names(component_class: Type["Component"]) -> Tuple[str, ...]:
+    """
+    Returns names of the component class properties added to the
+    default template context.
+
+    Class members are inspected only once per component class.
+    """
+    return tuple(
+        property_name
+        for property_name, _ in getmembers(
+            component_class,
+            lambda o: isinstance(o, property) or isinstance(o, cached_property),
+        )
+        if property_name != "previous_state"
+    )
+
+
+def jrl_params(params: dict) -> str:
+    """
+    Returns params dumped for use inside JRL.
+
+    Params with scalar values are memoized by their fingerprint
+    (name, type and value of every param), so that same params used in
+    many links are dumped only once.
+    """
+    if not params:
+        return ""
+    if all(type(v) in _JRL_CACHEABLE_PARAM_TYPES for v in params.values()):
+        return ",{}".format(
+            _dump_jrl_params_cached(tuple((k, type(v), v) for k, v in params.items()))
+        )
+    return ",{}".format(_dump_jrl_params(params))
+
+
 class ComponentReference:
     """
     Notes:
@@ -299,14 +384,7 @@ class ComponentReference:
     def url(self) -> str:
         if not self.is_accessible:
             raise NotFound()
-        if self._aditional_components:
-            backup_components = self.processor.components.copy()
-            for acomp in self._aditional_components:
-                self.processor.components[acomp.exec_name] = acomp
-            url = self.component_instance.url  # type: ignore
-            self.processor.components = backup_components
-            return url
-        else:
+        with self.processor.additional_components(*self._aditional_components):
             return self.component_instance.url  # type: ignore
 
     @cached_property
@@ -341,44 +419,17 @@ class ComponentReference:
         if is_absolute and name == ".":
             name = self.exec_name
 
-        jrl = (
-            "component{reset}('{name}'{kwargs}{key})".format(
-                reset="_reset" if not self.merge_existing_params else "",
-                name=name,
-                key=f",key='{self.key}'" if self._key else "",
-                kwargs=",{}".format(
-                    re.sub(
-                        '(?<!\\\\)"',
-                        "'",
-                        dumps(self.state_kwargs, separators=(",", ":")),
-                    )
-                )
-                if self.state_kwargs
-                else "",
-            )
-            if name != "."
-            else ""
-        )
-        jrl += (
-            # ".call('{name}',{{{kwargs}}},[{args}])".format(
-            ".call('{name}'{kwargs})".format(
-                name=self.action,
-                # args=",".join((_prep_v(v) for v in self.action_args)),
-                kwargs=",{}".format(
-                    re.sub(
-                        '(?<!\\\\)"',
-                        "'",
-                        dumps(self.action_kwargs, separators=(",", ":")),
-                    )
-                )
-                if self.action_kwargs
-                else "",
-            )
+        jrl = _jrl_formatter(
+            name,
+            self._key if name != self.exec_name else "",
+            self.merge_existing_params,
+            self.action,
+        ).format(
+            kwargs=jrl_params(self.state_kwargs) if name != "." else "",
+            action_kwargs=jrl_params(self.action_kwargs)
             if self.action != ComponentConfig.DEFAULT_DISPLAY_ACTION
-            else ".display()"
+            else "",
         )
-        if jrl.startswith("."):
-            jrl = jrl[1:]
         base_jrl = (
             self.base_jrl[:-10]
             if self.base_jrl.endswith(".display()")
@@ -990,6 +1041,35 @@ class Component(metaclass=ComponentMeta):
     def isinjected(self, param_name: str) -> bool:
         return param_name in self._jembe_injected_params_names
 
+    def etag(self) -> Optional[str]:
+        """
+        Returns version of the component used to build ETag of the page
+        for conditional http GET requests (If-None-Match).
+
+        When every component from the url path of the GET request returns
+        version and ETag of the page matches If-None-Match header,
+        display of the components is skipped and 304 Not Modified is returned.
+        Components displayed inside them are not initialised before ETag is
+        checked, so version should also cover data they display.
+
+        By default components has no version and pages are always rendered.
+        Typical implementation returns version of displayed data or
+        fingerprint of the state with params that change displayed data
+        but are not part of the state, like current user id::
+
+            def etag(self):
+                return self.state_etag(session.get("user_id"))
+        """
+        return None
+
+    def state_etag(self, *vary: Any) -> str:
+        """Returns fingerprint of the component state and vary values"""
+        return dumps(
+            [self.state.tojsondict(self, full=True), vary],
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+
     def display(self) -> "jembe.DisplayResponse":
         return self.render_template()
 
@@ -1064,11 +1144,7 @@ class Component(metaclass=ComponentMeta):
             # exec_name, key, url and all user defined properties
             **{
                 property_name: getattr(self, property_name)
-                for property_name, property in getmembers(
-                    self.__class__,
-                    lambda o: isinstance(o, property) or isinstance(o, cached_property),
-                )
-                if property_name != "previous_state"
+                for property_name in context_property_names(self.__class__)
             },
             # command to render subcomponents
             "component": self._jinja2_component,
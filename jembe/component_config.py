@@ -20,7 +20,6 @@ from inspect import getmembers, isfunction, signature, Parameter
 
 from jembe.common import import_by_name
 from .exceptions import AccessDenied, JembeError
-from flask import url_for
 
 if TYPE_CHECKING:  # pragma: no cover
     import inspect
@@ -563,6 +562,7 @@ class ComponentConfig(metaclass=ComponentConfigMeta):
             url_query_params (Optional[Dict[str, str]], optional): _description_. Defaults to None.
         """
 
+        self._template_set = template is not None
         # use default template if template name is not provided
         if template is None:
             self.template: Tuple[str, ...] = self.default_template_names
@@ -680,7 +680,21 @@ class ComponentConfig(metaclass=ComponentConfigMeta):
                 cmp = processor.components[en]
 
             url_params.update(cmp._config.get_raw_url_params(cmp.state, cmp.key))
-        return url_for(self.endpoint, **url_params)
+        return processor.jembe.component_url(self.full_name, url_params)
+
+    @property
+    def template_required(self) -> bool:
+        """Component can't be displayed without template.
+
+        Template is required when it is explicitly set or when component
+        uses default ``display`` which renders template.
+        """
+        from .component import Component
+
+        return (
+            self._template_set
+            or getattr(self.component_class, "display", None) is Component.display
+        )
 
     @property
     def default_template_names(self) -> Tuple[str, ...]:
@@ -734,9 +748,9 @@ class ComponentConfig(metaclass=ComponentConfigMeta):
         processor: "jembe.Processor" = get_processor()
         configs: Dict[str, "jembe.ComponentConfig"] = dict()
         for component_name in self.components.keys():
-            configs[component_name] = processor.jembe.components_configs[
+            configs[component_name] = processor.jembe.get_component_config(
                 f"{self.full_name}/{component_name}"
-            ]
+            )
         return configs
 
     @property
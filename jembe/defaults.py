@@ -1,10 +1,38 @@
 from os import path
 
 DEFAULT_JEMBE_MEDIA_FOLDER = path.join("..", "data", "media")
+DEFAULT_JEMBE_COMPONENT_ROUTER = False
+DEFAULT_JEMBE_LAZY_COMPONENTS = False
+DEFAULT_JEMBE_TEMPLATE_BYTECODE_CACHE = None
+DEFAULT_JEMBE_METRICS = False
+DEFAULT_JEMBE_METRICS_ACCESS = None
+DEFAULT_JEMBE_SLOW_REQUEST_THRESHOLD = None
+DEFAULT_JEMBE_MEMORY_PROFILE = False
+DEFAULT_JEMBE_REQUEST_RECORDER = None
+DEFAULT_JEMBE_REQUEST_RECORDER_REDACT = False
+DEFAULT_JEMBE_REQUEST_RECORDER_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_JEMBE_REQUEST_RECORDER_BACKUP_COUNT = 3
+DEFAULT_JEMBE_UPLOAD_MAX_FILE_SIZE = None
+DEFAULT_JEMBE_UPLOAD_MAX_REQUEST_SIZE = None
+DEFAULT_JEMBE_UPLOAD_ALLOWED_EXTENSIONS = None
+DEFAULT_JEMBE_UPLOAD_ALLOWED_CONTENT_TYPES = None
+DEFAULT_JEMBE_TEMP_UPLOADS_MAX_AGE = 24 * 60 * 60
+DEFAULT_JEMBE_TEMP_SESSIONS_MAX_AGE = 7 * 24 * 60 * 60
+DEFAULT_JEMBE_TEMP_STORAGE_MAX_SIZE = None
+DEFAULT_JEMBE_TEMP_CLEANUP_INTERVAL = None
+DEFAULT_JEMBE_TEMP_CLEANUP_BATCH_SIZE = 100
+DEFAULT_JEMBE_TEMP_CLEANUP_BATCH_PAUSE = 0.05
+DEFAULT_JEMBE_PUBLIC_FILES_MAX_AGE = 365 * 24 * 60 * 60
+DEFAULT_JEMBE_CACHE_VERSION_WORKERS = 2
+DEFAULT_JEMBE_CACHE_VERSION_LOCK_TIMEOUT = 5 * 60
 DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER = "UPLOADS"
 DEFAULT_SESSION_TEMP_STORAGE_ID = "jembe_temp_storage_id"
 DEFAULT_SESSION_TEMP_STORAGE_SUBDIR = "WORKINPROGRESS"
 DEFAULT_STORAGE_CACHE_FOLDER = "CACHE"
+# lock and failure markers of cache versions, never served
+DEFAULT_STORAGE_CACHE_STATE_FOLDER = ".CACHE_STATE"
+DEFAULT_STORAGE_BLOBS_FOLDER = "BLOBS"
+DEFAULT_STORAGE_BUFFER_SIZE = 1024 * 1024
 
 PUBLIC_STORAGE_NAME = "public"
 PRIVATE_STORAGE_NAME = "private"
@@ -37,6 +37,10 @@ class Gone(we.Gone):
     pass
 
 
+class RequestEntityTooLarge(we.RequestEntityTooLarge):
+    pass
+
+
 class InternalServerError(we.InternalServerError):
     pass
 
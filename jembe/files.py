@@ -1,21 +1,37 @@
-from typing import TYPE_CHECKING, Union, Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Union, Any, Dict, List, Optional, Tuple, cast
 from enum import Enum
+from functools import partial
+import errno
+import hashlib
+import mimetypes
 import shutil
+import stat
 import os
-from io import BufferedIOBase, TextIOBase, RawIOBase, IOBase
+from io import BufferedIOBase, FileIO, TextIOBase, RawIOBase, IOBase
 from abc import ABC, abstractmethod
+from urllib.parse import quote
 from uuid import uuid4
 
-from flask import session, current_app, url_for, send_from_directory
+from flask import request, session, current_app, send_file
 from werkzeug.datastructures import FileStorage
+from werkzeug.security import safe_join
 from werkzeug.utils import cached_property, secure_filename
-from .app import get_private_storage, get_public_storage, get_storage, get_temp_storage
+from .app import (
+    get_jembe,
+    get_private_storage,
+    get_public_storage,
+    get_storage,
+    get_temp_storage,
+)
 from .exceptions import NotFound
 from .common import JembeInitParamSupport
 from .defaults import (
     DEFAULT_SESSION_TEMP_STORAGE_ID,
     DEFAULT_SESSION_TEMP_STORAGE_SUBDIR,
+    DEFAULT_STORAGE_BUFFER_SIZE,
+    DEFAULT_STORAGE_BLOBS_FOLDER,
     DEFAULT_STORAGE_CACHE_FOLDER,
+    DEFAULT_STORAGE_CACHE_STATE_FOLDER,
     DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER,
 )
 
@@ -24,6 +40,10 @@ if TYPE_CHECKING:
     from flask import Response
 
 JEMBE_FILES_ACCESS_GRANTED = "jembe_files_access_granted"
+# sha1 hex digest has 20 two character prefixes
+SHARD_MAX_LEVELS = 20
+# marks hash prefix dirs, secure_filename never starts file names with it
+SHARD_DIR_PREFIX = "_"
 JEMBE_FILES_ACCESS_GRANTED_MAX_SIZE = 500
 
 
@@ -31,15 +51,25 @@ class File(JembeInitParamSupport):
     storage: "Storage"
     path: str
 
-    def __init__(self, storage: Union[str, "jembe.Storage"], file_path: str):
+    def __init__(
+        self,
+        storage: Union[str, "jembe.Storage"],
+        file_path: str,
+        size: Optional[int] = None,
+        digest: Optional[str] = None,
+    ):
         """
         Represents file inside Jembe File Storage
 
         storage -- instance or the name of the storage
         file_path -- full file path inside the storage.
+        size -- size in bytes, when known (set by storage when file is stored)
+        digest -- hex digest of the file content, when known
         """
         self.storage = storage if not isinstance(storage, str) else get_storage(storage)
         self.path = file_path
+        self.size = size
+        self.digest = digest
 
     @property
     def accessible(self) -> bool:
@@ -77,13 +107,21 @@ class File(JembeInitParamSupport):
                 self.get_original().grant_access()
             else:
                 self.grant_access()
-        return url_for(
-            "jembe./jembe/file",
-            component_key="",
-            component_key__1="",
-            storage_name__1=self.storage.name,
-            file_path__1=self.path,
+        url = get_jembe().component_url(
+            "/jembe/file",
+            dict(
+                component_key="",
+                component_key__1="",
+                storage_name__1=self.storage.name,
+                file_path__1=self.path,
+            ),
         )
+        if self.in_public_storage():
+            # paths are reused so version makes url safe to cache as immutable
+            version = self.storage.get_version(self.path)
+            if version is not None:
+                url = "{}?v={}".format(url, quote(version))
+        return url
 
     @property
     def basename(self) -> str:
@@ -103,9 +141,9 @@ class File(JembeInitParamSupport):
     def move_to(
         self, storage: Union["jembe.Storage", str], subdir: str = ""
     ) -> "jembe.File":
-        file = self.copy_to(storage, subdir)
-        self.storage.remove(self.path)
-        return file
+        if isinstance(storage, str):
+            storage = get_storage(storage)
+        return storage.move_file(self, subdir)
 
     def copy_to_public(self, subdir: str = "") -> "jembe.File":
         return self.copy_to(get_public_storage(), subdir)
@@ -214,7 +252,154 @@ class File(JembeInitParamSupport):
         return hash((self.storage, self.path))
 
     def __copy__(self) -> "jembe.File":
-        return File(self.storage, self.path)
+        return File(self.storage, self.path, self.size, self.digest)
+
+
+def _copy_file_range(src: IOBase, dst: IOBase, buffer_size: int) -> bool:
+    """
+    Copies src to dst inside the kernel with copy_file_range or sendfile.
+
+    Returns False, without copying anything, when src or dst are not real
+    files or when zero-copy is not supported by the platform or file system.
+    """
+    # fileno of in memory files (like SpooledTemporaryFile) is not called
+    # because it can write them to disk
+    if not isinstance(getattr(src, "raw", src), FileIO) or not isinstance(
+        getattr(dst, "raw", dst), FileIO
+    ):
+        return False
+    in_fd, out_fd = src.fileno(), dst.fileno()
+    if not stat.S_ISREG(os.fstat(in_fd).st_mode):
+        return False
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is None and not hasattr(os, "sendfile"):
+        return False
+    # align os file offsets with python buffered positions
+    dst.flush()
+    os.lseek(in_fd, src.tell(), os.SEEK_SET)
+    copied = 0
+    while True:
+        try:
+            if copy_file_range is not None:
+                sent = copy_file_range(in_fd, out_fd, buffer_size)
+            else:
+                sent = os.sendfile(out_fd, in_fd, None, buffer_size)
+        except OSError as e:
+            if copied == 0 and e.errno in (
+                errno.EXDEV,
+                errno.ENOSYS,
+                errno.EINVAL,
+                errno.ENOTSUP,
+                errno.EBADF,
+            ):
+                if copy_file_range is not None and hasattr(os, "sendfile"):
+                    # try with sendfile
+                    copy_file_range = None
+                    continue
+                return False
+            raise
+        if sent == 0:
+            # move python position of src to the end of copied data
+            src.seek(os.lseek(in_fd, 0, os.SEEK_CUR))
+            return True
+        copied += sent
+
+
+# ioctl request to clone file, from linux/fs.h
+FICLONE = 0x40049409
+
+
+def _shard_dirs(filename: str, levels: int) -> List[str]:
+    """Returns hash prefix dirs of file in sharded DiskStorage"""
+    digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+    return [SHARD_DIR_PREFIX + digest[2 * i : 2 * i + 2] for i in range(levels)]
+
+
+def _is_shard_dir(name: str) -> bool:
+    return (
+        len(name) == 3
+        and name.startswith(SHARD_DIR_PREFIX)
+        and all(c in "0123456789abcdef" for c in name[1:])
+    )
+
+
+def _list_shard_dir(disk_dir: str, levels: int) -> List[str]:
+    """Returns names of files inside hash prefix dir and its sub prefix dirs"""
+    if not levels:
+        return os.listdir(disk_dir)
+    names = []
+    for name in os.listdir(disk_dir):
+        if os.path.isdir(os.path.join(disk_dir, name)):
+            names.extend(_list_shard_dir(os.path.join(disk_dir, name), levels - 1))
+    return names
+
+
+def _reflink(src: str, dst: str):
+    """Clones src file into new dst file sharing data blocks (copy-on-write)"""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.ENOTSUP, "Reflink is not supported", dst)
+    with open(src, "rb") as src_file:
+        with open(dst, "xb") as dst_file:
+            try:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            except OSError:
+                dst_file.close()
+                os.remove(dst)
+                raise
+
+
+def copy_file_object(
+    src: IOBase,
+    dst: IOBase,
+    buffer_size: int = DEFAULT_STORAGE_BUFFER_SIZE,
+    hash_algorithm: Optional[str] = None,
+) -> Tuple[int, Optional[str]]:
+    """
+    Copies src file object from its current position to dst in chunks of
+    buffer_size, so that memory used does not depend on the file size.
+
+    When both files are real files and hash is not required, data is copied
+    by the kernel (copy_file_range or sendfile).
+
+    Returns size of dst in bytes and hex digest of copied data when
+    hash_algorithm (name accepted by hashlib.new) is provided.
+    """
+    if hash_algorithm is None and not isinstance(src, TextIOBase):
+        if _copy_file_range(src, dst, buffer_size):
+            return os.fstat(dst.fileno()).st_size, None
+    digest = hashlib.new(hash_algorithm) if hash_algorithm is not None else None
+    if isinstance(src, TextIOBase):
+        encoding = getattr(dst, "encoding", None) or "utf-8"
+        while True:
+            text = src.read(buffer_size)
+            if not text:
+                break
+            dst.write(text)
+            if digest is not None:
+                digest.update(text.encode(encoding))
+    else:
+        readinto = getattr(src, "readinto", None)
+        buffer = bytearray(buffer_size)
+        with memoryview(buffer) as view:
+            while True:
+                if readinto is not None:
+                    chunk = view[: readinto(buffer) or 0]
+                else:
+                    chunk = src.read(buffer_size)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+                if isinstance(chunk, memoryview):
+                    chunk.release()
+    dst.flush()
+    return (
+        os.fstat(dst.fileno()).st_size,
+        digest.hexdigest() if digest is not None else None,
+    )
 
 
 class Storage(ABC):
@@ -239,6 +424,12 @@ class Storage(ABC):
         Check if file inside storage can be accessed
         by current user using http request
         """
+        if (
+            os.path.normpath(file_path).split(os.sep)[0]
+            == DEFAULT_STORAGE_CACHE_STATE_FOLDER
+        ):
+            # locks and failure markers of cache versions
+            return False
         if self.type == self.Type.TEMP:
             if DEFAULT_SESSION_TEMP_STORAGE_ID in session and file_path.startswith(
                 "{}/{}/".format(
@@ -308,10 +499,41 @@ class Storage(ABC):
             pass
 
     def send_file(self, file_path: str) -> "Response":
-        """send file via http response"""
-        if self.can_access_file(file_path):
-            return self.send_file_raw(file_path)
-        raise NotFound()
+        """
+        send file via http response
+
+        Files of public storage requested with current version (v query
+        param of File.url) are cached as immutable for
+        JEMBE_PUBLIC_FILES_MAX_AGE seconds, without it they are public and
+        revalidated with ETag on every use. Other files are private and
+        revalidated on every use.
+        """
+        if not self.can_access_file(file_path):
+            raise NotFound()
+        response = self.send_file_raw(file_path)
+        max_age = get_jembe().public_files_max_age
+        version = request.args.get("v")
+        if self.type == self.Type.PUBLIC:
+            response.cache_control.public = True
+            if (
+                max_age
+                and version is not None
+                and version == self.get_version(file_path)
+            ):
+                response.cache_control.no_cache = None
+                response.cache_control.max_age = max_age
+                response.cache_control.immutable = True
+            else:
+                response.cache_control.max_age = None
+                response.cache_control.no_cache = True
+                response.expires = None
+        else:
+            response.cache_control.public = False
+            response.cache_control.private = True
+            response.cache_control.max_age = None
+            response.cache_control.no_cache = True
+            response.expires = None
+        return response
 
     def store_file(
         self,
@@ -333,7 +555,23 @@ class Storage(ABC):
         subdir -- path iniside storage where file should be saved
         filename -- optionaly overide filename
         """
-        # Check if subdir is valid when storing file
+        self._check_subdir(subdir)
+        return self.store_file_raw(file=file, subdir=subdir, filename=filename)
+
+    def move_file(
+        self, file: "jembe.File", subdir: str = "", filename: Optional[str] = None
+    ) -> "jembe.File":
+        """
+        Move file inside this storage dir with unique file name inside subdir
+        and remove it from its original storage
+
+        filename -- optionaly overide filename
+        """
+        self._check_subdir(subdir)
+        return self.move_file_raw(file, subdir, filename)
+
+    def _check_subdir(self, subdir: str):
+        """Check if subdir is valid when storing file"""
         if self.type == self.Type.TEMP:
             if not subdir.startswith(
                 "{}/".format(DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER)
@@ -353,7 +591,6 @@ class Storage(ABC):
                 "Invalid storage subdir '{}': Cant store files directly "
                 "inside CACHE dir in storage '{}'.".format(subdir, self.name)
             )
-        return self.store_file_raw(file=file, subdir=subdir, filename=filename)
 
     def store_cache_version_of_file(
         self,
@@ -439,7 +676,14 @@ class Storage(ABC):
                 ),
             )
         )
-        return File(storage=self, file_path=full_path)
+        cache_file = File(storage=self, file_path=full_path)
+        cache_versions = get_jembe().cache_versions
+        if cache_name in cache_versions:
+            # generate registred cache version when it does not exist
+            return cache_versions.get(
+                File(storage=self, file_path=file_path), cache_file, cache_name
+            )
+        return cache_file
 
     def get_original_file(self, cache_file_path: str) -> "jembe.File":
         if not cache_file_path.startswith("{}/".format(DEFAULT_STORAGE_CACHE_FOLDER)):
@@ -455,6 +699,10 @@ class Storage(ABC):
             self.remove_raw(file_path)
         except Exception as e:
             current_app.logger.warning(e)
+        self._remove_file_leftovers(file_path)
+
+    def _remove_file_leftovers(self, file_path: str):
+        """Removes cache versions of removed file and empty dirs"""
         cache_subdir = self._get_cache_subdir(file_path)
         if cache_subdir and self.exists(cache_subdir):
             self.rmtree(cache_subdir)
@@ -494,6 +742,14 @@ class Storage(ABC):
     ) -> "jembe.File":
         raise NotImplementedError()
 
+    def move_file_raw(
+        self, file: "jembe.File", subdir: str = "", filename: Optional[str] = None
+    ) -> "jembe.File":
+        """Moves file into this storage by copying it and removing the original"""
+        new_file = self.store_file_raw(file, subdir, filename)
+        file.storage.remove(file.path)
+        return new_file
+
     def open(
         self,
         file_path: str,
@@ -567,6 +823,24 @@ class Storage(ABC):
     def dirname(self, path: str) -> str:
         raise NotImplementedError()
 
+    def listdir(self, dir_path: str) -> List[str]:
+        """Returns names of files and dirs inside dir_path"""
+        raise NotImplementedError()
+
+    def getsize(self, file_path: str) -> int:
+        raise NotImplementedError()
+
+    def getmtime(self, path: str) -> float:
+        """Returns time of last modification as seconds since the epoch"""
+        raise NotImplementedError()
+
+    def get_version(self, file_path: str) -> Optional[str]:
+        """
+        Returns token that changes when content of the file changes or None
+        when storage can't tell, it is used to version urls of public files
+        """
+        return None
+
     def __eq__(self, o: object) -> bool:
         if not isinstance(o, Storage):
             return False
@@ -577,14 +851,71 @@ class Storage(ABC):
 
 
 class DiskStorage(Storage):
-    """Stores files on disk"""
+    """
+    Stores files on disk
+
+    When shard_levels is set files are stored inside hash prefix dirs of
+    their subdir, for example file "docs/report.pdf" is stored as
+    "docs/_ab/_cd/report.pdf" with two shard levels, so that no dir contains
+    too many files. File.path and all storage methods use paths without
+    hash prefix dirs. In sharded storage dirs named with underscore and two
+    hex characters are reserved for hash prefix dirs and can't be used as
+    subdirs. Use migrate_layout (or
+    ``jembe migrate-storage`` command) after changing shard_levels of
+    existing storage.
+    """
+
+    class CopyPolicy(Enum):
+        # copy file content
+        COPY = "copy"
+        # create hard link to the same file when storages are on the same device,
+        # changes of one file are visible in the other
+        HARDLINK = "hardlink"
+        # clone file sharing data blocks until changed (copy-on-write),
+        # supported by Btrfs, XFS and similar file systems
+        REFLINK = "reflink"
+
+    # files of this storage can be linked or renamed into other storages
+    _links_files = True
+    # top dirs not affected by shard_levels
+    _unsharded_dirs: Tuple[str, ...] = (DEFAULT_STORAGE_CACHE_STATE_FOLDER,)
 
     def __init__(
-        self, name: str, folder: str, type: "jembe.Storage.Type" = Storage.Type.PUBLIC
+        self,
+        name: str,
+        folder: str,
+        type: "jembe.Storage.Type" = Storage.Type.PUBLIC,
+        buffer_size: int = DEFAULT_STORAGE_BUFFER_SIZE,
+        hash_algorithm: Optional[str] = None,
+        copy_policy: "jembe.DiskStorage.CopyPolicy" = CopyPolicy.COPY,
+        shard_levels: int = 0,
+        accel_redirect: Optional[str] = None,
     ):
+        """
+        buffer_size -- size of chunks used when copying files into storage
+        hash_algorithm -- when set (for example "sha256") digest of stored files
+            is calculated while copying and returned as File.digest
+        copy_policy -- how files from other DiskStorage are copied into this
+            storage, falls back to copy when policy is not supported
+        shard_levels -- number of hash prefix dirs in which files are stored
+        accel_redirect -- internal nginx location of the storage folder, when
+            set files are sent by nginx with X-Accel-Redirect header
+            (for X-Sendfile set USE_X_SENDFILE Flask config variable)
+        """
         super().__init__(name, type=type)
 
         self._folder = folder
+        self.buffer_size = buffer_size
+        self.hash_algorithm = hash_algorithm
+        self.copy_policy = copy_policy
+        if not 0 <= shard_levels <= SHARD_MAX_LEVELS:
+            raise ValueError(
+                "Storage '{}': shard_levels must be between 0 and {}".format(
+                    name, SHARD_MAX_LEVELS
+                )
+            )
+        self.shard_levels = shard_levels
+        self.accel_redirect = accel_redirect
 
     @cached_property
     def folder(self) -> str:
@@ -592,8 +923,51 @@ class DiskStorage(Storage):
             return os.path.join(current_app.root_path, self._folder)  # type:ignore
         return self._folder
 
+    def _shard_path(self, file_path: str) -> str:
+        """Returns path of the file inside hash prefix dirs of sharded storage"""
+        if not self.shard_levels:
+            return file_path
+        dirname, basename = os.path.split(file_path)
+        shard_dirs = _shard_dirs(basename, self.shard_levels)
+        return os.path.join(dirname, *shard_dirs, basename)
+
+    def _disk_path(self, file_path: str) -> str:
+        return os.path.join(self.folder, self._shard_path(file_path))
+
+    def _check_subdir(self, subdir: str):
+        super()._check_subdir(subdir)
+        if self.shard_levels and any(_is_shard_dir(d) for d in subdir.split("/")):
+            raise ValueError(
+                "Invalid storage subdir '{}': Names of hash prefix dirs can't be "
+                "used as subdirs in sharded storage '{}'.".format(subdir, self.name)
+            )
+
     def send_file_raw(self, file_path: str) -> "Response":
-        return send_from_directory(self.folder, file_path)
+        """
+        Sends file with strong ETag and Last-Modified headers, Range
+        requests are answered with 206 Partial Content
+        """
+        shard_path = self._shard_path(file_path)
+        disk_path = safe_join(self.folder, shard_path)
+        if disk_path is None or not os.path.isfile(disk_path):
+            raise NotFound()
+        if self.accel_redirect is not None:
+            # nginx sends the file and handles conditional and range requests
+            response = current_app.response_class(
+                mimetype=mimetypes.guess_type(file_path)[0]
+                or "application/octet-stream"
+            )
+            response.headers["X-Accel-Redirect"] = quote(
+                "/".join(
+                    (self.accel_redirect.rstrip("/"), shard_path.replace(os.sep, "/"))
+                )
+            )
+            return response
+        return send_file(disk_path, etag=self._file_etag(disk_path), conditional=True)
+
+    def _file_etag(self, disk_path: str) -> Union[bool, str]:
+        """Returns ETag of the file or True to generate it from mtime and size"""
+        return True
 
     def _get_unique_filename(self, filename: Optional[str], subdir: str) -> str:
         sfn = secure_filename(filename if filename is not None else "unnamed")
@@ -623,21 +997,24 @@ class DiskStorage(Storage):
         file -- Jembe File instance or full file path relative to JEMBE_UPLOAD_FOLDER
         """
         if isinstance(file, File):
-            sfn = self._get_unique_filename(file.basename, subdir)
+            sfn = self._get_unique_filename(
+                filename if filename is not None else file.basename, subdir
+            )
             if isinstance(file.storage, DiskStorage):
-                os.makedirs(os.path.join(self.folder, subdir), exist_ok=True)
-                shutil.copy(
-                    os.path.join(file.storage.folder, file.path),
-                    os.path.join(self.folder, subdir, sfn),
-                )
-                return File(self, os.path.join(subdir, sfn))
+                if (
+                    self.copy_policy != self.CopyPolicy.COPY
+                    and file.storage._links_files
+                ):
+                    linked_file = self._link_file(file, subdir, sfn)
+                    if linked_file is not None:
+                        return linked_file
+                with file.open(mode="rb") as src:
+                    return self._store_file_object(src, subdir, sfn)
             else:
                 raise NotImplementedError()
         elif isinstance(file, FileStorage):
             sfn = self._get_unique_filename(file.filename, subdir)
-            os.makedirs(os.path.join(self.folder, subdir), exist_ok=True)
-            file.save(os.path.join(self.folder, subdir, sfn))
-            return File(self, os.path.join(subdir, sfn))
+            return self._store_file_object(file.stream, subdir, sfn)
         elif isinstance(file, IOBase):
             if filename is None:
                 raise ValueError(
@@ -646,35 +1023,113 @@ class DiskStorage(Storage):
                     )
                 )
             sfn = self._get_unique_filename(filename, subdir)
-            os.makedirs(os.path.join(self.folder, subdir), exist_ok=True)
-            new_file = File(self, os.path.join(subdir, sfn))
-            if isinstance(file, (BufferedIOBase, RawIOBase)):
-                fio = new_file.open(mode="wb")
-                file.seek(0)
-                fio.write(file.read())
-                fio.close()
-                return new_file
-            elif isinstance(file, TextIOBase):
-                fio = new_file.open(mode="w")
-                file.seek(0)
-                fio.write(file.read())
-                fio.close()
-                return new_file
+            file.seek(0)
+            return self._store_file_object(file, subdir, sfn)
         else:
             # file is instance of str
             raise NotImplementedError()
 
+    def _store_file_object(
+        self, file: "IOBase", subdir: str, filename: str
+    ) -> "jembe.File":
+        """Copies file object into subdir/filename in chunks"""
+        os.makedirs(os.path.join(self.folder, subdir), exist_ok=True)
+        while True:
+            file_path = os.path.join(subdir, filename)
+            try:
+                fio = self.open_raw(
+                    file_path, mode="x" if isinstance(file, TextIOBase) else "xb"
+                )
+            except FileExistsError:
+                # file with the same name is stored by concurrent request
+                filename = self._get_unique_filename(filename, subdir)
+                continue
+            with fio:
+                size, digest = copy_file_object(
+                    file, fio, self.buffer_size, self.hash_algorithm
+                )
+            return File(self, file_path, size, digest)
+
+    def _link_file(
+        self, file: "jembe.File", subdir: str, filename: str
+    ) -> Optional["jembe.File"]:
+        """
+        Stores file from other DiskStorage as hard link or reflink, depending
+        of copy_policy. Returns None when link can't be created.
+        """
+        src = cast(DiskStorage, file.storage)._disk_path(file.path)
+        file_path = os.path.join(subdir, filename)
+        dst = self._disk_path(file_path)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        try:
+            if self.copy_policy == self.CopyPolicy.HARDLINK:
+                os.link(src, dst)
+            else:
+                _reflink(src, dst)
+        except OSError:
+            return None
+        return File(self, file_path, os.stat(dst).st_size, file.digest)
+
+    def move_file_raw(
+        self, file: "jembe.File", subdir: str = "", filename: Optional[str] = None
+    ) -> "jembe.File":
+        """Renames file when both storages are on the same device"""
+        if not isinstance(file.storage, DiskStorage) or not file.storage._links_files:
+            return super().move_file_raw(file, subdir, filename)
+        src = file.storage._disk_path(file.path)
+        os.makedirs(os.path.join(self.folder, subdir), exist_ok=True)
+        if os.stat(src).st_dev != os.stat(os.path.join(self.folder, subdir)).st_dev:
+            return super().move_file_raw(file, subdir, filename)
+        sfn = self._get_unique_filename(
+            filename if filename is not None else file.basename, subdir
+        )
+        while True:
+            file_path = os.path.join(subdir, sfn)
+            dst = self._disk_path(file_path)
+            if self.shard_levels:
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+            try:
+                # unlike rename, link does not replace file with the same
+                # name stored by concurrent request
+                os.link(src, dst)
+            except FileExistsError:
+                sfn = self._get_unique_filename(sfn, subdir)
+                continue
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    return super().move_file_raw(file, subdir, filename)
+                # file system without hard links
+                os.rename(src, dst)
+            else:
+                os.remove(src)
+            break
+        file.storage._remove_file_leftovers(file.path)
+        return File(self, file_path, os.stat(dst).st_size, file.digest)
+
     def remove_raw(self, file_path: str):
-        os.remove(os.path.join(self.folder, file_path))
+        os.remove(self._disk_path(file_path))
+        self._remove_shard_dirs(file_path)
+
+    def _remove_shard_dirs(self, file_path: str):
+        """Removes empty hash prefix dirs of removed file"""
+        disk_path = self._disk_path(file_path)
+        for _ in range(self.shard_levels):
+            disk_path = os.path.dirname(disk_path)
+            try:
+                os.rmdir(disk_path)
+            except OSError:
+                break
 
     def isdir(self, dir_path: str) -> bool:
         return os.path.isdir(os.path.join(self.folder, dir_path))
 
     def isfile(self, file_path: str) -> bool:
-        return os.path.isfile(os.path.join(self.folder, file_path))
+        return os.path.isfile(self._disk_path(file_path))
 
     def exists(self, path: str) -> bool:
-        return os.path.exists(os.path.join(self.folder, path))
+        return os.path.exists(self._disk_path(path)) or (
+            self.shard_levels > 0 and os.path.isdir(os.path.join(self.folder, path))
+        )
 
     def makedirs(self, path: str, mode=0o777):
         os.makedirs(os.path.join(self.folder, path), mode, exist_ok=True)
@@ -691,6 +1146,326 @@ class DiskStorage(Storage):
     def dirname(self, path: str) -> str:
         return os.path.dirname(path)
 
+    def listdir(self, dir_path: str) -> List[str]:
+        disk_dir = os.path.join(self.folder, dir_path)
+        if not self.shard_levels:
+            return os.listdir(disk_dir)
+        names = []
+        for name in os.listdir(disk_dir):
+            if _is_shard_dir(name) and os.path.isdir(os.path.join(disk_dir, name)):
+                names.extend(
+                    _list_shard_dir(os.path.join(disk_dir, name), self.shard_levels - 1)
+                )
+            else:
+                names.append(name)
+        return names
+
+    def getsize(self, file_path: str) -> int:
+        return os.path.getsize(self._disk_path(file_path))
+
+    def getmtime(self, path: str) -> float:
+        disk_path = self._disk_path(path)
+        if self.shard_levels and not os.path.exists(disk_path):
+            disk_path = os.path.join(self.folder, path)
+        return os.path.getmtime(disk_path)
+
+    def get_version(self, file_path: str) -> Optional[str]:
+        try:
+            file_stat = os.stat(self._disk_path(file_path))
+        except OSError:
+            return None
+        return "{:x}-{:x}".format(file_stat.st_mtime_ns, file_stat.st_size)
+
+    def migrate_layout(self, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Moves files stored with different shard_levels (including files of
+        not sharded storage) into hash prefix dirs of current shard_levels
+        and removes empty hash prefix dirs.
+
+        Returns number of files, moved files and files not moved because
+        file with the same path already exists.
+        """
+        report = dict(files=0, moved=0, conflicts=0)
+        for root, _, files in os.walk(self.folder, topdown=False):
+            rel_root = os.path.relpath(root, self.folder)
+            parts = [] if rel_root == os.curdir else rel_root.split(os.sep)
+            if parts and parts[0] in self._unsharded_dirs:
+                continue
+            for name in files:
+                report["files"] += 1
+                shard_dirs = _shard_dirs(name, SHARD_MAX_LEVELS)
+                # strip hash prefix dirs of any depth
+                levels = len(parts)
+                while levels > 0 and parts[-levels:] != shard_dirs[:levels]:
+                    levels -= 1
+                file_path = os.path.join(*parts[: len(parts) - levels], name)
+                src = os.path.join(root, name)
+                dst = self._disk_path(file_path)
+                if src == dst:
+                    continue
+                if os.path.exists(dst):
+                    report["conflicts"] += 1
+                    continue
+                report["moved"] += 1
+                if not dry_run:
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    os.rename(src, dst)
+            if not dry_run and parts and _is_shard_dir(parts[-1]):
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    # not empty
+                    pass
+        return report
+
+    def open_raw(
+        self,
+        file_path: str,
+        mode: str = "r",
+        buffering=-1,
+        encoding=None,
+        errors=None,
+        newline=None,
+        closefd=True,
+        opener=None,
+    ):
+        disk_path = self._disk_path(file_path)
+        open_file = partial(
+            open,
+            disk_path,
+            mode=mode,
+            buffering=buffering,
+            encoding=encoding,
+            errors=errors,
+            newline=newline,
+            closefd=closefd,
+            opener=opener,
+        )
+        try:
+            return open_file()
+        except FileNotFoundError:
+            if not self.shard_levels or not any(m in mode for m in "wxa"):
+                raise
+        # create missing hash prefix dirs
+        os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+        return open_file()
+
+
+class DedupDiskStorage(DiskStorage):
+    """
+    Stores content of identical files on disk only once
+
+    Content of every stored file is kept as blob named by its sha256 digest
+    inside BLOBS dir of the storage and stored files are hard links to their
+    blobs, so that reference count of the blob is number of its links and
+    storing file with already stored content only creates new link. Blob is
+    removed together with its last file. Storage dir must be on file system
+    that supports hard links.
+
+    Files are copy-on-write: opening file for writing replaces it with new
+    file not shared with other files. Files are always copied (never linked
+    or renamed) into other storages.
+    """
+
+    HASH_ALGORITHM = "sha256"
+    # blob digest is kept in extended attribute when file system supports it
+    DIGEST_XATTR = "user.jembe.sha256"
+
+    _links_files = False
+    _unsharded_dirs = (DEFAULT_STORAGE_BLOBS_FOLDER, DEFAULT_STORAGE_CACHE_STATE_FOLDER)
+
+    def __init__(
+        self,
+        name: str,
+        folder: str,
+        type: "jembe.Storage.Type" = Storage.Type.PUBLIC,
+        buffer_size: int = DEFAULT_STORAGE_BUFFER_SIZE,
+        shard_levels: int = 0,
+    ):
+        super().__init__(
+            name,
+            folder,
+            type=type,
+            buffer_size=buffer_size,
+            hash_algorithm=self.HASH_ALGORITHM,
+            shard_levels=shard_levels,
+        )
+
+    def get_version(self, file_path: str) -> Optional[str]:
+        digest = self._file_etag(self._disk_path(file_path))
+        if isinstance(digest, str):
+            return digest[:16]
+        return super().get_version(file_path)
+
+    def _file_etag(self, disk_path: str) -> Union[bool, str]:
+        """Uses content digest as ETag when it is kept in blob xattr"""
+        try:
+            return os.getxattr(disk_path, self.DIGEST_XATTR).decode("ascii")
+        except (AttributeError, OSError):
+            return True
+
+    def _check_subdir(self, subdir: str):
+        super()._check_subdir(subdir)
+        if subdir.split("/")[0] == DEFAULT_STORAGE_BLOBS_FOLDER:
+            raise ValueError(
+                "Invalid storage subdir '{}': Cant store files inside BLOBS dir "
+                "in storage '{}'.".format(subdir, self.name)
+            )
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(
+            self.folder, DEFAULT_STORAGE_BLOBS_FOLDER, digest[:2], digest[2:4], digest
+        )
+
+    def _file_digest(self, disk_path: str) -> str:
+        """Returns digest of file content, from blob xattr when available"""
+        try:
+            return os.getxattr(disk_path, self.DIGEST_XATTR).decode("ascii")
+        except (AttributeError, OSError):
+            pass
+        file_hash = hashlib.new(self.HASH_ALGORITHM)
+        with open(disk_path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.buffer_size), b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def store_file_raw(
+        self,
+        file: Union[
+            "jembe.File",
+            "FileStorage",
+            "BufferedIOBase",
+            "TextIOBase",
+            "RawIOBase",
+            str,
+        ],
+        subdir: str = "",
+        filename: Optional[str] = None,
+    ) -> "jembe.File":
+        """
+        Links file from other DedupDiskStorage to existing blob with the same
+        digest without copying its content
+        """
+        if isinstance(file, File) and isinstance(file.storage, DedupDiskStorage):
+            digest = file.storage._file_digest(file.storage._disk_path(file.path))
+            sfn = self._get_unique_filename(
+                filename if filename is not None else file.basename, subdir
+            )
+            try:
+                return self._link_blob(self._blob_path(digest), digest, subdir, sfn)
+            except FileNotFoundError:
+                # content is not stored yet or its blob is just removed
+                pass
+        return super().store_file_raw(file, subdir, filename)
+
+    def _store_file_object(
+        self, file: "IOBase", subdir: str, filename: str
+    ) -> "jembe.File":
+        """Copies file object into new blob or links it to the existing one"""
+        tmp_dir = os.path.join(self.folder, DEFAULT_STORAGE_BLOBS_FOLDER, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid4().hex)
+        with open(tmp_path, mode="x" if isinstance(file, TextIOBase) else "xb") as fio:
+            _, digest = copy_file_object(
+                file, fio, self.buffer_size, self.HASH_ALGORITHM
+            )
+        try:
+            return self._adopt_blob(tmp_path, cast(str, digest), subdir, filename)
+        finally:
+            os.remove(tmp_path)
+
+    def move_file_raw(
+        self, file: "jembe.File", subdir: str = "", filename: Optional[str] = None
+    ) -> "jembe.File":
+        """Turns file into the blob without copying when it is on the same device"""
+        if not isinstance(file.storage, DiskStorage) or not file.storage._links_files:
+            return super().move_file_raw(file, subdir, filename)
+        src = file.storage._disk_path(file.path)
+        src_stat = os.stat(src)
+        blobs_dir = os.path.join(self.folder, DEFAULT_STORAGE_BLOBS_FOLDER)
+        os.makedirs(blobs_dir, exist_ok=True)
+        if src_stat.st_nlink > 1 or src_stat.st_dev != os.stat(blobs_dir).st_dev:
+            # file shares content with other files or it is on other device
+            return super().move_file_raw(file, subdir, filename)
+        digest = self._file_digest(src)
+        sfn = self._get_unique_filename(
+            filename if filename is not None else file.basename, subdir
+        )
+        new_file = self._adopt_blob(src, digest, subdir, sfn)
+        file.storage.remove(file.path)
+        return new_file
+
+    def _adopt_blob(
+        self, src: str, digest: str, subdir: str, filename: str
+    ) -> "jembe.File":
+        """Links src as blob when content is not already stored and links file to it"""
+        blob = self._blob_path(digest)
+        while True:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.link(src, blob)
+            except FileExistsError:
+                # identical content is already stored
+                pass
+            else:
+                try:
+                    os.setxattr(blob, self.DIGEST_XATTR, digest.encode("ascii"))
+                except (AttributeError, OSError):
+                    # digest is calculated from content when blob is released
+                    pass
+            try:
+                return self._link_blob(blob, digest, subdir, filename)
+            except FileNotFoundError:
+                # blob is removed by concurrent request after its last file
+                continue
+
+    def _link_blob(
+        self, blob: str, digest: str, subdir: str, filename: str
+    ) -> "jembe.File":
+        """Links file to the blob with unique filename inside subdir"""
+        os.makedirs(os.path.join(self.folder, subdir), exist_ok=True)
+        while True:
+            file_path = os.path.join(subdir, filename)
+            dst = self._disk_path(file_path)
+            if self.shard_levels:
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+            try:
+                os.link(blob, dst)
+            except FileExistsError:
+                filename = self._get_unique_filename(filename, subdir)
+                continue
+            return File(self, file_path, os.stat(dst).st_size, digest)
+
+    def _release(self, disk_path: str):
+        """Removes file from disk and its blob when it was the last link to it"""
+        file_stat = os.stat(disk_path)
+        # file and its blob
+        digest = self._file_digest(disk_path) if file_stat.st_nlink == 2 else None
+        os.remove(disk_path)
+        if digest is None:
+            return
+        blob = self._blob_path(digest)
+        try:
+            blob_stat = os.stat(blob)
+            if blob_stat.st_ino == file_stat.st_ino and blob_stat.st_nlink == 1:
+                # if file is linked to the blob meanwhile it keeps its content,
+                # only identical files stored later will not share it
+                os.remove(blob)
+                os.rmdir(os.path.dirname(blob))
+                os.rmdir(os.path.dirname(os.path.dirname(blob)))
+        except OSError:
+            pass
+
+    def remove_raw(self, file_path: str):
+        self._release(self._disk_path(file_path))
+        self._remove_shard_dirs(file_path)
+
+    def rmtree(self, dir_path: str):
+        for root, _, files in os.walk(os.path.join(self.folder, dir_path)):
+            for name in files:
+                self._release(os.path.join(root, name))
+        super().rmtree(dir_path)
+
     def open_raw(
         self,
         file_path: str,
@@ -702,8 +1477,23 @@ class DiskStorage(Storage):
         closefd=True,
         opener=None,
     ):
-        return open(
-            os.path.join(self.folder, file_path),
+        if any(m in mode for m in "wa+"):
+            disk_path = self._disk_path(file_path)
+            try:
+                linked = os.stat(disk_path).st_nlink > 1
+            except FileNotFoundError:
+                linked = False
+            if linked:
+                # copy on write
+                if "w" in mode:
+                    self._release(disk_path)
+                else:
+                    tmp_path = "{}.{}".format(disk_path, uuid4().hex)
+                    shutil.copyfile(disk_path, tmp_path)
+                    self._release(disk_path)
+                    os.rename(tmp_path, disk_path)
+        return super().open_raw(
+            file_path,
             mode=mode,
             buffering=buffering,
             encoding=encoding,
@@ -712,3 +1502,28 @@ class DiskStorage(Storage):
             closefd=closefd,
             opener=opener,
         )
+
+    def collect_garbage(self) -> Dict[str, int]:
+        """
+        Removes blobs without files, left by interrupted requests.
+
+        Returns number of removed blobs and reclaimed bytes.
+        """
+        report = dict(blobs=0, bytes_reclaimed=0)
+        blobs_dir = os.path.join(self.folder, DEFAULT_STORAGE_BLOBS_FOLDER)
+        for root, _, files in os.walk(blobs_dir, topdown=False):
+            if root == os.path.join(blobs_dir, "tmp"):
+                continue
+            for name in files:
+                blob = os.path.join(root, name)
+                blob_stat = os.stat(blob)
+                if blob_stat.st_nlink == 1:
+                    os.remove(blob)
+                    report["blobs"] += 1
+                    report["bytes_reclaimed"] += blob_stat.st_size
+            if root != blobs_dir:
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    pass
+        return report
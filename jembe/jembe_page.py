@@ -1,17 +1,33 @@
-from typing import Dict, Optional, TYPE_CHECKING, List
-from jembe.defaults import DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER
-from uuid import uuid1
-from flask import jsonify
+from typing import IO, Dict, Optional, TYPE_CHECKING, List, Tuple, cast
+from jembe.defaults import (
+    DEFAULT_STORAGE_BUFFER_SIZE,
+    DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER,
+)
+from io import SEEK_END, BytesIO
+from os import path
+from urllib.parse import unquote
+from uuid import uuid4
+from flask import Response, jsonify, session
+from werkzeug.formparser import FormDataParser
+from werkzeug.http import parse_content_range_header
 from werkzeug.utils import secure_filename
 from .component_config import UrlPath, config
 from .component import Component
 from .files import File
+from .exceptions import BadRequest, Forbidden, NotFound, RequestEntityTooLarge
+from .metrics import can_access_metrics
 
 # from flask import send_from_directory
 from .app import get_storage, get_temp_storage, get_processor
 
 if TYPE_CHECKING:
+    from werkzeug.datastructures import FileStorage, MultiDict
     from .common import DisplayResponse
+    from .metrics import Metrics
+
+# upload ids issued to current session, only they can be continued
+JEMBE_UPLOAD_IDS = "jembe_upload_ids"
+JEMBE_UPLOAD_IDS_MAX_SIZE = 100
 
 
 class DisplayFileComponent(Component):
@@ -36,13 +52,66 @@ class UploadFilesComponent(Component):
 
     Basicaly this component create state params of file instances for other
     components so that thay can use file as init/state param.
+
+    Files of multipart request are streamed directly into part files in the
+    upload dir (without spooling them into temporary files first) and moved
+    to their names when request is parsed. JEMBE_UPLOAD_MAX_FILE_SIZE,
+    JEMBE_UPLOAD_MAX_REQUEST_SIZE and allowed file types (see allowed_file)
+    are checked while streaming so that request is rejected (413 or 403)
+    as soon as limit is exceeded. Request form is parsed by request itself so
+    that request.form and request.files remain available to application
+    (streams of request.files read the files moved to the upload dir); when
+    application has already parsed the form, files spooled by default stream
+    factory are checked and copied to the upload dir instead.
+
+    Large files are uploaded in chunks, one chunk per request:
+        - body of the request is content of the chunk;
+        - Content-Range header (bytes <start>-<end>/<size>) defines position of
+          the chunk inside the file, chunks must be sent in order;
+        - X-Jembe-Upload-File and X-Jembe-Upload-Index headers identify file
+          (fileUploadId and index of the file for multiple files upload) and
+          X-Jembe-Upload-Filename its url encoded name;
+        - X-Jembe-Upload-Id is fileUploadResponseId returned by first
+          upload request, it is omited when first chunk starts new upload;
+          only upload ids issued to current session can be continued.
+    Chunks are appended to the part file in upload dir and json with
+    fileUploadResponseId and offset (number of bytes received) is returned.
+    Chunk with more or less bytes than its Content-Range is rejected (400)
+    and chunk larger than JEMBE_UPLOAD_MAX_REQUEST_SIZE is rejected (413).
+    When chunk start is not equal to received bytes, 409 Conflict is returned
+    with offset from which client should continue; Content-Range bytes */<size>
+    only returns received offset, so that interrupted upload can be resumed.
+    When last chunk is received file is moved to its name and returned in files.
     """
 
+    PART_EXTENSION = "part"
+
     def __init__(self):
         self.files: Dict[str, List[File]] = dict()
         self.file_upload_response_id: Optional[str] = None
+        # part files opened while streaming multipart request
+        self._parts: List["_UploadPartWriter"] = []
+        self._uploaded_size = 0
         super().__init__()
 
+    @property
+    def _upload_dir(self) -> str:
+        upload_id = cast(str, self.file_upload_response_id)
+        return "/".join([DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER, upload_id])
+
+    def _create_upload_dir(self):
+        """Creates dir with unique file_upload_response_id in temp storage"""
+        temp_storage = get_temp_storage()
+        while self.file_upload_response_id is None or temp_storage.exists(
+            self._upload_dir
+        ):
+            self.file_upload_response_id = secure_filename(str(uuid4()))
+        temp_storage.makedirs(self._upload_dir)
+        upload_ids = session.get(JEMBE_UPLOAD_IDS, list())
+        session[JEMBE_UPLOAD_IDS] = [self.file_upload_response_id] + upload_ids[
+            : JEMBE_UPLOAD_IDS_MAX_SIZE - 1
+        ]
+
     def _save_files_to_temp_storage(self):
         """Saves files to temp storage and populates self.files and self.file_upload_response_id"""
         # checks if this is valid upload request
@@ -50,59 +119,328 @@ class UploadFilesComponent(Component):
         if processor.is_x_jembe_upload_request:
             # procede with upload
             temp_storage = get_temp_storage()
+            upload_id = processor.request.headers.get(processor.jembe.X_UPLOAD_ID)
+            if upload_id:
+                self._use_upload_dir(upload_id)
+            else:
+                self._create_upload_dir()
 
-            # generate unique file_upload_response_id
-            while self.file_upload_response_id is None or temp_storage.exists(
-                "/".join(
-                    [DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER, self.file_upload_response_id]
-                )
+            request = processor.request
+            jembe = processor.jembe
+            if "files" in request.__dict__:
+                # form is already parsed by application (before_request hook or
+                # extension) and files are spooled by default stream factory
+                self._store_parsed_files(request.files)
+                return
+            max_request_size = jembe.upload_max_request_size
+            if (
+                max_request_size is not None
+                and request.content_length is not None
+                and request.content_length > max_request_size
+            ):
+                raise RequestEntityTooLarge()
+
+            max_content_length = request.max_content_length
+            if max_request_size is not None and (
+                max_content_length is None or max_request_size < max_content_length
             ):
-                self.file_upload_response_id = secure_filename(str(uuid1()))
-            temp_storage.makedirs(
-                "/".join(
-                    [DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER, self.file_upload_response_id]
+                max_content_length = max_request_size
+
+            def make_form_data_parser() -> FormDataParser:
+                # same parser as request.make_form_data_parser creates, only
+                # files are streamed into upload dir
+                return request.form_data_parser_class(
+                    stream_factory=self._upload_stream_factory,
+                    charset=request.charset,
+                    errors=request.encoding_errors,
+                    max_form_memory_size=request.max_form_memory_size,
+                    max_content_length=max_content_length,
+                    cls=request.parameter_storage_class,
+                    max_form_parts=request.max_form_parts,
                 )
+
+            # request parses the form with streaming parser so that request.form
+            # and request.files remain available to the application
+            request.make_form_data_parser = make_form_data_parser  # type:ignore
+            try:
+                files = request.files
+                for part in self._parts:
+                    part.close()
+            except BaseException:
+                for part in self._parts:
+                    part.close()
+                    temp_storage.remove(part.path)
+                raise
+            finally:
+                del request.make_form_data_parser
+
+            for fileUploadId, file in files.items(True):
+                if file.filename:
+                    part = cast(_UploadPartWriter, file.stream)
+                    tmp_file = temp_storage.move_file(
+                        File(temp_storage, part.path), self._upload_dir, file.filename
+                    )
+                    self.files.setdefault(fileUploadId, []).append(tmp_file)
+                    # part is moved, request.files reads the file from its new
+                    # path and request closes it at the end of the request
+                    file.stream = tmp_file.open("rb")
+
+    def _store_parsed_files(self, files: "MultiDict[str, FileStorage]"):
+        """Checks and stores files of already parsed request into upload dir"""
+        jembe = get_processor().jembe
+        uploads = []
+        uploaded_size = 0
+        for fileUploadId, file in files.items(True):
+            if not file.filename:
+                continue
+            if not self.allowed_file(file.filename, file.content_type):
+                raise Forbidden()
+            file.stream.seek(0, SEEK_END)
+            size = file.stream.tell()
+            file.stream.seek(0)
+            uploaded_size += size
+            if (
+                jembe.upload_max_file_size is not None
+                and size > jembe.upload_max_file_size
+            ) or (
+                jembe.upload_max_request_size is not None
+                and uploaded_size > jembe.upload_max_request_size
+            ):
+                raise RequestEntityTooLarge()
+            uploads.append((fileUploadId, file))
+        temp_storage = get_temp_storage()
+        for fileUploadId, file in uploads:
+            tmp_file = temp_storage.store_file(file, self._upload_dir, file.filename)
+            file.stream.seek(0)
+            self.files.setdefault(fileUploadId, []).append(tmp_file)
+
+    def _upload_stream_factory(
+        self,
+        total_content_length: Optional[int],
+        content_type: Optional[str],
+        filename: Optional[str],
+        content_length: Optional[int] = None,
+    ) -> IO[bytes]:
+        """Opens part file in upload dir for every file of multipart request"""
+        if not filename:
+            # file input without selected file
+            return BytesIO()
+        if not self.allowed_file(filename, content_type):
+            raise Forbidden()
+        temp_storage = get_temp_storage()
+        part_path = "/".join(
+            (
+                self._upload_dir,
+                "{}.{}".format(secure_filename(str(uuid4())), self.PART_EXTENSION),
             )
+        )
+        part = _UploadPartWriter(
+            self, part_path, temp_storage.open(part_path, mode="xb")
+        )
+        self._parts.append(part)
+        return cast(IO[bytes], part)
+
+    def _use_upload_dir(self, upload_id: str):
+        """Continues upload into existing upload dir created for current session"""
+        self.file_upload_response_id = secure_filename(upload_id)
+        if (
+            not self.file_upload_response_id
+            or self.file_upload_response_id not in session.get(JEMBE_UPLOAD_IDS, ())
+            or not get_temp_storage().isdir(self._upload_dir)
+        ):
+            raise NotFound()
+
+    def _save_chunk_to_temp_storage(self) -> Tuple[int, bool]:
+        """
+        Appends uploaded chunk to the part file and returns number of bytes
+        received and is chunk accepted. When all bytes are received moves
+        part file to its name and adds it to self.files.
+        """
+        processor = get_processor()
+        request = processor.request
+        jembe = processor.jembe
+        content_range = parse_content_range_header(request.headers.get("Content-Range"))
+        file_upload_id = secure_filename(request.headers.get(jembe.X_UPLOAD_FILE, ""))
+        filename = unquote(request.headers.get(jembe.X_UPLOAD_FILENAME, "unnamed"))
+        try:
+            index = int(request.headers.get(jembe.X_UPLOAD_INDEX, 0))
+        except ValueError:
+            raise BadRequest()
+        if (
+            content_range is None
+            or content_range.units != "bytes"
+            or content_range.length is None
+            or not file_upload_id
+            or index < 0
+        ):
+            raise BadRequest()
+        if not self.allowed_file(filename, request.content_type):
+            raise Forbidden()
+        chunk_size = 0
+        if content_range.start is not None:
+            chunk_size = content_range.stop - content_range.start
+            if content_range.stop > content_range.length or (
+                request.content_length is not None
+                and request.content_length != chunk_size
+            ):
+                raise BadRequest()
+        max_file_size = jembe.upload_max_file_size
+        max_request_size = jembe.upload_max_request_size
+        if (max_file_size is not None and content_range.length > max_file_size) or (
+            max_request_size is not None and chunk_size > max_request_size
+        ):
+            raise RequestEntityTooLarge()
+
+        upload_id = request.headers.get(jembe.X_UPLOAD_ID)
+        if upload_id:
+            self._use_upload_dir(upload_id)
+        else:
+            self._create_upload_dir()
 
-            for fileUploadId, file in processor.request.files.items(True):
-                if file.filename != "":
-                    if file and self.allowed_file(file.filename):
-                        tmp_file = temp_storage.store_file(
-                            file,
-                            "/".join(
-                                [
-                                    DEFAULT_TEMP_STORAGE_UPLOAD_FOLDER,
-                                    self.file_upload_response_id,
-                                ]
-                            ),
-                            True,
-                        )
-                        if fileUploadId in self.files:
-                            self.files[fileUploadId].append(tmp_file)
-                        else:
-                            self.files[fileUploadId] = [tmp_file]
+        temp_storage = get_temp_storage()
+        part_path = "/".join(
+            (
+                self._upload_dir,
+                "{}.{}.{}".format(file_upload_id, index, self.PART_EXTENSION),
+            )
+        )
+        with temp_storage.open(part_path, mode="ab") as part:
+            offset = part.tell()
+            if content_range.start is not None:
+                if content_range.start != offset:
+                    return offset, False
+                # copies at most chunk_size bytes, chunk with more or less
+                # bytes than its range is rejected and not appended
+                received = 0
+                while received < chunk_size:
+                    data = request.stream.read(
+                        min(DEFAULT_STORAGE_BUFFER_SIZE, chunk_size - received)
+                    )
+                    if not data:
+                        break
+                    part.write(data)
+                    received += len(data)
+                if received != chunk_size or request.stream.read(1):
+                    part.truncate(offset)
+                    raise BadRequest()
+                offset += received
+        if offset == content_range.length:
+            self.files[file_upload_id] = [
+                temp_storage.move_file(
+                    File(temp_storage, part_path), self._upload_dir, filename
+                )
+            ]
+        return offset, True
 
     def display(self) -> "DisplayResponse":
-        self._save_files_to_temp_storage()
+        processor = get_processor()
+        offset: Optional[int] = None
+        accepted = True
+        if (
+            processor.is_x_jembe_upload_request
+            and "Content-Range" in processor.request.headers
+        ):
+            offset, accepted = self._save_chunk_to_temp_storage()
+        else:
+            self._save_files_to_temp_storage()
 
-        return jsonify(
+        response = jsonify(
             dict(
                 files={
                     fid: [File.dump_init_param(f) for f in ffs]
                     for fid, ffs in self.files.items()
                 },
                 fileUploadResponseId=self.file_upload_response_id,
+                offset=offset,
             )
         )
+        if not accepted:
+            response.status_code = 409
+        return response
 
-    def allowed_file(self, file_name: str) -> bool:
-        # TODO
+    def allowed_file(self, file_name: str, content_type: Optional[str] = None) -> bool:
+        """
+        Checks file extension and content type of uploaded file against
+        JEMBE_UPLOAD_ALLOWED_EXTENSIONS and JEMBE_UPLOAD_ALLOWED_CONTENT_TYPES.
+        Content types can use wildcard subtype ("image/*"), content type
+        sent by browser is not verified against file content.
+        """
+        jembe = get_processor().jembe
+        allowed_extensions = jembe.upload_allowed_extensions
+        if allowed_extensions is not None:
+            extension = path.splitext(file_name)[1].lower().lstrip(".")
+            if extension not in allowed_extensions:
+                return False
+        allowed_content_types = jembe.upload_allowed_content_types
+        if allowed_content_types is not None:
+            mimetype = (content_type or "").split(";")[0].strip().lower()
+            if (
+                mimetype not in allowed_content_types
+                and "{}/*".format(mimetype.split("/")[0]) not in allowed_content_types
+            ):
+                return False
         return True
 
 
+class _UploadPartWriter:
+    """
+    Writes uploaded file into part file in temp storage while multipart
+    request is parsed and enforces upload size limits
+    """
+
+    def __init__(self, component: "UploadFilesComponent", path: str, fio: IO[bytes]):
+        self.component = component
+        self.path = path
+        self.fio = fio
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        jembe = get_processor().jembe
+        self.size += len(data)
+        self.component._uploaded_size += len(data)
+        if (
+            jembe.upload_max_file_size is not None
+            and self.size > jembe.upload_max_file_size
+        ) or (
+            jembe.upload_max_request_size is not None
+            and self.component._uploaded_size > jembe.upload_max_request_size
+        ):
+            raise RequestEntityTooLarge()
+        return self.fio.write(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.fio.seek(offset, whence)
+
+    def close(self):
+        self.fio.close()
+
+
+class MetricsComponent(Component):
+    """
+    Exposes Jembe metrics in Prometheus text format when JEMBE_METRICS is
+    enabled and JEMBE_METRICS_ACCESS allows current request
+    """
+
+    def __init__(self):
+        jembe = get_processor().jembe
+        if jembe.metrics is None:
+            raise NotFound()
+        if not can_access_metrics(jembe.metrics_access):
+            raise Forbidden()
+        super().__init__()
+
+    def display(self) -> "DisplayResponse":
+        metrics = cast("Metrics", get_processor().jembe.metrics)
+        return Response(metrics.expose(), content_type=metrics.CONTENT_TYPE)
+
+
 @config(
     Component.Config(
-        components=dict(file=DisplayFileComponent, upload_files=UploadFilesComponent)
+        components=dict(
+            file=DisplayFileComponent,
+            upload_files=UploadFilesComponent,
+            metrics=MetricsComponent,
+        )
     )
 )
 class JembePage(Component):
@@ -0,0 +1,448 @@
+"""
+In-process metrics of Jembe internals in Prometheus text exposition format.
+
+Metrics are collected when ``JEMBE_METRICS`` Flask config variable is set to
+``True`` and exposed by ``/jembe/metrics`` system component. Metrics are kept
+per process, so every worker exposes its own values.
+
+Access to ``/jembe/metrics`` is denied unless ``JEMBE_METRICS_ACCESS`` is set
+to ``"local"`` (requests from loopback addresses, ``request.remote_addr``
+must be the client address when application runs behind a proxy) or to a
+callable without arguments that returns True when current request can read
+metrics.
+
+When ``JEMBE_SLOW_REQUEST_THRESHOLD`` is set (in milliseconds) requests
+taking longer are logged with ``current_app.logger`` as one JSON line with
+the slowest components and number of commands, renders and emits.
+
+``JEMBE_MEMORY_PROFILE`` is debug option that traces memory allocations
+with ``tracemalloc`` and attributes memory allocated by every command to
+the component exec name. Memory breakdown is added to the slow request log
+or, when slow request log is not enabled, logged for every request.
+"""
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+import ipaddress
+import tracemalloc
+from math import inf
+from threading import Lock
+from time import perf_counter
+from flask import current_app, json, request
+from .common import exec_name_to_full_name
+
+if TYPE_CHECKING:  # pragma: no cover
+    import jembe
+    from flask import Response
+    from .processor import Command
+
+__all__ = ("Counter", "Histogram", "Metrics", "RequestProfile", "can_access_metrics")
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+FAN_OUT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing value per combination of label values"""
+
+    TYPE = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def _labels(self, labelvalues: Tuple[str, ...], **extra: str) -> str:
+        labels = [
+            f'{name}="{_escape(str(value))}"'
+            for name, value in zip(self.labelnames, labelvalues)
+        ]
+        labels.extend(f'{name}="{value}"' for name, value in extra.items())
+        return "{" + ",".join(labels) + "}" if labels else ""
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{self._labels(labelvalues)} {_format_value(value)}"
+            for labelvalues, value in values
+        ]
+
+    def expose(self) -> str:
+        return "\n".join(
+            [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+            + self._samples()
+        )
+
+
+class Histogram(Counter):
+    """Distribution of observed values in cumulative buckets"""
+
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (inf,)
+        # label values -> [bucket counts..., sum, count]
+        self._observations: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        with self._lock:
+            observation = self._observations.get(labelvalues)
+            if observation is None:
+                observation = [0] * (len(self.buckets) + 2)
+                self._observations[labelvalues] = observation
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    observation[index] += 1
+                    break
+            observation[-2] += value
+            observation[-1] += 1
+
+    def get(self, *labelvalues: str) -> float:
+        """Returns number of observations"""
+        observation = self._observations.get(labelvalues)
+        return observation[-1] if observation else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            observations = sorted(
+                (labelvalues, observation.copy())
+                for labelvalues, observation in self._observations.items()
+            )
+        samples = []
+        for labelvalues, observation in observations:
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += observation[index]
+                samples.append(
+                    "{}_bucket{} {}".format(
+                        self.name,
+                        self._labels(labelvalues, le=_format_value(bound)),
+                        _format_value(cumulative),
+                    )
+                )
+            labels = self._labels(labelvalues)
+            samples.append(f"{self.name}_sum{labels} {_format_value(observation[-2])}")
+            samples.append(
+                f"{self.name}_count{labels} {_format_value(observation[-1])}"
+            )
+        return samples
+
+
+class Metrics:
+    """Metrics collected by Jembe processor"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.requests = Counter("jembe_requests_total", "Requests by type.", ("type",))
+        self.request_duration = Histogram(
+            "jembe_request_duration_seconds",
+            "Time to process request and build response.",
+            ("type",),
+        )
+        self.commands = Counter(
+            "jembe_commands_total", "Executed processor commands.", ("command",)
+        )
+        self.render_duration = Histogram(
+            "jembe_render_duration_seconds",
+            "Time spent in display of component.",
+            ("component",),
+        )
+        self.emit_fan_out = Histogram(
+            "jembe_emit_fan_out",
+            "Listeners called by emited event.",
+            ("event",),
+            FAN_OUT_BUCKETS,
+        )
+        self.composition_duration = Histogram(
+            "jembe_composition_duration_seconds",
+            "Time to compose rendered components into response.",
+            ("type",),
+        )
+        self.response_bytes = Histogram(
+            "jembe_response_bytes", "Size of response body.", ("type",), SIZE_BUCKETS
+        )
+        self.upload_bytes = Counter(
+            "jembe_upload_bytes_total", "Bytes received by file upload requests."
+        )
+
+    @property
+    def metrics(self) -> Tuple[Counter, ...]:
+        return tuple(m for m in vars(self).values() if isinstance(m, Counter))
+
+    def expose(self) -> str:
+        """Returns all metrics in Prometheus text exposition format"""
+        return "\n".join(metric.expose() for metric in self.metrics) + "\n"
+
+    def observe_request(
+        self,
+        request_type: str,
+        duration: float,
+        composition_duration: float,
+        response_bytes: Optional[int],
+        upload_bytes: Optional[int],
+    ):
+        self.requests.inc(request_type)
+        self.request_duration.observe(duration, request_type)
+        self.composition_duration.observe(composition_duration, request_type)
+        if response_bytes is not None:
+            self.response_bytes.observe(response_bytes, request_type)
+        if request_type == "upload" and upload_bytes:
+            self.upload_bytes.inc(amount=upload_bytes)
+
+
+# time of execution of these commands is added to component time
+_TIMED_COMMANDS = dict(
+    InitialiseCommand="init",
+    CallActionCommand="action",
+    CallListenerCommand="listener",
+)
+
+
+class RequestProfile:
+    """Timings of commands executed by processor while processing one request.
+
+    Used to update ``Metrics`` and to log slow requests
+    (``JEMBE_SLOW_REQUEST_THRESHOLD``). When ``trace_memory`` is set memory
+    allocated by every command is recorded per component exec name
+    (``JEMBE_MEMORY_PROFILE``).
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None, trace_memory: bool = False):
+        self.metrics = metrics
+        self.commands: Dict[str, int] = {}
+        self.renders = 0
+        self.emits = 0
+        # component full_name -> {init|action|listener|render: seconds}
+        self.components: Dict[str, Dict[str, float]] = {}
+        self.trace_memory = trace_memory and tracemalloc.is_tracing()
+        # component exec_name -> [allocated bytes, peak bytes]
+        self.memory: Dict[str, List[int]] = {}
+
+    def execute(self, command: "Command") -> Optional["Response"]:
+        """Executes command and records its execution time"""
+        command_name = command.__class__.__name__
+        self.commands[command_name] = self.commands.get(command_name, 0) + 1
+        if self.metrics is not None:
+            self.metrics.commands.inc(command_name)
+        kind = _TIMED_COMMANDS.get(command_name)
+        if kind is None and not self.trace_memory:
+            return command.execute()
+        if self.trace_memory:
+            memory_start = _reset_traced_peak()
+        start = perf_counter()
+        try:
+            return command.execute()
+        finally:
+            if kind is not None:
+                self._add(
+                    exec_name_to_full_name(command.component_exec_name),
+                    kind,
+                    perf_counter() - start,
+                )
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                self._add_memory(
+                    command.component_exec_name,
+                    current - memory_start,
+                    peak - memory_start,
+                )
+
+    def rendered(self, full_name: str, duration: float):
+        self.renders += 1
+        self._add(full_name, "render", duration)
+        if self.metrics is not None:
+            self.metrics.render_duration.observe(duration, full_name)
+
+    def emitted(self, event_name: str, listeners: int):
+        self.emits += 1
+        if self.metrics is not None:
+            self.metrics.emit_fan_out.observe(listeners, event_name)
+
+    def _add(self, full_name: str, kind: str, duration: float):
+        timings = self.components.setdefault(full_name, {})
+        timings[kind] = timings.get(kind, 0) + duration
+
+    def _add_memory(self, exec_name: str, allocated: int, peak: int):
+        memory = self.memory.setdefault(exec_name, [0, 0])
+        memory[0] += allocated
+        memory[1] = max(memory[1], peak)
+
+    def top_memory(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Returns components which allocated the most memory"""
+        return [
+            dict(component=exec_name, allocated_bytes=allocated, peak_bytes=peak)
+            for exec_name, (allocated, peak) in sorted(
+                self.memory.items(), key=lambda item: item[1][1], reverse=True
+            )[:limit]
+        ]
+
+    def top_components(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Returns components with the longest render and action time"""
+        totals = sorted(
+            ((sum(t.values()), name, t) for name, t in self.components.items()),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        return [
+            dict(
+                component=name,
+                total_ms=round(total * 1000, 3),
+                **{f"{kind}_ms": round(t * 1000, 3) for kind, t in timings.items()},
+            )
+            for total, name, timings in totals[:limit]
+        ]
+
+
+def _reset_traced_peak() -> int:
+    """Resets peak of traced memory and returns current traced memory"""
+    if hasattr(tracemalloc, "reset_peak"):  # python 3.9+
+        tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _top_allocations(
+    start: "tracemalloc.Snapshot", end: "tracemalloc.Snapshot", limit: int = 5
+) -> List[Dict[str, Any]]:
+    """Returns source lines which allocated the most memory between snapshots"""
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    return [
+        dict(
+            line=str(stat.traceback),
+            size_diff=stat.size_diff,
+            count_diff=stat.count_diff,
+        )
+        for stat in end.filter_traces(filters).compare_to(
+            start.filter_traces(filters), "lineno"
+        )[:limit]
+    ]
+
+
+def can_access_metrics(access: Optional[Union[str, Callable[[], bool]]]) -> bool:
+    """Checks JEMBE_METRICS_ACCESS for the current request"""
+    if access is None:
+        return False
+    if callable(access):
+        return bool(access())
+    if access == "local":
+        try:
+            return ipaddress.ip_address(request.remote_addr or "").is_loopback
+        except ValueError:
+            return False
+    raise ValueError(
+        "JEMBE_METRICS_ACCESS must be None, 'local' or callable, not {!r}".format(
+            access
+        )
+    )
+
+
+def request_type(processor: "jembe.Processor") -> str:
+    if processor.is_x_jembe_upload_request:
+        return "upload"
+    elif processor._is_x_jembe_request:
+        return "x-jembe"
+    return "http"
+
+
+def process_profiled_request(processor: "jembe.Processor") -> "Response":
+    """Processes request, updates metrics and logs request if it is slow"""
+    jembe = processor.jembe
+    profile = processor.profile
+    trace_memory = profile is not None and profile.trace_memory
+    if trace_memory:
+        snapshot_start = tracemalloc.take_snapshot()
+    start = perf_counter()
+    processor.process_request()
+    composition_start = perf_counter()
+    if trace_memory:
+        memory_start = _reset_traced_peak()
+    response = processor.build_response()
+    end = perf_counter()
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        memory: Optional[Dict[str, Any]] = dict(
+            components=profile.top_memory(),
+            composition=dict(
+                allocated_bytes=current - memory_start,
+                peak_bytes=peak - memory_start,
+            ),
+            allocations=_top_allocations(snapshot_start, tracemalloc.take_snapshot()),
+        )
+    else:
+        memory = None
+
+    # html page is returned as bytes and converted to response by flask
+    response_bytes: Optional[int] = (
+        len(response)
+        if isinstance(response, (bytes, str))
+        else response.calculate_content_length()
+    )
+    if jembe.metrics is not None:
+        jembe.metrics.observe_request(
+            request_type(processor),
+            end - start,
+            end - composition_start,
+            response_bytes,
+            processor.request.content_length,
+        )
+    if profile is None:
+        return response
+    threshold = jembe.slow_request_threshold
+    is_slow = threshold is not None and (end - start) * 1000 >= threshold
+    if is_slow or (memory is not None and threshold is None):
+        trace = dict(
+            path=processor.request.path,
+            type=request_type(processor),
+            duration_ms=round((end - start) * 1000, 3),
+            composition_ms=round((end - composition_start) * 1000, 3),
+            threshold_ms=threshold,
+            commands=profile.commands,
+            renders=profile.renders,
+            emits=profile.emits,
+            request_bytes=processor.request.content_length,
+            response_bytes=response_bytes,
+            components=profile.top_components(),
+        )
+        if memory is not None:
+            trace["memory"] = memory
+        if is_slow:
+            current_app.logger.warning("Jembe slow request: %s", json.dumps(trace))
+        else:
+            current_app.logger.info("Jembe request profile: %s", json.dumps(trace))
+    return response
@@ -11,16 +11,23 @@ from typing import (
     Deque,
     Any,
     NamedTuple,
+    Set,
+    Iterable,
+    Collection,
+    Iterator,
+    MutableMapping,
 )
 from abc import ABC, abstractmethod
 import re
 from json import JSONDecodeError
-from copy import deepcopy
 from enum import Enum
-from collections import deque
-from itertools import accumulate, chain
+from collections import deque, ChainMap
+from contextlib import contextmanager
+from itertools import accumulate, chain, groupby
 from functools import cached_property
+from hashlib import sha1
 from operator import add
+from time import perf_counter
 from urllib.parse import unquote_plus
 from flask.globals import current_app
 from jinja2 import Undefined
@@ -40,6 +47,7 @@ from .common import (
     # json_default,
 )
 from .exceptions import AccessDenied, Forbidden, JembeError, Unauthorized
+from .metrics import RequestProfile
 from .component_config import ComponentConfig, RedisplayFlag as RedisplayFlag
 
 
@@ -230,10 +238,8 @@ class CallActionCommand(Command):
                 self.component_exec_name
             ].state.tojsondict(component, True)
             if current_state != self._component_state_before_execute:
-                for exec_name, render in self.processor.renderers.items():
-                    if render.fresh and is_direct_child_name(
-                        self.component_exec_name, exec_name
-                    ):
+                for exec_name in self.processor.renderers.fresh_exec_names:
+                    if is_direct_child_name(self.component_exec_name, exec_name):
                         # reinitialise component is freshly rerendered forcing it to apply
                         # new injected params
                         commands.extend((InitialiseCommand(exec_name, dict()),))
@@ -311,9 +317,14 @@ class CallDisplayCommand(CallActionCommand):
             raise ComponentConfig.DEFAULT_AC_EXCEPTION()
 
         # execute action
+        profile = self.processor.profile
+        if profile is not None:
+            start = perf_counter()
         action_result = getattr(self._component, self.action_name)(
             *self.args, **self.kwargs
         )
+        if profile is not None:
+            profile.rendered(self._component._config.full_name, perf_counter() - start)
         # process action result
         if isinstance(action_result, str):
             # save component display responses in memory
@@ -534,6 +545,8 @@ class EmitCommand(Command):
             self.processor.add_command(
                 CallListenerCommand(comp.exec_name, listener_method_name, self.event)
             )
+        if self.processor.profile is not None:
+            self.processor.profile.emitted(self.event_name, len(execute_over))
 
         if self.primary_execution:
             self.processor._emited_event_commands.append(self)
@@ -770,6 +783,29 @@ class InitialiseCommand(Command):
         )
         return init_params
 
+    @cached_property
+    def init_params_fingerprint(self) -> str:
+        """
+        Hashable representation of init_params.
+
+        Used by processor to remember init params of component that raised
+        exception on initialise without deep copying them and to compare
+        them in constant time before every command over that component.
+        """
+        component_class = self._cconfig.component_class
+
+        def _dump_param(name: str, value: Any) -> Any:
+            try:
+                return component_class.dump_init_param(name, value)
+            except Exception:
+                return repr(value)
+
+        dumped_params = {k: _dump_param(k, v) for k, v in self.init_params.items()}
+        try:
+            return json.dumps(dumped_params, separators=(",", ":"), sort_keys=True)
+        except TypeError:
+            return repr(sorted(dumped_params.items()))
+
     @cached_property
     def _inject_into_params(self) -> Dict[str, Any]:
         parent_cconfig = self._cconfig.parent
@@ -923,6 +959,74 @@ class ComponentRender(NamedTuple):
     displayed_components: List[str]
 
 
+class ComponentRenderers(Dict[str, "ComponentRender"]):
+    """
+    Component renderers by exec_name.
+
+    Maintains index of freshly rendered components and of components
+    displayed by every renderer so that checking if component is displayed
+    on the page does not require scanning all renderers.
+    """
+
+    def __init__(self, renderers: Iterable[Tuple[str, "ComponentRender"]] = ()):
+        super().__init__()
+        # exec names of all freshly rendered components in rendering order
+        # (dict is used as ordered set)
+        self.fresh_exec_names: Dict[str, None] = dict()
+        # exec names of freshly rendered page (root) components
+        self.fresh_root_exec_names: Dict[str, None] = dict()
+        # cached sets of displayed_components by renderer exec name
+        self._displayed_components: Dict[str, Set[str]] = dict()
+        for exec_name, render in renderers:
+            self[exec_name] = render
+
+    def __setitem__(self, exec_name: str, render: "ComponentRender") -> None:
+        super().__setitem__(exec_name, render)
+        self._displayed_components.pop(exec_name, None)
+        if render.fresh:
+            self.fresh_exec_names[exec_name] = None
+            if is_page_exec_name(exec_name):
+                self.fresh_root_exec_names[exec_name] = None
+        else:
+            self.fresh_exec_names.pop(exec_name, None)
+            self.fresh_root_exec_names.pop(exec_name, None)
+
+    def __delitem__(self, exec_name: str) -> None:
+        super().__delitem__(exec_name)
+        self._displayed_components.pop(exec_name, None)
+        self.fresh_exec_names.pop(exec_name, None)
+        self.fresh_root_exec_names.pop(exec_name, None)
+
+    def displayed_components(self, exec_name: str) -> Set[str]:
+        """Returns exec names of components displayed by renderer of exec_name"""
+        try:
+            return self._displayed_components[exec_name]
+        except KeyError:
+            render = self.get(exec_name, None)
+            displayed = set(render.displayed_components) if render else set()
+            self._displayed_components[exec_name] = displayed
+            return displayed
+
+    def is_displayed(self, exec_name: str) -> bool:
+        """
+        Returns True if component is displayed on the page by following
+        displayed components from the page component down to exec_name.
+
+        If page component is not freshly rendered page component from
+        exec_name is considered displayed.
+        """
+        en_split = exec_name.split("/")
+        displayed_execnames: Collection[str] = self.fresh_root_exec_names or (
+            "/".join(en_split[:2]),
+        )
+        for i in range(2, len(en_split) + 1):
+            ename = "/".join(en_split[:i])
+            if ename not in displayed_execnames:
+                return False
+            displayed_execnames = self.displayed_components(ename)
+        return True
+
+
 class CommandsQue:
     def __init__(self, jembe: "jembe.Jembe") -> None:
         self.commands: Deque["Command"] = deque()
@@ -965,12 +1069,7 @@ class CommandsQue:
         # Check if command should be deffered
         is_deferred_command = False
         if isinstance(command, CallActionCommand):
-            try:
-                cconfig = self.jembe.components_configs[command.component_full_name]
-            except AttributeError:
-                raise JembeError(
-                    "Component {} does not exist".format(command.component_full_name)
-                )
+            cconfig = self.jembe.get_component_config(command.component_full_name)
             try:
                 caction = cconfig.component_actions[command.action_name]
             except AttributeError:
@@ -1019,8 +1118,17 @@ class Processor:
 
         self.jembe = _jembe
         self.request = request
+        # command timings, when metrics, slow request log or memory profile
+        # are enabled
+        self.profile: Optional["RequestProfile"] = (
+            RequestProfile(self.jembe.metrics, self.jembe.memory_profile)
+            if self.jembe.metrics is not None
+            or self.jembe.slow_request_threshold is not None
+            or self.jembe.memory_profile
+            else None
+        )
 
-        self.components: Dict[str, "jembe.Component"] = dict()
+        self.components: MutableMapping[str, "jembe.Component"] = dict()
         self._commands: Deque["Command"] = deque()
         self._processing_command: Optional["Command"] = None
         # already emited and processed event commands
@@ -1030,14 +1138,14 @@ class Processor:
         # added to commands at the end of command execution
         self._staging_commands = CommandsQue(self.jembe)
         # component renderers is dict[exec_name] = (componentState, url, rendered_str)
-        self.renderers: Dict[str, "ComponentRender"] = dict()
+        self.renderers = ComponentRenderers()
         # list of execnames marked for removal by jembe client js without redisplaying parent
         self.components_marked_for_removal: List[str] = []
-        # component that raised exception on initialise
+        # component that raised exception on initialise with fingerprint of its init params
         # any subsequent command on this component should be ignored
-        self._raised_exception_on_initialise: Dict[str, dict] = dict()
-        # direct response if component display returns it
-        self._response: Optional["Response"] = None
+        self._raised_exception_on_initialise: Dict[str, str] = dict()
+        # direct response if component display returns it or composed page
+        self._response: Optional[Union["Response", bytes]] = None
 
         # globals
         self.call_window_open: List[str] = []
@@ -1046,6 +1154,11 @@ class Processor:
         # need to be checked for redisplay depending of other redisplayed compoents
         # on page (when processing x-jembe request)
         self._hanging_init_commands_execnames: List[str] = []
+        # display commands of http GET request executed only when
+        # ETag of initialised components does not match If-None-Match
+        self._conditional_display_commands: List["Command"] = []
+        # ETag of the page for conditional GET requests
+        self.etag: Optional[str] = None
         self.__create_commands(component_full_name)
         self._staging_commands.move_commands_to(self._commands)
 
@@ -1054,6 +1167,30 @@ class Processor:
             command if command.is_mounted else command.mount(self), end
         )
 
+    @contextmanager
+    def additional_components(
+        self, *components: "jembe.Component"
+    ) -> Iterator[MutableMapping[str, "jembe.Component"]]:
+        """
+        Makes additional components visible in self.components while
+        evaluating component reference.
+
+        Additional components are layered over existing components without
+        copying them. Any component added to self.components inside the
+        context is added to the additional layer and discarded afterwards.
+        """
+        if not components:
+            yield self.components
+            return
+        components_registry = self.components
+        self.components = ChainMap(
+            {c.exec_name: c for c in components}, components_registry
+        )
+        try:
+            yield self.components
+        finally:
+            self.components = components_registry
+
     def _load_init_params(self, exec_name: str, init_params: dict) -> dict:
         component_config = self.jembe.get_component_config(exec_name)
         component_class = component_config.component_class
@@ -1124,15 +1261,17 @@ class Processor:
             to_be_initialised = [
                 component_data["execName"] for component_data in data["components"]
             ]
+            # index of displayed direct children by parent exec name
+            displayed_children: Dict[str, List[str]] = dict()
+            for en in to_be_initialised:
+                displayed_children.setdefault(parent_exec_name(en), []).append(en)
             for component_data in data["components"]:
                 initcmd = cast(
                     "InitialiseCommand", self._x_jembe_command_factory(component_data)
                 )
-                initcmd.displayed_components = [
-                    en
-                    for en in to_be_initialised
-                    if is_direct_child_name(initcmd.component_exec_name, en)
-                ]
+                initcmd.displayed_components = displayed_children.get(
+                    initcmd.component_exec_name, []
+                ).copy()
                 self.add_command(initcmd, end=True)
             # init components from url_path if thay doesnot exist in data["compoenents"]
             self.__create_commands_from_url_path(component_full_name, to_be_initialised)
@@ -1165,12 +1304,54 @@ class Processor:
             exec_names = self.__create_commands_from_url_path(
                 component_full_name, list()
             )
+            display_commands: List["Command"] = [
+                CallDisplayCommand(exec_name) for exec_name in reversed(exec_names)
+            ]
+            if self._is_conditional_request(exec_names):
+                self._conditional_display_commands = display_commands
+            else:
+                for command in display_commands:
+                    self.add_command(command, end=True)
 
-            for exec_name in reversed(exec_names):
-                self.add_command(
-                    CallDisplayCommand(exec_name),
-                    end=True,
-                )
+    def _is_conditional_request(self, exec_names: List[str]) -> bool:
+        """
+        Returns True for http GET request of the page whose components
+        define version of displayed data with Component.etag
+        """
+        from .component import Component
+
+        return self.request.method == "GET" and any(
+            self.jembe.get_component_config(exec_name).component_class.etag
+            is not Component.etag
+            for exec_name in exec_names
+        )
+
+    def _execute_conditional_display_commands(self) -> Optional["Response"]:
+        """
+        Builds ETag of the page from versions of initialised components and
+        returns 304 Not Modified when it matches If-None-Match header,
+        otherwise executes display commands.
+        """
+        versions = [
+            (exec_name, self.components[exec_name].etag())
+            for exec_name in sorted(self.components.keys())
+        ]
+        if not self._raised_exception_on_initialise and all(
+            version is not None for _, version in versions
+        ):
+            self.etag = sha1(
+                json.dumps(versions, separators=(",", ":")).encode("utf-8")
+            ).hexdigest()
+            if self.request.if_none_match.contains_weak(self.etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(self.etag, weak=True)
+                return response
+
+        for command in self._conditional_display_commands:
+            self.add_command(command, end=True)
+        self._conditional_display_commands = []
+        self._staging_commands.move_commands_to(self._commands)
+        return self._execute_commands()
 
     def __create_commands_from_url_path(
         self, component_full_name: str, to_be_initialised: List[str]
@@ -1189,9 +1370,9 @@ class Processor:
         # get all components configs from root to requested component
         for cname in component_full_name.strip("/").split("/"):
             c_configs.append(
-                self.jembe.components_configs[
+                self.jembe.get_component_config(
                     "/".join((c_configs[-1].full_name if c_configs else "", cname))
-                ]
+                )
             )
         # initialise all components from root to requested component
         # >> parent component exec name, makes easy to build next component exec_name
@@ -1263,6 +1444,8 @@ class Processor:
     def process_request(self) -> "Processor":
         try:
             response = self._execute_commands()
+            if response is None and self._conditional_display_commands:
+                response = self._execute_conditional_display_commands()
 
             if response is not None:
                 self._delete_tmp_uploads()
@@ -1277,8 +1460,7 @@ class Processor:
                     accumulate(
                         map(lambda x: "/" + x, exec_name.strip("/").split("/")), add
                     )
-                    for exec_name, cr in self.renderers.items()
-                    if cr.fresh == True
+                    for exec_name in self.renderers.fresh_exec_names
                 )
             )
             missing_render_exec_names = needs_render_exec_names - set(
@@ -1295,41 +1477,32 @@ class Processor:
             # for all components that have change state params but not have been redisplayed
             # and all components with RedisplayFlag.WHEN_ON_PAGE:
             # check will thay still be presented/visible on page if so execute display command
-            # for that components
-            for hanging_init_execname in self._hanging_init_commands_execnames + [
-                k
-                for k, v in self.components.items()
-                if RedisplayFlag.WHEN_ON_PAGE in v._config.redisplay
-            ]:
-                if hanging_init_execname not in [
-                    execname for execname, v in self.renderers.items() if v.fresh
-                ]:
-                    # if hanging init is displayed on page it should be rendered
-                    en_split = hanging_init_execname.split("/")
-                    execname_tree = []
-                    for i in range(2, len(en_split) + 1):
-                        execname_tree.append("/".join(en_split[:i]))
-                    # check if root component will be redisplayed
-                    root_fresh_keys = [
-                        k
-                        for k, v in self.renderers.items()
-                        if v.fresh and len(k.split("/")) == 2
-                    ]
-                    displayed_execnames = (
-                        root_fresh_keys
-                        if len(root_fresh_keys) > 0
-                        else [execname_tree[0]]
+            # for that components.
+            # Components are checked level by level from the page down, so that
+            # redisplaying parents is done before checking their children
+            redisplay_execnames = sorted(
+                dict.fromkeys(
+                    chain(
+                        self._hanging_init_commands_execnames,
+                        (
+                            k
+                            for k, v in self.components.items()
+                            if RedisplayFlag.WHEN_ON_PAGE in v._config.redisplay
+                        ),
                     )
-                    execute_display = True
-                    for ename in execname_tree:
-                        if ename not in displayed_execnames:
-                            execute_display = False
-                            break
-                        displayed_execnames = self.renderers[ename].displayed_components
-                    if execute_display:
-                        self.add_command(CallDisplayCommand(hanging_init_execname))
-                        self._staging_commands.move_commands_to(self._commands)
-                        self._execute_commands()
+                ),
+                key=lambda exec_name: exec_name.count("/"),
+            )
+            for _level, level_execnames in groupby(
+                redisplay_execnames, key=lambda exec_name: exec_name.count("/")
+            ):
+                display_execnames: List[str] = []
+                for hanging_init_execname in level_execnames:
+                    if hanging_init_execname in self.renderers.fresh_exec_names:
+                        continue
+                    if self.renderers.is_displayed(hanging_init_execname):
+                        # if hanging init is displayed on page it should be rendered
+                        display_execnames.append(hanging_init_execname)
                     elif (
                         hanging_init_execname in self.components
                         and RedisplayFlag.WHEN_ON_PAGE
@@ -1338,6 +1511,12 @@ class Processor:
                         not in self.components_marked_for_removal
                     ):
                         self.components_marked_for_removal.append(hanging_init_execname)
+                if display_execnames:
+                    # last added command is executed first
+                    for exec_name in reversed(display_execnames):
+                        self.add_command(CallDisplayCommand(exec_name))
+                    self._staging_commands.move_commands_to(self._commands)
+                    self._execute_commands()
             return self
 
         finally:
@@ -1358,7 +1537,7 @@ class Processor:
         if command.component_exec_name in self._raised_exception_on_initialise:
             if (
                 isinstance(command, InitialiseCommand)
-                and command.init_params
+                and command.init_params_fingerprint
                 == self._raised_exception_on_initialise[command.component_exec_name]
             ):
                 return None
@@ -1371,7 +1550,10 @@ class Processor:
         # print("\nEXEC: ", command)
         try:
             self._processing_command = command
-            response = command.execute()
+            if self.profile is None:
+                response = command.execute()
+            else:
+                response = self.profile.execute(command)
             self._processing_command = None
             self._staging_commands.move_commands_to(self._commands)
             if response is not None:
@@ -1405,13 +1587,15 @@ class Processor:
         # initialisation with same init_params already failed
 
         if (
-            exec_name_to_full_name(command.component_exec_name)
-            not in self.jembe.components_configs
+            self.jembe.find_component_config(
+                exec_name_to_full_name(command.component_exec_name)
+            )
+            is None
         ):
             return (False, None)
         command = command if command.is_mounted else command.mount(self)
         if command.component_exec_name in self._raised_exception_on_initialise and (
-            command.init_params
+            command.init_params_fingerprint
             == self._raised_exception_on_initialise[command.component_exec_name]
         ):
             return (False, None)
@@ -1419,27 +1603,23 @@ class Processor:
         # execute initialise command without running before or after commands
         backup_current_staging_commands = self._staging_commands
         self._staging_commands = CommandsQue(self.jembe)
-        backup_current_components = self.components.copy()
-        # add additional components into components
-        for acomp in additional_components:
-            self.components[acomp.exec_name] = acomp
 
         try:
-            command.execute(is_accessible_run=True)
+            # add additional components into components
+            with self.additional_components(*additional_components):
+                command.execute(is_accessible_run=True)
         except JembeError as jmb_error:
             # JembeError are exceptions raised by jembe
             # and thay indicate bad usage of framework
-            self.components = backup_current_components
             raise jmb_error
         except Exception as exc:
             self._raised_exception_on_initialise[
                 command.component_exec_name
-            ] = deepcopy(command.init_params)
+            ] = command.init_params_fingerprint
             # initalise command is not run properly
 
             # restore _staging_commands
             self._staging_commands = backup_current_staging_commands
-            self.components = backup_current_components
             if current_app.debug or current_app.testing:
                 current_app.logger.warning(
                     "DEBUG: Exception when initialising component out of proccessing que {}: {}".format(
@@ -1454,7 +1634,6 @@ class Processor:
                     traceback.print_exc()
             return (False, None)
         self._staging_commands = backup_current_staging_commands
-        self.components = backup_current_components
         return (True, command.initialised_component)
 
     def _handle_exception_in_command(self, command: "Command", exc: "Exception"):
@@ -1516,7 +1695,7 @@ class Processor:
                     # (save to skip execution because we handled exception)
                     self._raised_exception_on_initialise[
                         command.component_exec_name
-                    ] = deepcopy(command.init_params)
+                    ] = command.init_params_fingerprint
                     # remove all child components of command.component_exec_name
                     self.components = {
                         exec_name: comp
@@ -1602,37 +1781,21 @@ class Processor:
             return jsonify(ajax_responses)
         else:
             # for page with components build united response
-            c_etrees = {
-                exec_name: self._lxml_add_dom_attrs(
-                    html,
-                    exec_name,
-                    {
-                        k: v
-                        for k, v in state_jsondict.items()
-                        if k not in injected_params_names
-                    },
-                    url,
-                    changes_url,
-                    disabled_actions,
-                )
-                for exec_name, (
-                    fresh,
-                    state_jsondict,
-                    disabled_actions,
-                    injected_params_names,
-                    url,
-                    changes_url,
-                    html,
-                    components,
-                ) in self.renderers.items()
-                if fresh
-                and state_jsondict is not None
-                and url is not None
-                and html is not None
+            # html of every renderer is parsed only when its placeholder is
+            # found and released right after parsing, renderers which are not
+            # referenced by any placeholder (replaced by fresh parent render)
+            # are never parsed
+            c_exec_names = [
+                exec_name
+                for exec_name, render in self.renderers.items()
+                if render.fresh
+                and render.state_jsondict is not None
+                and render.url is not None
+                and render.html is not None
                 and exec_name not in self.components_marked_for_removal
-            }
+            ]
             unused_exec_names = sorted(
-                c_etrees.keys(),
+                c_exec_names,
                 key=lambda exec_name: self.components[exec_name]._config.hiearchy_level,
             )
             response_etree = None
@@ -1640,7 +1803,7 @@ class Processor:
             while unused_exec_names and can_find_placeholder:
                 can_find_placeholder = False
                 if response_etree is None:
-                    response_etree = c_etrees[unused_exec_names.pop(0)]
+                    response_etree = self._consume_render(unused_exec_names.pop(0))
                 # compose response including all components not just page
                 # find all placeholders in response_tree and replace them with
                 # appropriate etrees
@@ -1665,20 +1828,9 @@ class Processor:
                     if exec_name in unused_exec_names:
                         can_find_placeholder = True
                         unused_exec_names.pop(unused_exec_names.index(exec_name))
-                        try:
-                            c_etree = c_etrees[exec_name]
-                            placeholder.addnext(c_etree)
-                        except KeyError:
-                            # exec_name referenced by this placeholder does not exist
-                            # so we will just remove placeholder
-                            # This situation can ocure when handling exceptions
-                            # of child components but not changing display html
-                            # so we can assume that developer just want to ignore
-                            # exception and dont display component that coused exception
-                            pass
-                        finally:
-                            if not permanent:
-                                placeholder.getparent().remove(placeholder)
+                        placeholder.addnext(self._consume_render(exec_name))
+                        if not permanent:
+                            placeholder.getparent().remove(placeholder)
 
             # Remove empty placeholder if thay are left in response
             # because above logic will not find all empty placeholders
@@ -1687,7 +1839,32 @@ class Processor:
                     ".//template[@jmb-placeholder]"
                 ):
                     placeholder.getparent().remove(placeholder)
-            return etree.tostring(response_etree, method="html")
+            # html of renderers is released so response can be built only once
+            self._response = etree.tostring(response_etree, method="html")
+            if self.etag is not None:
+                self._response = current_app.make_response(self._response)
+                self._response.set_etag(self.etag, weak=True)
+            return self._response
+
+    def _consume_render(self, exec_name: str):  # -> "lxml.html.HtmlElement":
+        """
+        Returns etree of component html with dom attrs and releases html
+        string kept by renderer
+        """
+        render = self.renderers[exec_name]
+        self.renderers[exec_name] = render._replace(html=None)
+        return self._lxml_add_dom_attrs(
+            render.html,
+            exec_name,
+            {
+                k: v
+                for k, v in render.state_jsondict.items()
+                if k not in render.injected_params
+            },
+            render.url,
+            render.changes_url,
+            render.disabled_actions,
+        )
 
     def _lxml_add_dom_attrs(
         self,
@@ -1803,9 +1980,9 @@ class Processor:
                 or isinstance(c, EmitCommand)
             )
         )
-        self.renderers = {
-            en: r for en, r in self.renderers.items() if not match_exec_name(en)
-        }
+        self.renderers = ComponentRenderers(
+            (en, r) for en, r in self.renderers.items() if not match_exec_name(en)
+        )
         self.components = {
             en: c for en, c in self.components.items() if not match_exec_name(en)
         }
@@ -0,0 +1,249 @@
+"""
+Records x-jembe requests in production and replays them against local app.
+
+Recording is enabled with ``JEMBE_REQUEST_RECORDER`` Flask config variable
+set to a file path (relative to application root). Every x-jembe POST
+request is appended as one JSON line to the file of the process handling
+it, ``<file path>.<pid>``, so that workers of multi-process servers never
+write or rotate the same file. Files are rotated when they reach
+``JEMBE_REQUEST_RECORDER_MAX_BYTES``. Set ``JEMBE_REQUEST_RECORDER_REDACT``
+to mask state params, init params and action arguments.
+
+Recorded requests are replayed with ``replay`` or ``jembe replay``
+command and reported latency percentiles and command counts can be used
+as regression corpus for ``Processor`` performance.
+"""
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional
+import glob
+import heapq
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from os import makedirs, path
+from flask import g, json, request
+from .defaults import (
+    DEFAULT_JEMBE_REQUEST_RECORDER_BACKUP_COUNT,
+    DEFAULT_JEMBE_REQUEST_RECORDER_MAX_BYTES,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from flask import Flask, Response
+
+__all__ = ("RequestRecorder", "redact", "read_records", "replay")
+
+# headers never written to recording
+SENSITIVE_HEADERS = frozenset(("cookie", "authorization", "proxy-authorization"))
+
+
+def redact(value: Any) -> Any:
+    """Masks strings preserving their length and structure of the value.
+
+    Numbers, booleans and None are kept so that recorded requests can still
+    be replayed (ids, counters, flags).
+    """
+    if isinstance(value, str):
+        return "x" * len(value)
+    elif isinstance(value, dict):
+        return {k: redact(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+def _redact_x_jembe_data(data: dict) -> dict:
+    components = [
+        {**component, "state": redact(component.get("state", {}))}
+        for component in data.get("components", [])
+    ]
+    commands = []
+    for command in data.get("commands", []):
+        command = dict(command)
+        for key in ("initParams", "args", "kwargs", "params"):
+            if key in command:
+                command[key] = redact(command[key])
+        commands.append(command)
+    return {**data, "components": components, "commands": commands}
+
+
+class RequestRecorder:
+    """Records x-jembe requests of Flask application into rotating file per process"""
+
+    def __init__(
+        self,
+        app: "Flask",
+        filename: str,
+        redact_state: bool = False,
+        max_bytes: int = DEFAULT_JEMBE_REQUEST_RECORDER_MAX_BYTES,
+        backup_count: int = DEFAULT_JEMBE_REQUEST_RECORDER_BACKUP_COUNT,
+    ):
+        self.filename = path.join(app.root_path, filename)
+        self.redact_state = redact_state
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        makedirs(path.dirname(self.filename), exist_ok=True)
+        self._logger: Optional[logging.Logger] = None
+        self._logger_pid: Optional[int] = None
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    @property
+    def logger(self) -> logging.Logger:
+        """Logger writing into the file of current process"""
+        # file is opened in worker process, not in the process that forked it
+        if self._logger is None or self._logger_pid != os.getpid():
+            filename = f"{self.filename}.{os.getpid()}"
+            logger = logging.getLogger(f"jembe.recorder.{filename}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            if not logger.handlers:
+                logger.addHandler(
+                    RotatingFileHandler(
+                        filename,
+                        maxBytes=self.max_bytes,
+                        backupCount=self.backup_count,
+                    )
+                )
+            self._logger = logger
+            self._logger_pid = os.getpid()
+        return self._logger
+
+    def _before_request(self):
+        # x-jembe requests except file uploads
+        if (
+            request.method == "POST"
+            and request.headers.get("X-Jembe", "upload") != "upload"
+        ):
+            g.jmb_recorder_start = time.perf_counter()
+
+    def _after_request(self, response: "Response") -> "Response":
+        start = g.pop("jmb_recorder_start", None)
+        if start is not None:
+            self.logger.info(
+                json.dumps(self.record(response, time.perf_counter() - start))
+            )
+        return response
+
+    def record(self, response: "Response", duration: float) -> Dict[str, Any]:
+        try:
+            data = json.loads(request.get_data(as_text=True))
+        except ValueError:
+            data = dict()
+        if self.redact_state and isinstance(data, dict):
+            data = _redact_x_jembe_data(data)
+        return dict(
+            time=datetime.now(timezone.utc).isoformat(),
+            method=request.method,
+            path=request.path,
+            query=request.query_string.decode("latin-1"),
+            headers={
+                k: v
+                for k, v in request.headers.items()
+                if k.lower() not in SENSITIVE_HEADERS
+            },
+            data=data,
+            commands=len(data.get("commands", [])) if isinstance(data, dict) else 0,
+            status=response.status_code,
+            response_size=response.calculate_content_length(),
+            duration=duration,
+        )
+
+
+def _read_file_records(filename: str) -> Iterator[Dict[str, Any]]:
+    """Reads recorded requests from file and its rotated backups, oldest first"""
+    backups = []
+    index = 1
+    while path.exists(f"{filename}.{index}"):
+        backups.append(f"{filename}.{index}")
+        index += 1
+    for name in reversed(backups + [filename]):
+        if not path.exists(name):
+            continue
+        with open(name) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_records(filename: str) -> Iterator[Dict[str, Any]]:
+    """Reads recorded requests, oldest first.
+
+    When filename is ``JEMBE_REQUEST_RECORDER`` path, files of all processes
+    (``<filename>.<pid>``) and their rotated backups are merged by record
+    time. Existing file (e.g. file of one process) is read with its rotated
+    backups. Raises FileNotFoundError when there are no such files.
+    """
+    if path.isfile(filename):
+        return _read_file_records(filename)
+    process_files = [
+        name
+        for name in glob.glob(f"{glob.escape(filename)}.*")
+        if name[len(filename) + 1 :].isdigit()
+    ]
+    if not process_files:
+        raise FileNotFoundError(f"No recorded requests in '{filename}'")
+    return heapq.merge(
+        *(_read_file_records(name) for name in sorted(process_files)),
+        key=lambda record: record.get("time", ""),
+    )
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    index = max(0, min(len(values) - 1, int(round(percent / 100 * len(values))) - 1))
+    return values[index]
+
+
+def replay(
+    app: "Flask", records: Iterable[Dict[str, Any]], repeat: int = 1
+) -> Dict[str, Any]:
+    """Sends recorded requests to the application with Flask test client.
+
+    Returns:
+        Report with latency percentiles (in seconds), command counts
+        and number of responses by status code compared to recorded status.
+    """
+    client = app.test_client()
+    latencies: List[float] = []
+    commands: List[int] = []
+    statuses: Dict[str, int] = {}
+    mismatched = 0
+    for record in records:
+        headers = {
+            k: v
+            for k, v in record.get("headers", {}).items()
+            if k.lower() not in ("content-length", "host")
+        }
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.open(
+                record["path"],
+                method=record.get("method", "POST"),
+                query_string=record.get("query", ""),
+                data=json.dumps(record.get("data", {})),
+                headers=headers,
+            )
+            latencies.append(time.perf_counter() - start)
+            commands.append(record.get("commands", 0))
+            statuses[str(response.status_code)] = (
+                statuses.get(str(response.status_code), 0) + 1
+            )
+            if "status" in record and record["status"] != response.status_code:
+                mismatched += 1
+
+    report: Dict[str, Any] = dict(
+        requests=len(latencies), statuses=statuses, status_mismatches=mismatched
+    )
+    if latencies:
+        sorted_latencies = sorted(latencies)
+        report["latency"] = {
+            f"p{p}": _percentile(sorted_latencies, p) for p in (50, 90, 95, 99)
+        }
+        report["latency"]["max"] = sorted_latencies[-1]
+        report["commands"] = dict(
+            total=sum(commands),
+            max=max(commands),
+            mean=sum(commands) / len(commands),
+        )
+    return report
@@ -0,0 +1,191 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+import re
+from werkzeug.exceptions import NotFound
+from werkzeug.routing import (
+    BaseConverter,
+    PathConverter,
+    ValidationError,
+    parse_converter_args,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    import jembe
+    from werkzeug.routing import Map
+
+__all__ = ("ComponentPathConverter", "ComponentRouter")
+
+
+class ComponentPathConverter(BaseConverter):
+    """Matches the rest of the page url (including slashes and empty string).
+
+    Value is already url encoded by the converters of the component url params,
+    so it is passed to the url unchanged.
+    """
+
+    regex = ".*"
+    weight = 300
+    part_isolating = False
+
+    def to_url(self, value: Any) -> str:
+        return str(value)
+
+
+class _ComponentUrlNode:
+    """Node of the router trie, one for every registred component config"""
+
+    def __init__(self, config: "jembe.ComponentConfig", url_map: "Map"):
+        self.config = config
+        self.key_identifier = config._key_url_param.identifier
+        self.params: Tuple[Tuple[str, BaseConverter, "re.Pattern"], ...] = tuple(
+            (up.identifier, *_make_converter(url_map, up.convertor.value))
+            for up in config._url_params
+        )
+        self.children: Dict[str, "_ComponentUrlNode"] = {}
+
+
+def _make_converter(
+    url_map: "Map", convertor: str
+) -> Tuple[BaseConverter, "re.Pattern"]:
+    name, _, args = convertor.partition("(")
+    c_args, c_kwargs = parse_converter_args(args[:-1]) if args else ((), {})
+    converter = url_map.converters[name](url_map, *c_args, **c_kwargs)
+    return converter, re.compile(converter.regex)
+
+
+class ComponentRouter:
+    """Resolves components of a page from a single catch-all url rule.
+
+    Instead of registering one werkzeug rule per component config, the page
+    registers one rule that captures the rest of the url path in
+    ``PATH_PARAM``. Path is then matched against a trie of component configs
+    built from the same segments as ``ComponentConfig.url_path``::
+
+        /{page}{.key}/{param}/.../{child}{.key}/{param}/...
+
+    Resolved ``view_args`` use the same identifiers (``component_key__1``,
+    ``param__1`` ...) as the rules generated from ``url_path``, so the
+    processor creates commands from them in the same way.
+    """
+
+    ENDPOINT = "jembe_component_router"
+    CONVERTER = "jembe_component_path"
+    PATH_PARAM = "jembe_component_path"
+
+    def __init__(self, url_map: "Map"):
+        self.url_map = url_map
+        self.url_map.converters[self.CONVERTER] = ComponentPathConverter
+        # page name -> root node of the page trie
+        self.pages: Dict[str, _ComponentUrlNode] = {}
+        # component full_name -> node
+        self._nodes: Dict[str, _ComponentUrlNode] = {}
+
+    def url_rule(self, page_name: str) -> str:
+        return f"/{page_name}<{self.CONVERTER}:{self.PATH_PARAM}>"
+
+    def add(self, config: "jembe.ComponentConfig"):
+        node = _ComponentUrlNode(config, self.url_map)
+        if config.parent is None:
+            self.pages[config.name] = node
+        else:
+            self._nodes[config.parent.full_name].children[config.name] = node
+        self._nodes[config.full_name] = node
+
+    def remove(self, config: "jembe.ComponentConfig"):
+        """Removes component config added to the router"""
+        if self._nodes.pop(config.full_name, None) is None:
+            return
+        if config.parent is None:
+            self.pages.pop(config.name, None)
+        elif config.parent.full_name in self._nodes:
+            self._nodes[config.parent.full_name].children.pop(config.name, None)
+
+    def resolve(self, page_name: str, path: str) -> Tuple[str, Dict[str, Any]]:
+        """Returns full name of the component and its view args from the url path.
+
+        Raises:
+            NotFound: When path does not match any component of the page
+        """
+        try:
+            page = self.pages[page_name]
+        except KeyError:
+            raise NotFound()
+        segments = path.split("/")
+        if not self._is_key(segments[0]):
+            raise NotFound()
+        match = self._match(page, segments, 1, 0, {page.key_identifier: segments[0]})
+        if match is None:
+            raise NotFound()
+        return match
+
+    def build(self, config: "jembe.ComponentConfig", url_params: Dict[str, Any]):
+        """Returns ``url_for`` values for the component url.
+
+        Url params of the component and its parents are encoded in ``PATH_PARAM``
+        and the rest of the ``url_params`` are left to ``url_for``.
+        """
+        values = dict(url_params)
+        nodes: List[_ComponentUrlNode] = []
+        current: Optional["jembe.ComponentConfig"] = config
+        while current is not None:
+            nodes.append(self._nodes[current.full_name])
+            current = current.parent
+        parts: List[str] = []
+        for index, node in enumerate(reversed(nodes)):
+            key = values.pop(node.key_identifier, "")
+            parts.append(key if index == 0 else f"/{node.config.name}{key}")
+            for identifier, converter, _ in node.params:
+                parts.append(f"/{converter.to_url(values.pop(identifier))}")
+        values[self.PATH_PARAM] = "".join(parts)
+        return values
+
+    @staticmethod
+    def _is_key(value: str) -> bool:
+        return value == "" or value.startswith(".")
+
+    def _match(
+        self,
+        node: _ComponentUrlNode,
+        segments: List[str],
+        pos: int,
+        param_index: int,
+        view_args: Dict[str, Any],
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if param_index < len(node.params):
+            identifier, converter, regex = node.params[param_index]
+            if isinstance(converter, PathConverter):
+                # path params can span multiple segments, try shortest match first
+                ends = range(pos + 1, len(segments) + 1)
+            else:
+                ends = range(pos + 1, pos + 2) if pos < len(segments) else range(0)
+            for end in ends:
+                value = "/".join(segments[pos:end])
+                if not regex.fullmatch(value):
+                    continue
+                try:
+                    value = converter.to_python(value)
+                except ValidationError:
+                    continue
+                match = self._match(
+                    node,
+                    segments,
+                    end,
+                    param_index + 1,
+                    {**view_args, identifier: value},
+                )
+                if match is not None:
+                    return match
+            return None
+
+        if pos == len(segments):
+            return node.config.full_name, view_args
+        name, separator, key = segments[pos].partition(".")
+        child = node.children.get(name)
+        if child is None:
+            return None
+        return self._match(
+            child,
+            segments,
+            pos + 1,
+            0,
+            {**view_args, child.key_identifier: f"{separator}{key}"},
+        )
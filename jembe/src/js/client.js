@@ -254,14 +254,8 @@ class UploadedFile {
     this.files = files;
     this.multipleFiles = files instanceof FileList || files instanceof Array;
   }
-  addToFormData(formData) {
-    if (this.multipleFiles) {
-      for (const file of this.files) {
-        formData.append(this.fileUploadId, file);
-      }
-    } else {
-      formData.append(this.fileUploadId, this.files);
-    }
+  getFiles() {
+    return this.multipleFiles ? Array.from(this.files) : [this.files];
   }
 }
 /**
@@ -276,6 +270,13 @@ class JembeClient {
     this.updateLocation(true);
     this.commands = [];
     this.filesForUpload = {};
+    // files larger than uploadChunkSize are uploaded in chunks
+    // that are resent up to uploadRetries times on network error
+    this.uploadChunkSize = 4 * 1024 * 1024;
+    this.uploadRetries = 3;
+    this.uploadRetryDelay = 1000;
+    // number of files uploaded concurrently
+    this.uploadConcurrency = 3;
     this.domParser = new DOMParser();
     this.xRequestUrl = null;
 
@@ -615,17 +616,6 @@ class JembeClient {
       }
     }
   }
-  getXUploadRequestFormData() {
-    if (Object.keys(this.filesForUpload).length === 0) {
-      // no files for uplaod
-      return null;
-    }
-    let fd = new FormData();
-    for (const uf of Object.values(this.filesForUpload)) {
-      uf.addToFormData(fd);
-    }
-    return fd;
-  }
   getXRequestJson(addComponents = true) {
     return JSON.stringify({
       components: addComponents
@@ -637,51 +627,206 @@ class JembeClient {
   setXRequestUrl(url) {
     this.xRequestUrl = url;
   }
-  executeUpload() {
-    const url = "/jembe/upload_files";
-    const uploadFormData = this.getXUploadRequestFormData();
-    if (uploadFormData === null) {
-      return new Promise((resolve, reject) => {
-        resolve(null);
-      });
-    }
+  getXUploadRequestHeaders(uploadId = null) {
     const headers =
       this.xRequestHeadersGenerators.length === 0
         ? {}
         : this.calculateXRequestHeaders();
     headers["X-JEMBE"] = "upload";
+    if (uploadId !== null) {
+      headers["X-JEMBE-UPLOAD-ID"] = uploadId;
+    }
+    return headers;
+  }
+  fetchUpload(headers, body) {
     return window
-      .fetch(url, {
+      .fetch("/jembe/upload_files", {
         method: "POST",
         cache: "no-cache",
         credentials: "same-origin",
         redirect: "follow",
         referrer: "no-referrer",
         headers: headers,
-        body: uploadFormData,
+        body: body,
       })
       .then((response) => {
-        if (!response.ok) {
+        // 409 is returned with offset of received bytes when chunk is out of order
+        if (!response.ok && response.status !== 409) {
           this.dispatchUpdatePageErrorEvent(response, null, false);
           console.log("Error in x-jmebe upload response");
           throw Error("errorInJembeResponse");
         }
         return response.json();
+      });
+  }
+  /**
+   * Uploads file in chunks of uploadChunkSize into upload with uploadId
+   * (new upload is started when uploadId is null). On network error upload is
+   * resumed from the offset received by the server, up to uploadRetries times
+   * in a row.
+   * onProgress is called with number of bytes received by the server after
+   * every chunk.
+   * Returns promise of the json response to the last chunk.
+   */
+  async uploadFileInChunks(uploadId, fileUploadId, index, file, onProgress = null) {
+    const chunkHeaders = (contentRange) => {
+      const headers = this.getXUploadRequestHeaders(uploadId);
+      headers["X-JEMBE-UPLOAD-FILE"] = fileUploadId;
+      headers["X-JEMBE-UPLOAD-INDEX"] = index;
+      headers["X-JEMBE-UPLOAD-FILENAME"] = encodeURIComponent(file.name);
+      headers["Content-Range"] = contentRange;
+      return headers;
+    };
+    let offset = 0;
+    let receivedOffset = 0;
+    let retriesLeft = this.uploadRetries;
+    let resume = false;
+    for (;;) {
+      let json;
+      try {
+        if (resume) {
+          await new Promise((resolve) =>
+            setTimeout(resolve, this.uploadRetryDelay)
+          );
+        }
+        if (resume && uploadId !== null) {
+          // asks server for the offset of received bytes
+          json = await this.fetchUpload(chunkHeaders(`bytes */${file.size}`), null);
+        } else {
+          const end = Math.min(offset + this.uploadChunkSize, file.size);
+          json = await this.fetchUpload(
+            chunkHeaders(`bytes ${offset}-${end - 1}/${file.size}`),
+            file.slice(offset, end)
+          );
+        }
+      } catch (error) {
+        if (error.message === "errorInJembeResponse" || retriesLeft <= 0) {
+          throw error;
+        }
+        retriesLeft -= 1;
+        resume = true;
+        continue;
+      }
+      uploadId = json.fileUploadResponseId;
+      offset = json.offset;
+      if (onProgress !== null) {
+        onProgress(offset - receivedOffset);
+        receivedOffset = offset;
+      }
+      if (json.files[fileUploadId] !== undefined) {
+        return json;
+      }
+      resume = false;
+      retriesLeft = this.uploadRetries;
+    }
+  }
+  /**
+   * Uploads one file into upload with uploadId, in chunks if it is larger
+   * than uploadChunkSize. Returns promise of uploaded file
+   * {storage=storage_name, path=file_path} and upload id.
+   */
+  uploadFile(uploadId, fileUploadId, index, file, onProgress) {
+    if (this.uploadChunkSize > 0 && file.size > this.uploadChunkSize) {
+      return this.uploadFileInChunks(
+        uploadId,
+        fileUploadId,
+        index,
+        file,
+        onProgress
+      ).then((json) => [json.files[fileUploadId][0], json.fileUploadResponseId]);
+    }
+    const formData = new FormData();
+    formData.append(fileUploadId, file);
+    return this.fetchUpload(this.getXUploadRequestHeaders(uploadId), formData).then(
+      (json) => {
+        onProgress(file.size);
+        return [
+          json.files[fileUploadId] !== undefined
+            ? json.files[fileUploadId][0]
+            : undefined,
+          json.fileUploadResponseId,
+        ];
+      }
+    );
+  }
+  executeUpload() {
+    if (Object.keys(this.filesForUpload).length === 0) {
+      // no files for uplaod
+      return new Promise((resolve, reject) => {
+        resolve(null);
+      });
+    }
+    // every file is uploaded with its own request, up to uploadConcurrency
+    // files at the same time, all of them into the same upload
+    // (fileUploadResponseId) started by the first request
+    const uploads = [];
+    const uploadedFiles = {};
+    for (const uf of Object.values(this.filesForUpload)) {
+      uploadedFiles[uf.fileUploadId] = [];
+      uf.getFiles().forEach((file, index) => {
+        uploads.push([uf.fileUploadId, index, file]);
+      });
+    }
+    const progress = {
+      loaded: 0,
+      total: uploads.reduce((total, [, , file]) => total + file.size, 0),
+      uploadedFiles: 0,
+      totalFiles: uploads.length,
+    };
+    const onProgress = (loaded) => {
+      progress.loaded += loaded;
+      this.dispatchUploadProgressEvent(progress);
+    };
+    const startUpload =
+      uploads.length > 1
+        ? // empty upload request creates upload without files
+          this.fetchUpload(this.getXUploadRequestHeaders(), new FormData()).then(
+            (json) => json.fileUploadResponseId
+          )
+        : Promise.resolve(null);
+    return startUpload
+      .then((uploadId) => {
+        let next = 0;
+        const uploadNext = () => {
+          if (next >= uploads.length) {
+            return Promise.resolve();
+          }
+          const [fileUploadId, index, file] = uploads[next];
+          next += 1;
+          return this.uploadFile(uploadId, fileUploadId, index, file, onProgress)
+            .then(([ufile, fileUploadResponseId]) => {
+              uploadedFiles[fileUploadId][index] = ufile;
+              uploadId = fileUploadResponseId;
+              progress.uploadedFiles += 1;
+              this.dispatchUploadProgressEvent(progress);
+            })
+            .then(uploadNext);
+        };
+        const workers = [];
+        for (
+          let i = 0;
+          i < Math.max(1, Math.min(this.uploadConcurrency, uploads.length));
+          i++
+        ) {
+          workers.push(uploadNext());
+        }
+        return Promise.all(workers).then(() => uploadId);
       })
-      .then((json) => {
-        // fileupload returns files = dict(fileUploadId, [{storage=storage_name, path=file_path}]) and unique fileUplaodResponseId
-        for (const fileUploadId of Object.keys(json.files)) {
+      .then((fileUploadResponseId) => {
+        for (const fu of Object.values(this.filesForUpload)) {
           // replace all uploaded files init params with
           //(storage=storage_name, path=file_path) returned from x-jembe=fileupload request
-          const ufiles = json.files[fileUploadId];
-          const fu = this.filesForUpload[fileUploadId];
-          this.addInitialiseCommand(fu.execName, {
-            [fu.paramName]: fu.multipleFiles ? ufiles : ufiles[0],
-          });
+          const ufiles = uploadedFiles[fu.fileUploadId].filter(
+            (ufile) => ufile !== undefined
+          );
+          if (ufiles.length > 0) {
+            this.addInitialiseCommand(fu.execName, {
+              [fu.paramName]: fu.multipleFiles ? ufiles : ufiles[0],
+            });
+          }
         }
-
         this.filesForUpload = {};
-        return json.fileUploadResponseId;
+        return fileUploadResponseId;
       });
   }
   executeCommands(
@@ -849,6 +994,18 @@ class JembeClient {
       })
     );
   }
+  dispatchUploadProgressEvent(progress) {
+    window.dispatchEvent(
+      new CustomEvent("jembeUploadProgress", {
+        detail: {
+          loaded: progress.loaded,
+          total: progress.total,
+          uploadedFiles: progress.uploadedFiles,
+          totalFiles: progress.totalFiles,
+        },
+      })
+    );
+  }
   dispatchUpdatePageErrorEvent(
     response = null,
     error = null,
@@ -49,7 +49,1138 @@ var e=require("process");function r(e){if("string"!=typeof e)throw new TypeError
 },{"./util":"OYlt","./specialElHandlers":"QtAh","path-browserify":"Diwz"}],"APca":[function(require,module,exports) {
 "use strict";Object.defineProperty(exports,"__esModule",{value:!0}),exports.default=void 0;var e=t(require("./morphAttrs")),r=t(require("./morphdom"));function t(e){return e&&e.__esModule?e:{default:e}}var u=(0,r.default)(e.default),o=u;exports.default=o;
 },{"./morphAttrs":"JRPW","./morphdom":"Orhj"}],"IVsl":[function(require,module,exports) {
-"use strict";Object.defineProperty(exports,"__esModule",{value:!0}),exports.JembeClient=void 0;var _index=_interopRequireDefault(require("./componentApi/index.js")),_utils=require("./utils.js"),_index2=_interopRequireDefault(require("./morphdom/index.js")),_utils2=require("./componentApi/utils.js"),_jmb=_interopRequireDefault(require("./componentApi/magic/jmb.js"));function _interopRequireDefault(e){return e&&e.__esModule?e:{default:e}}class ComponentRef{constructor(e,t,s,n,o){this.jembeClient=e,this.execName=t,this.hierarchyLevel=t.split("/").length,this.isPageComponent=2===this.hierarchyLevel,this.state=s.state,this.url=s.url,this.changesUrl=s.changesUrl,this.actions=void 0!==s.actions?s.actions:{},this.dom=this._cleanDom(n),this.onDocument=o,this.placeHolders={},this.permanentPlaceHolders={},this.api=null}mount(e){this._getPlaceHolders(),null===this.api&&(this.api=new _index.default(this)),this.api.mount(e),this._add_support_for_jmb_changed_attr_to_inputs()}remove(){const e=this.dom;return this.unmount(),e.remove(),this.execName}unmount(){null!==this.api&&this.api.unmount(),this.api=null,this.dom=null}toJsonRequest(){return{execName:this.execName,state:this.state}}merge(e,t){if(!this.isPageComponent||!this.onDocument)if(this.onDocument&&void 0!==t&&t.dom.isSameNode(this.dom)&&Object.keys(e.placeHolders).includes(this.execName))e.placeHolders[this.execName].isSameNode(this.dom)||(e.placeHolders[this.execName].replaceWith(this.dom),e.placeHolders[this.execName]=this.dom);else{if(this.isPageComponent){let e=this.jembeClient.document.documentElement;this.dom=e=this._morphdom(e,this.dom),this.dom.setAttribute("jmb-name",this.execName)}else if(Object.keys(e.placeHolders).includes(this.execName))this.dom=this._morphdom(e.placeHolders[this.execName],this.dom),e.placeHolders[this.execName]=this.dom;else{const t=document.createElement("template");t.setAttribute("jmb-placeholder",this.execName);const s=e.permanentPlaceHolders[this.execName].insertAdjacentElement("afterend",t);this.dom=this._morphdom(s,this.dom),e.placeHolders[this.execName]=this.dom}this.onDocument=!0,this.mount(void 0!==t&&t.execName===this.execName?t:void 0)}}_morphdom(e,t){return(0,_index2.default)(e,t,{getNodeKey:e=>e.nodeType===Node.ELEMENT_NODE&&e.hasAttribute("jmb-name")?e.getAttribute("jmb-name"):e.id,onBeforeElUpdated:(e,t)=>!e.isEqualNode(t)&&(!(!this.isPageComponent&&e.hasAttribute("jmb-name")&&e.getAttribute("jmb-name")!==this.execName)&&((!e.hasAttribute("jmb-placeholder")||e.getAttribute("jmb-placeholder")===this.execName)&&!e.hasAttribute("jmb-ignore"))),onBeforeNodeDiscarded:e=>{if(e.nodeType===Node.ELEMENT_NODE){let t=e.querySelectorAll("[jmb-on-remove]");for(const e of t)(0,_utils2.saferEvalNoReturn)(e,e.getAttribute("jmb-on-remove"),{},{$self:e})}return!0},childrenOnly:this.isPageComponent})}_getPlaceHolders(){this.placeHolders={},this.permanentPlaceHolders={},(0,_utils.walkComponentDom)(this.dom,e=>{e.hasAttribute("jmb-placeholder-permanent")&&(this.permanentPlaceHolders[e.getAttribute("jmb-placeholder-permanent")]=e)},(e,t)=>{this.placeHolders[t]=e})}_cleanDom(e){if("string"==typeof e){let t=e.trim();if(this.isPageComponent){const s=this.jembeClient.domParser.parseFromString(t,"text/html");s.documentElement.setAttribute("jmb-name",this.execName),e=s.documentElement}else{let s=this.jembeClient.document.createElement("template");if(s.innerHTML=t,s.content.childNodes.length>1||0===s.content.childNodes.length||s.content.firstChild.nodeType===Node.TEXT_NODE||1===s.content.childNodes.length&&(s.content.firstChild.hasAttribute("jmb-name")||s.content.firstChild.hasAttribute("jmb-placeholder"))){let e=this.jembeClient.document.createElement("div"),t=s.content.firstChild;for(;t;){let s=t.nextSibling;e.appendChild(t),t=s}s.content.appendChild(e)}s.content.firstChild.setAttribute("jmb-name",this.execName),e=s.content.firstChild}}return e.removeAttribute("jmb-data"),e}_add_support_for_jmb_changed_attr_to_inputs(){for(const e of this.dom.querySelectorAll("input"))e.removeEventListener("change",this._jmb_input_changed_attr_listener,!1),e.addEventListener("change",this._jmb_input_changed_attr_listener,!1)}_jmb_input_changed_attr_listener(e){e.target.setAttribute("jmb-input-changed","")}}class UploadedFile{constructor(e,t,s,n){this.execName=e,this.paramName=t,this.fileUploadId=s,this.files=n,this.multipleFiles=n instanceof FileList||n instanceof Array}addToFormData(e){if(this.multipleFiles)for(const t of this.files)e.append(this.fileUploadId,t);else e.append(this.fileUploadId,this.files)}}class JembeClient{constructor(e=document){this.document=e,this.components={},this.getComponentsFromDocument(),this.updateLocation(!0),this.commands=[],this.filesForUpload={},this.domParser=new DOMParser,this.xRequestUrl=null,this.xRequestsInProgress=0,this.xRequestActiveElement=null,this.xRequestActiveElementId=null,this.xRequestDisabledElements=[],this.disableInputBeforeRequestTimeoutId=null,window.onpopstate=this.onHistoryPopState,this.xRequestHeadersGenerators=[]}getComponentsFromDocument(){this.components={};let componentsNodes=this.document.querySelectorAll("[jmb-name][jmb-data]");for(const componentNode of componentsNodes){const componentRef=new ComponentRef(this,componentNode.getAttribute("jmb-name"),eval(`(${componentNode.getAttribute("jmb-data")})`),componentNode,!0);this.components[componentRef.execName]=componentRef,componentRef.mount()}}getComponentsAndGlobalsFromXResponse(e){let t={},s={removeComponents:[],callWindowOpen:[]};for(const n of e)if(Object.keys(n).includes("globals"))s={removeComponents:void 0!==n.removeComponents?n.removeComponents:[],callWindowOpen:void 0!==n.callWindowOpen?n.callWindowOpen:[]};else{n.dom;t[n.execName]=new ComponentRef(this,n.execName,{url:n.url,changesUrl:n.changesUrl,state:n.state,actions:n.actions},n.dom,!1)}return{components:t,globals:s}}updateDocument({components:e,globals:t}){let s={};for(const[m,d]of Object.entries(this.components))void 0===e[m]?s[m]=d:s[m]=e[m];for(const[m,d]of Object.entries(e))void 0===s[m]&&(s[m]=d);let n=Object.values(s).filter(e=>e.isPageComponent).map(e=>e.execName),o=n[0];if(n.length>1)for(const m of n)s[m].onDocument||(o=m);let i=[o],a={};for(;i.length>0;){const e=s[i.shift()];if(void 0!==e){let t=this.components[e.execName],s=Object.values(a).find(t=>Object.keys(t.placeHolders).includes(e.execName)||Object.keys(t.permanentPlaceHolders).includes(e.execName));e.merge(s,t),a[e.execName]=e;for(const n of Object.keys(e.placeHolders))i.push(n);for(const n of Object.keys(e.permanentPlaceHolders))Object.keys(e.placeHolders).includes(n)||i.push(n)}}for(const[m,d]of Object.entries(this.components))Object.keys(a).includes(m)&&a[m]===d||d.unmount();let l,r=[];for(;void 0!==(l=t.removeComponents.pop());)if(Object.keys(a).includes(l)&&!r.includes(l)){for(const e of Object.keys(a[l].placeHolders))t.removeComponents.push(e);r.push(a[l].remove()),delete a[l.split("/").slice(0,-1).join("/")].placeHolders[l]}for(const m of r)delete a[m];for(const m of t.callWindowOpen)window.open(m,"_blank");this.components=a}addInitialiseCommand(e,t,s=!0){const n=this.commands.filter(t=>"init"===t.type&&t.componentExecName===e);if(!0===s&&n.length>0){const e=n[0];for(const[s,n]of Object.entries(t))e.initParams=this._updateParam(e.initParams,s,n)}else{if(!0===s&&0===Object.keys(t).length&&void 0!==this.components[e])return;let o=!0===s&&void 0!==this.components[e]?(0,_utils.deepCopy)(this.components[e].state):{};for(const[e,s]of Object.entries(t))o=this._updateParam(o,e,s);if(!1===s&&n>0){const e=n[0];e.initParams=o,e.mergeExistingParams=s}else this.commands.push({type:"init",componentExecName:e,initParams:o,mergeExistingParams:s})}}_updateParam(e,t,s){if(t.startsWith(".")||t.endsWith("."))throw"paramName cant start or end in dot (.)";return this._updateParamR(e,t.split("."),s)}_updateParamR(e,t,s){let n=t[0];return 1===t.length?e[n]=s:void 0===e[n]?e[n]=this._updateParamR({},t.slice(1),s):e[n]=this._updateParamR(e[n],t.slice(1),s),e}addCallCommand(e,t,s=[],n={}){const o=this.commands.findIndex(o=>"call"===o.type&&o.componentExecName===e&&o.actionName===t&&JSON.stringify(o.args)===JSON.stringify(s)&&JSON.stringify(o.kwargs)===JSON.stringify(n));o>=0&&this.commands.splice(o,1),this.commands.push({type:"call",componentExecName:e,actionName:t,args:s,kwargs:n})}addEmitCommand(e,t,s={},n=null){this.commands.push({type:"emit",componentExecName:e,eventName:t,params:s,to:n})}addFilesForUpload(e,t,s){let n=null;for(const o of Object.values(this.filesForUpload))o.execName===e&&o.paramName===t&&(n=o.fileUploadId);if(null!==n&&delete this.filesForUpload[n],(s instanceof FileList||s instanceof Array)&&s.length>0||s instanceof File){let n=null;for(;null==n||Object.keys(this.filesForUpload).includes(n);)n=Math.random().toString(36).substring(7);this.filesForUpload[n]=new UploadedFile(e,t,n,s),this.addInitialiseCommand(e,{[t]:n})}else{let s=this.commands.findIndex(s=>s.componentExecName===e&&"init"===s.type&&Object.keys(s.initParams).includes(t)&&1===Object.keys(s.initParams).length);s>=0&&this.commands.splice(s,1)}}getXUploadRequestFormData(){if(0===Object.keys(this.filesForUpload).length)return null;let e=new FormData;for(const t of Object.values(this.filesForUpload))t.addToFormData(e);return e}getXRequestJson(e=!0){return JSON.stringify({components:e?Object.values(this.components).map(e=>e.toJsonRequest()):[],commands:this.commands})}setXRequestUrl(e){this.xRequestUrl=e}executeUpload(){const e=this.getXUploadRequestFormData();if(null===e)return new Promise((e,t)=>{e(null)});const t=0===this.xRequestHeadersGenerators.length?{}:this.calculateXRequestHeaders();return t["X-JEMBE"]="upload",window.fetch("/jembe/upload_files",{method:"POST",cache:"no-cache",credentials:"same-origin",redirect:"follow",referrer:"no-referrer",headers:t,body:e}).then(e=>{if(!e.ok)throw this.dispatchUpdatePageErrorEvent(e,null,!1),console.log("Error in x-jmebe upload response"),Error("errorInJembeResponse");return e.json()}).then(e=>{for(const t of Object.keys(e.files)){const s=e.files[t],n=this.filesForUpload[t];this.addInitialiseCommand(n.execName,{[n.paramName]:n.multipleFiles?s:s[0]})}return this.filesForUpload={},e.fileUploadResponseId})}executeCommands(e=!0,t=!0,s=!0){const n=null!==this.xRequestUrl?this.xRequestUrl:window.location.href;this.dispatchStartUpdatePageEvent(!0,e),this.executeUpload().then(o=>{const i=this.getXRequestJson(s);this.commands=[];const a=0===this.xRequestHeadersGenerators.length?{}:this.calculateXRequestHeaders();a["X-JEMBE"]="commands",null!==o&&(a["X-JEMBE-RELATED-UPLOAD"]=o),window.fetch(n,{method:"POST",cache:"no-cache",credentials:"same-origin",redirect:"follow",referrer:"no-referrer",headers:a,body:i}).then(t=>{if(!t.ok)throw e&&(this.xRequestsInProgress-=1,this.enableInputsAfterResponse()),console.info("Error x-jembe response",t),this.dispatchUpdatePageErrorEvent(t,null,e),Error("errorInJembeResponse");return t.json()}).then(e=>this.getComponentsAndGlobalsFromXResponse(e)).then(s=>{this.updateDocument(s),t&&e&&this.updateLocation(),e&&(this.xRequestsInProgress-=1,this.enableInputsAfterResponse()),this.dispatchUpdatePageEvent(!0,e,this.components)}).catch(t=>{"errorInJembeResponse"!=t.message&&(console.info("Error x-jembe request",t),this.dispatchUpdatePageErrorEvent(null,t,e)),e&&(this.xRequestsInProgress-=1,this.enableInputsAfterResponse())})}).catch(t=>{"errorInJembeResponse"!=t.message&&(console.info("Error x-jembe request",t),this.dispatchUpdatePageErrorEvent(null,t,e)),e&&(this.xRequestsInProgress-=1,this.enableInputsAfterResponse())})}updateLocation(e=!1){let t=null,s=-1,n=[];for(const o of Object.values(this.components))o.hierarchyLevel>s&&!0===o.changesUrl&&(t=o,s=o.hierarchyLevel),n.push(o.toJsonRequest());null!==t&&(e?window.history.replaceState(n,"",t.url):window.history.pushState(n,"",t.url))}onHistoryPopState(e){if(null===e.state)window.location=document.location;else{for(const s of e.state)this.jembeClient.addInitialiseCommand(s.execName,s.state,!1);let t=e.state.map(e=>e.execName);t=t.sort((e,t)=>t.split("/").length-e.split("/").length);for(const e of t)this.jembeClient.addCallCommand(e,"display");this.jembeClient.executeCommands(!0,!1,!1)}}component(e){const t=e.closest("[jmb-name]").getAttribute("jmb-name");return new _jmb.default(this,t)}dispatchUpdatePageEvent(e=!0,t=!0,s={}){window.dispatchEvent(new CustomEvent("jembeUpdatePage",{detail:{isXUpdate:e,inputsDisabled:t,components:Object.fromEntries(Object.entries(s).map(([e,t])=>[e,t.dom]))}}))}dispatchStartUpdatePageEvent(e=!0,t=!0){t&&e&&(this.xRequestsInProgress+=1,1===this.xRequestsInProgress&&(this.disableInputBeforeRequestTimeoutId=window.setTimeout(()=>{this.disableInputsBeforeRequest()},50))),window.dispatchEvent(new CustomEvent("jembeStartUpdatePage",{detail:{isXUpdate:e,inputsDisabled:t}}))}dispatchUpdatePageErrorEvent(e=null,t=null,s=!0){window.dispatchEvent(new CustomEvent("jembeUpdatePageError",{detail:{inputsDisabled:s,networkError:null!==t,response:e,error:t}}))}disableInputsBeforeRequest(){null!==this.document.activeElement&&(this.xRequestActiveElement=this.document.activeElement,this.xRequestActiveElementId=this.document.activeElement.id),(0,_utils2.walk)(this.document.documentElement,e=>{if(e.hasAttribute("jmb-ignore"))return!1;"button"===e.tagName.toLowerCase()||"select"===e.tagName.toLowerCase()||"input"===e.tagName.toLowerCase()&&("checkbox"===e.type||"radio"===e.type)?(e.setAttribute("jmb-node-initially-disabled",e.disabled),e.disabled||(e.disabled=!0,this.xRequestDisabledElements.push(()=>{e.hasAttribute("jmb-node-initially-disabled")&&(e.disabled="true"===e.getAttribute("jmb-node-initially-disabled"),e.removeAttribute("jmb-node-initially-disabled"))}))):"input"!==e.tagName.toLowerCase()&&"textarea"!==e.tagName.toLowerCase()||(e.setAttribute("jmb-node-initially-readonly",e.readOnly),e.setAttribute("jmb-node-initially-disabled",e.disabled),e.readOnly||(e.readOnly=!0,e.disabled=!0,this.xRequestDisabledElements.push(()=>{e.hasAttribute("jmb-node-initially-readonly")&&(e.readOnly="true"===e.getAttribute("jmb-node-initially-readonly"),e.removeAttribute("jmb-node-initially-readonly")),e.hasAttribute("jmb-node-initially-disabled")&&(e.disabled="true"===e.getAttribute("jmb-node-initially-disabled"),e.removeAttribute("jmb-node-initially-disabled"))})))})}enableInputsAfterResponse(){if(window.clearTimeout(this.disableInputBeforeRequestTimeoutId),0===this.xRequestsInProgress){for(let e of this.xRequestDisabledElements)e();if(this.xRequestDisabledElements=[],null!==this.xRequestActiveElement&&this.document.contains(this.xRequestActiveElement))this.xRequestActiveElement.focus();else if(null!==this.xRequestActiveElementId){const e=this.document.getElementById(this.xRequestActiveElementId);null!==e&&e.focus()}this.xRequestActiveElement=null}}addXRequestHeaderGenerator(e){this.xRequestHeadersGenerators.push(e)}calculateXRequestHeaders(){let e={};for(const t of this.xRequestHeadersGenerators)e={...e,...t()};return e}getCookie(e){return(0,_utils.getCookie)(e)}walkComponent(e,t){e instanceof String&&(e=this.document.querySelector(`[jmb-name=${e}]`)),(0,_utils.walkComponentDom)(e,t)}walkDocument(e){(0,_utils2.walk)(this.document.documentElement,e)}}exports.JembeClient=JembeClient;
+"use strict";Object.defineProperty(exports,"__esModule",{value:!0}),exports.JembeClient=void 0;var _index=_interopRequireDefault(require("./componentApi/index.js")),_utils=require("./utils.js"),_index2=_interopRequireDefault(require("./morphdom/index.js")),_utils2=require("./componentApi/utils.js"),_jmb=_interopRequireDefault(require("./componentApi/magic/jmb.js"));function _interopRequireDefault(e){return e&&e.__esModule?e:{default:e}}
+
+
+
+
+
+/**
+ * Reference to component html with associated data
+ */
+class ComponentRef {
+  constructor(jembeClient, execName, data, dom, onDocument) {
+    this.jembeClient = jembeClient;
+
+    this.execName = execName;
+    this.hierarchyLevel = execName.split("/").length;
+    this.isPageComponent = this.hierarchyLevel === 2;
+
+    this.state = data.state;
+    this.url = data.url;
+    this.changesUrl = data.changesUrl;
+    this.actions = data.actions !== undefined ? data.actions : {};
+    this.dom = this._cleanDom(dom);
+    this.onDocument = onDocument;
+
+    this.placeHolders = {};
+    this.permanentPlaceHolders = {};
+    this.api = null;
+  }
+  mount(originalComponentRef = undefined) {
+    this._getPlaceHolders();
+    if (this.api === null) {
+      this.api = new _index.default(this);
+    }
+    this.api.mount(originalComponentRef);
+    this._add_support_for_jmb_changed_attr_to_inputs();
+  }
+  remove() {
+    // let removed = []
+    // for (const [execName, domElement] of Object.entries(this.placeHolders)) {
+    //   removed.push(execName)
+    //   domElement.remove()
+    // }
+    const dom = this.dom;
+    this.unmount();
+    dom.remove();
+    return this.execName;
+    // removed.push(this.execName)
+    // return removed
+  }
+  unmount() {
+    if (this.api !== null) {
+      this.api.unmount();
+    }
+    this.api = null;
+    this.dom = null;
+  }
+  toJsonRequest() {
+    return {
+      execName: this.execName,
+      state: this.state,
+    };
+  }
+
+  merge(parentComponent, originalComponent) {
+    if (this.isPageComponent && this.onDocument) {
+      // if page component is already on document do nothing
+      // because it is already mounted and it's not changed
+      return;
+    }
+    if (
+      this.onDocument &&
+      originalComponent !== undefined &&
+      originalComponent.dom.isSameNode(this.dom) &&
+      Object.keys(parentComponent.placeHolders).includes(this.execName)
+    ) {
+      // no need to unmount-merge-mount component that is already on document
+      if (!parentComponent.placeHolders[this.execName].isSameNode(this.dom)) {
+        // but if parent is changed we need to update parent place holders
+        parentComponent.placeHolders[this.execName].replaceWith(this.dom);
+        parentComponent.placeHolders[this.execName] = this.dom;
+      }
+      return;
+    }
+
+    if (this.isPageComponent) {
+      let documentElement = this.jembeClient.document.documentElement;
+      this.dom = documentElement = this._morphdom(documentElement, this.dom);
+      this.dom.setAttribute("jmb-name", this.execName);
+    } else {
+      if (Object.keys(parentComponent.placeHolders).includes(this.execName)) {
+        this.dom = this._morphdom(
+          parentComponent.placeHolders[this.execName],
+          this.dom
+        );
+        parentComponent.placeHolders[this.execName] = this.dom;
+      } else {
+        // adding to permanent placeholder
+        const placeholderEl = document.createElement("template");
+        placeholderEl.setAttribute("jmb-placeholder", this.execName);
+        const newPlaceholder = parentComponent.permanentPlaceHolders[
+          this.execName
+        ].insertAdjacentElement("afterend", placeholderEl);
+        this.dom = this._morphdom(newPlaceholder, this.dom);
+        parentComponent.placeHolders[this.execName] = this.dom;
+      }
+    }
+
+    this.onDocument = true;
+
+    this.mount(
+      originalComponent !== undefined &&
+        originalComponent.execName === this.execName
+        ? originalComponent
+        : undefined
+    );
+  }
+
+  _morphdom(from, to) {
+    return (0,_index2.default)(from, to, {
+      getNodeKey: (node) => {
+        return node.nodeType === Node.ELEMENT_NODE &&
+          node.hasAttribute("jmb-name")
+          ? node.getAttribute("jmb-name")
+          : node.id;
+      },
+      onBeforeElUpdated: (fromEl, toEl) => {
+        // spec - https://dom.spec.whatwg.org/#concept-node-equals
+        if (fromEl.isEqualNode(toEl)) {
+          return false;
+        }
+        // don't pass to next component or template
+        if (
+          !this.isPageComponent &&
+          fromEl.hasAttribute("jmb-name") &&
+          fromEl.getAttribute("jmb-name") !== this.execName
+        )
+          return false;
+        if (
+          fromEl.hasAttribute("jmb-placeholder") &&
+          fromEl.getAttribute("jmb-placeholder") !== this.execName
+        )
+          return false;
+        if (fromEl.hasAttribute("jmb-ignore")) {
+          return false;
+        }
+        return true;
+      },
+      onBeforeNodeDiscarded: (node) => {
+        // consolo leog in jmb-on-remove:
+        if (node.nodeType === Node.ELEMENT_NODE) {
+          let removes = node.querySelectorAll("[jmb-on-remove]");
+          for (const rnode of removes) {
+            (0,_utils2.saferEvalNoReturn)(
+              rnode,
+              rnode.getAttribute("jmb-on-remove"),
+              {},
+              {
+                $self: rnode,
+              }
+            );
+          }
+        }
+        return true;
+      },
+      childrenOnly: this.isPageComponent,
+    });
+  }
+  _getPlaceHolders() {
+    this.placeHolders = {};
+    this.permanentPlaceHolders = {};
+    (0,_utils.walkComponentDom)(
+      this.dom,
+      (el) => {
+        if (el.hasAttribute("jmb-placeholder-permanent")) {
+          this.permanentPlaceHolders[
+            el.getAttribute("jmb-placeholder-permanent")
+          ] = el;
+        }
+      },
+      (el, execName) => {
+        // populate placeHolders
+        this.placeHolders[execName] = el;
+      }
+    );
+  }
+  _cleanDom(dom) {
+    // if html dom has only one child use that child to put jmb-name tag
+    // if not enclose html with div and put jmb-name into it
+    if (typeof dom === "string") {
+      let domString = dom.trim();
+      if (!this.isPageComponent) {
+        let template = this.jembeClient.document.createElement("template");
+        template.innerHTML = domString;
+        // check is it needed to add souranding DIV tag
+        if (
+          template.content.childNodes.length > 1 ||
+          template.content.childNodes.length === 0 ||
+          template.content.firstChild.nodeType === Node.TEXT_NODE ||
+          (template.content.childNodes.length === 1 &&
+            (template.content.firstChild.hasAttribute("jmb-name") ||
+              template.content.firstChild.hasAttribute("jmb-placeholder")))
+        ) {
+          let div = this.jembeClient.document.createElement("div");
+          let curChild = template.content.firstChild;
+          while (curChild) {
+            let nextChild = curChild.nextSibling;
+            div.appendChild(curChild);
+            curChild = nextChild;
+          }
+          template.content.appendChild(div);
+        }
+        // add jmb-name tag
+        template.content.firstChild.setAttribute("jmb-name", this.execName);
+        dom = template.content.firstChild;
+      } else {
+        const doc = this.jembeClient.domParser.parseFromString(
+          domString,
+          "text/html"
+        );
+        doc.documentElement.setAttribute("jmb-name", this.execName);
+        dom = doc.documentElement;
+      }
+    }
+    dom.removeAttribute("jmb-data");
+    return dom;
+  }
+  _add_support_for_jmb_changed_attr_to_inputs() {
+    // when input is changed add jmb-input-changed attribute
+    // so that morphdom will pickup the change and update it
+    // with new value (jembe treats input value as actual/live value instead of default value)
+    for (const inputEl of this.dom.querySelectorAll("input")) {
+      inputEl.removeEventListener(
+        "change",
+        this._jmb_input_changed_attr_listener,
+        false
+      );
+      inputEl.addEventListener(
+        "change",
+        this._jmb_input_changed_attr_listener,
+        false
+      );
+    }
+  }
+  _jmb_input_changed_attr_listener(event) {
+    event.target.setAttribute("jmb-input-changed", "");
+  }
+}
+
+class UploadedFile {
+  constructor(execName, paramName, fileUploadId, files) {
+    this.execName = execName;
+    this.paramName = paramName;
+    this.fileUploadId = fileUploadId;
+    this.files = files;
+    this.multipleFiles = files instanceof FileList || files instanceof Array;
+  }
+  getFiles() {
+    return this.multipleFiles ? Array.from(this.files) : [this.files];
+  }
+}
+/**
+ * Handle all jembe logic on client side, primarly building, sending, processing
+ * and refreshing page for/on x-jembe requests
+ */
+class JembeClient {
+  constructor(doc = document) {
+    this.document = doc;
+    this.components = {};
+    this.getComponentsFromDocument();
+    this.updateLocation(true);
+    this.commands = [];
+    this.filesForUpload = {};
+    // files larger than uploadChunkSize are uploaded in chunks
+    // that are resent up to uploadRetries times on network error
+    this.uploadChunkSize = 4 * 1024 * 1024;
+    this.uploadRetries = 3;
+    this.uploadRetryDelay = 1000;
+    // number of files uploaded concurrently
+    this.uploadConcurrency = 3;
+    this.domParser = new DOMParser();
+    this.xRequestUrl = null;
+
+    this.xRequestsInProgress = 0;
+    this.xRequestActiveElement = null;
+    this.xRequestActiveElementId = null;
+    this.xRequestDisabledElements = [];
+    this.disableInputBeforeRequestTimeoutId = null;
+
+    window.onpopstate = this.onHistoryPopState;
+
+    // support adding x-jembe request headers
+    this.xRequestHeadersGenerators = [];
+  }
+  /**
+   * Finds all jmb-name and associate jmb-data tags in document
+   * and create ComponentRefs
+   */
+  getComponentsFromDocument() {
+    this.components = {};
+    let componentsNodes = this.document.querySelectorAll(
+      "[jmb-name][jmb-data]"
+    );
+    for (const componentNode of componentsNodes) {
+      const componentRef = new ComponentRef(
+        this,
+        componentNode.getAttribute("jmb-name"),
+        eval(`(${componentNode.getAttribute("jmb-data")})`),
+        componentNode,
+        true
+      );
+      this.components[componentRef.execName] = componentRef;
+      componentRef.mount();
+    }
+  }
+  /**
+   * Create dict of {execName:component} for all components find in
+   * x-jembe response
+   * @param {*} xJembeResponse
+   */
+  getComponentsAndGlobalsFromXResponse(xJembeResponse) {
+    let components = {};
+    let globals = {
+      removeComponents: [],
+      callWindowOpen: [],
+    };
+    for (const xComp of xJembeResponse) {
+      if (Object.keys(xComp).includes("globals")) {
+        // this block is not component but
+        // contains global response information
+        globals = {
+          removeComponents:
+            xComp.removeComponents !== undefined ? xComp.removeComponents : [],
+          callWindowOpen:
+            xComp.callWindowOpen !== undefined ? xComp.callWindowOpen : [],
+        };
+      } else {
+        const dom = xComp.dom;
+        components[xComp.execName] = new ComponentRef(
+          this,
+          xComp.execName,
+          {
+            url: xComp.url,
+            changesUrl: xComp.changesUrl,
+            state: xComp.state,
+            actions: xComp.actions,
+          },
+          xComp.dom,
+          false
+        );
+      }
+    }
+    return { components: components, globals: globals };
+  }
+  /**
+   * Update document with new components:dict
+   * @param {} components
+   */
+  updateDocument({ components, globals }) {
+    // make list of all existing components that can be display on updated document
+    // list contains all from this.components merged with components where
+    // if there is components with same execname one from components is used
+    let currentComponents = {};
+    // add from this.components if not exist in components otherwise add from components
+    for (const [execName, compRef] of Object.entries(this.components)) {
+      if (components[execName] === undefined) {
+        currentComponents[execName] = compRef;
+      } else {
+        currentComponents[execName] = components[execName];
+      }
+    }
+    // add from components if not already added
+    for (const [execName, compRef] of Object.entries(components)) {
+      if (currentComponents[execName] === undefined) {
+        currentComponents[execName] = compRef;
+      }
+    }
+    //process current components one by one starting with root page
+    // all components gatthered from document but whitout its placeholder
+    // will be ignored.
+    // chose root/page component from compoents if it exist otherwise use
+    // one on the document
+    let pageExecNames = Object.values(currentComponents)
+      .filter((c) => c.isPageComponent)
+      .map((c) => c.execName);
+    // execName of new pageComponent
+    let pageExecName = pageExecNames[0];
+    if (pageExecNames.length > 1) {
+      for (const pen of pageExecNames) {
+        if (!currentComponents[pen].onDocument) {
+          pageExecName = pen;
+        }
+      }
+    }
+    let processingExecNames = [pageExecName];
+    let newComponents = {};
+    while (processingExecNames.length > 0) {
+      const currentComponent = currentComponents[processingExecNames.shift()];
+      if (currentComponent !== undefined) {
+        let orignalComponent = this.components[currentComponent.execName];
+        let parentComponent = Object.values(newComponents).find(
+          (c) =>
+            Object.keys(c.placeHolders).includes(currentComponent.execName) ||
+            Object.keys(c.permanentPlaceHolders).includes(
+              currentComponent.execName
+            )
+        );
+        currentComponent.merge(parentComponent, orignalComponent);
+        newComponents[currentComponent.execName] = currentComponent;
+        for (const placeHolderName of Object.keys(
+          currentComponent.placeHolders
+        )) {
+          processingExecNames.push(placeHolderName);
+        }
+        for (const permanentPlaceHolderName of Object.keys(
+          currentComponent.permanentPlaceHolders
+        )) {
+          if (
+            !Object.keys(currentComponent.placeHolders).includes(
+              permanentPlaceHolderName
+            )
+          ) {
+            processingExecNames.push(permanentPlaceHolderName);
+          }
+        }
+      }
+    }
+    // unmount components that will be removed
+    for (const [execName, component] of Object.entries(this.components)) {
+      if (
+        !Object.keys(newComponents).includes(execName) ||
+        newComponents[execName] !== component
+      ) {
+        component.unmount();
+      }
+    }
+    // unmount and remove components from globals.removeComponents list
+    let removedComponents = [];
+    let execName;
+    while (typeof (execName = globals.removeComponents.pop()) !== "undefined") {
+      if (
+        Object.keys(newComponents).includes(execName) &&
+        !removedComponents.includes(execName)
+      ) {
+        for (const childExecName of Object.keys(
+          newComponents[execName].placeHolders
+        )) {
+          globals.removeComponents.push(childExecName);
+        }
+        removedComponents.push(newComponents[execName].remove());
+        const parentComponentExecName = execName
+          .split("/")
+          .slice(0, -1)
+          .join("/");
+        delete newComponents[parentComponentExecName].placeHolders[execName];
+      }
+    }
+    for (const rmExecName of removedComponents) {
+      delete newComponents[rmExecName];
+    }
+    // call window open from globals.callWindowOpen
+    for (const url of globals.callWindowOpen) {
+      window.open(url, "_blank");
+    }
+
+    this.components = newComponents;
+  }
+
+  addInitialiseCommand(execName, initParams, mergeExistingParams = true) {
+    const exisitingInitCommands = this.commands.filter(
+      (x) => x.type === "init" && x.componentExecName === execName
+    );
+    if (mergeExistingParams === true && exisitingInitCommands.length > 0) {
+      const existingCmd = exisitingInitCommands[0];
+      for (const [paramName, paramValue] of Object.entries(initParams)) {
+        existingCmd.initParams = this._updateParam(
+          existingCmd.initParams,
+          paramName,
+          paramValue
+        );
+      }
+    } else {
+      if (
+        mergeExistingParams === true &&
+        Object.keys(initParams).length === 0 &&
+        this.components[execName] !== undefined
+      ) {
+        // dont add init command for existing components if no params are changed
+        return;
+      }
+      let params =
+        mergeExistingParams === true && this.components[execName] !== undefined
+          ? (0,_utils.deepCopy)(this.components[execName].state)
+          : {};
+      for (const [paramName, paramValue] of Object.entries(initParams)) {
+        params = this._updateParam(params, paramName, paramValue);
+      }
+      if (mergeExistingParams === false && exisitingInitCommands > 0) {
+        const existingCmd = exisitingInitCommands[0];
+        existingCmd.initParams = params;
+        existingCmd.mergeExistingParams = mergeExistingParams;
+      } else {
+        this.commands.push({
+          type: "init",
+          componentExecName: execName,
+          initParams: params,
+          mergeExistingParams: mergeExistingParams,
+        });
+      }
+    }
+  }
+  /**
+   * Update params with [paramName] =  paramValue
+   * paramName can contain dots (.) to separate object attributes
+   * @param {dict} params
+   * @param {string} paramName
+   * @param {*} paramValue
+   */
+  _updateParam(params, paramName, paramValue) {
+    if (paramName.startsWith(".") || paramName.endsWith(".")) {
+      throw "paramName cant start or end in dot (.)";
+    }
+    return this._updateParamR(params, paramName.split("."), paramValue);
+  }
+  _updateParamR(params, paramNames, paramValue) {
+    let pName = paramNames[0];
+    if (paramNames.length === 1) {
+      // last element
+      params[pName] = paramValue;
+    } else if (params[pName] === undefined) {
+      params[pName] = this._updateParamR({}, paramNames.slice(1), paramValue);
+    } else {
+      params[pName] = this._updateParamR(
+        params[pName],
+        paramNames.slice(1),
+        paramValue
+      );
+    }
+    return params;
+  }
+
+  addCallCommand(execName, actionName, args = [], kwargs = {}) {
+    const exisitingCallIndex = this.commands.findIndex(
+      (x) =>
+        x.type === "call" &&
+        x.componentExecName === execName &&
+        x.actionName === actionName &&
+        JSON.stringify(x.args) === JSON.stringify(args) &&
+        JSON.stringify(x.kwargs) === JSON.stringify(kwargs)
+    );
+    if (exisitingCallIndex >= 0) {
+      this.commands.splice(exisitingCallIndex, 1);
+    }
+    this.commands.push({
+      type: "call",
+      componentExecName: execName,
+      actionName: actionName,
+      args: args,
+      kwargs: kwargs,
+    });
+  }
+  addEmitCommand(execName, eventName, kwargs = {}, to = null) {
+    this.commands.push({
+      type: "emit",
+      componentExecName: execName,
+      eventName: eventName,
+      params: kwargs,
+      to: to,
+    });
+  }
+  addFilesForUpload(execName, paramName, files) {
+    // remove existing files for same param name
+    let existingFileId = null;
+    for (const uf of Object.values(this.filesForUpload)) {
+      if (uf.execName === execName && uf.paramName === paramName) {
+        existingFileId = uf.fileUploadId;
+      }
+    }
+    if (existingFileId !== null) {
+      delete this.filesForUpload[existingFileId];
+    }
+
+    if (
+      ((files instanceof FileList || files instanceof Array) &&
+        files.length > 0) ||
+      files instanceof File
+    ) {
+      // add files to paramName
+      let fileId = null;
+      while (
+        fileId == null ||
+        Object.keys(this.filesForUpload).includes(fileId)
+      ) {
+        fileId = Math.random().toString(36).substring(7);
+      }
+      this.filesForUpload[fileId] = new UploadedFile(
+        execName,
+        paramName,
+        fileId,
+        files
+      );
+      // add init command if not exist
+      this.addInitialiseCommand(execName, {
+        [paramName]: fileId,
+      });
+    } else {
+      // remove init command if only containt file init param
+      let initCommandIndex = this.commands.findIndex(
+        (cmd) =>
+          cmd.componentExecName === execName &&
+          cmd.type === "init" &&
+          Object.keys(cmd.initParams).includes(paramName) &&
+          Object.keys(cmd.initParams).length === 1
+      );
+      if (initCommandIndex >= 0) {
+        this.commands.splice(initCommandIndex, 1);
+      }
+    }
+  }
+  getXRequestJson(addComponents = true) {
+    return JSON.stringify({
+      components: addComponents
+        ? Object.values(this.components).map((x) => x.toJsonRequest())
+        : [],
+      commands: this.commands,
+    });
+  }
+  setXRequestUrl(url) {
+    this.xRequestUrl = url;
+  }
+  getXUploadRequestHeaders(uploadId = null) {
+    const headers =
+      this.xRequestHeadersGenerators.length === 0
+        ? {}
+        : this.calculateXRequestHeaders();
+    headers["X-JEMBE"] = "upload";
+    if (uploadId !== null) {
+      headers["X-JEMBE-UPLOAD-ID"] = uploadId;
+    }
+    return headers;
+  }
+  fetchUpload(headers, body) {
+    return window
+      .fetch("/jembe/upload_files", {
+        method: "POST",
+        cache: "no-cache",
+        credentials: "same-origin",
+        redirect: "follow",
+        referrer: "no-referrer",
+        headers: headers,
+        body: body,
+      })
+      .then((response) => {
+        // 409 is returned with offset of received bytes when chunk is out of order
+        if (!response.ok && response.status !== 409) {
+          this.dispatchUpdatePageErrorEvent(response, null, false);
+          console.log("Error in x-jmebe upload response");
+          throw Error("errorInJembeResponse");
+        }
+        return response.json();
+      });
+  }
+  /**
+   * Uploads file in chunks of uploadChunkSize into upload with uploadId
+   * (new upload is started when uploadId is null). On network error upload is
+   * resumed from the offset received by the server, up to uploadRetries times
+   * in a row.
+   * onProgress is called with number of bytes received by the server after
+   * every chunk.
+   * Returns promise of the json response to the last chunk.
+   */
+  async uploadFileInChunks(uploadId, fileUploadId, index, file, onProgress = null) {
+    const chunkHeaders = (contentRange) => {
+      const headers = this.getXUploadRequestHeaders(uploadId);
+      headers["X-JEMBE-UPLOAD-FILE"] = fileUploadId;
+      headers["X-JEMBE-UPLOAD-INDEX"] = index;
+      headers["X-JEMBE-UPLOAD-FILENAME"] = encodeURIComponent(file.name);
+      headers["Content-Range"] = contentRange;
+      return headers;
+    };
+    let offset = 0;
+    let receivedOffset = 0;
+    let retriesLeft = this.uploadRetries;
+    let resume = false;
+    for (;;) {
+      let json;
+      try {
+        if (resume) {
+          await new Promise((resolve) =>
+            setTimeout(resolve, this.uploadRetryDelay)
+          );
+        }
+        if (resume && uploadId !== null) {
+          // asks server for the offset of received bytes
+          json = await this.fetchUpload(chunkHeaders(`bytes */${file.size}`), null);
+        } else {
+          const end = Math.min(offset + this.uploadChunkSize, file.size);
+          json = await this.fetchUpload(
+            chunkHeaders(`bytes ${offset}-${end - 1}/${file.size}`),
+            file.slice(offset, end)
+          );
+        }
+      } catch (error) {
+        if (error.message === "errorInJembeResponse" || retriesLeft <= 0) {
+          throw error;
+        }
+        retriesLeft -= 1;
+        resume = true;
+        continue;
+      }
+      uploadId = json.fileUploadResponseId;
+      offset = json.offset;
+      if (onProgress !== null) {
+        onProgress(offset - receivedOffset);
+        receivedOffset = offset;
+      }
+      if (json.files[fileUploadId] !== undefined) {
+        return json;
+      }
+      resume = false;
+      retriesLeft = this.uploadRetries;
+    }
+  }
+  /**
+   * Uploads one file into upload with uploadId, in chunks if it is larger
+   * than uploadChunkSize. Returns promise of uploaded file
+   * {storage=storage_name, path=file_path} and upload id.
+   */
+  uploadFile(uploadId, fileUploadId, index, file, onProgress) {
+    if (this.uploadChunkSize > 0 && file.size > this.uploadChunkSize) {
+      return this.uploadFileInChunks(
+        uploadId,
+        fileUploadId,
+        index,
+        file,
+        onProgress
+      ).then((json) => [json.files[fileUploadId][0], json.fileUploadResponseId]);
+    }
+    const formData = new FormData();
+    formData.append(fileUploadId, file);
+    return this.fetchUpload(this.getXUploadRequestHeaders(uploadId), formData).then(
+      (json) => {
+        onProgress(file.size);
+        return [
+          json.files[fileUploadId] !== undefined
+            ? json.files[fileUploadId][0]
+            : undefined,
+          json.fileUploadResponseId,
+        ];
+      }
+    );
+  }
+  executeUpload() {
+    if (Object.keys(this.filesForUpload).length === 0) {
+      // no files for uplaod
+      return new Promise((resolve, reject) => {
+        resolve(null);
+      });
+    }
+    // every file is uploaded with its own request, up to uploadConcurrency
+    // files at the same time, all of them into the same upload
+    // (fileUploadResponseId) started by the first request
+    const uploads = [];
+    const uploadedFiles = {};
+    for (const uf of Object.values(this.filesForUpload)) {
+      uploadedFiles[uf.fileUploadId] = [];
+      uf.getFiles().forEach((file, index) => {
+        uploads.push([uf.fileUploadId, index, file]);
+      });
+    }
+    const progress = {
+      loaded: 0,
+      total: uploads.reduce((total, [, , file]) => total + file.size, 0),
+      uploadedFiles: 0,
+      totalFiles: uploads.length,
+    };
+    const onProgress = (loaded) => {
+      progress.loaded += loaded;
+      this.dispatchUploadProgressEvent(progress);
+    };
+    const startUpload =
+      uploads.length > 1
+        ? // empty upload request creates upload without files
+          this.fetchUpload(this.getXUploadRequestHeaders(), new FormData()).then(
+            (json) => json.fileUploadResponseId
+          )
+        : Promise.resolve(null);
+    return startUpload
+      .then((uploadId) => {
+        let next = 0;
+        const uploadNext = () => {
+          if (next >= uploads.length) {
+            return Promise.resolve();
+          }
+          const [fileUploadId, index, file] = uploads[next];
+          next += 1;
+          return this.uploadFile(uploadId, fileUploadId, index, file, onProgress)
+            .then(([ufile, fileUploadResponseId]) => {
+              uploadedFiles[fileUploadId][index] = ufile;
+              uploadId = fileUploadResponseId;
+              progress.uploadedFiles += 1;
+              this.dispatchUploadProgressEvent(progress);
+            })
+            .then(uploadNext);
+        };
+        const workers = [];
+        for (
+          let i = 0;
+          i < Math.max(1, Math.min(this.uploadConcurrency, uploads.length));
+          i++
+        ) {
+          workers.push(uploadNext());
+        }
+        return Promise.all(workers).then(() => uploadId);
+      })
+      .then((fileUploadResponseId) => {
+        for (const fu of Object.values(this.filesForUpload)) {
+          // replace all uploaded files init params with
+          //(storage=storage_name, path=file_path) returned from x-jembe=fileupload request
+          const ufiles = uploadedFiles[fu.fileUploadId].filter(
+            (ufile) => ufile !== undefined
+          );
+          if (ufiles.length > 0) {
+            this.addInitialiseCommand(fu.execName, {
+              [fu.paramName]: fu.multipleFiles ? ufiles : ufiles[0],
+            });
+          }
+        }
+        this.filesForUpload = {};
+        return fileUploadResponseId;
+      });
+  }
+  executeCommands(
+    disableInputs = true,
+    updateLocation = true,
+    addComponents = true
+  ) {
+    const url =
+      this.xRequestUrl !== null ? this.xRequestUrl : window.location.href;
+    this.dispatchStartUpdatePageEvent(true, disableInputs);
+    this.executeUpload()
+      .then((fileUploadResponseId) => {
+        const requestBody = this.getXRequestJson(addComponents);
+        // reset commads since we create request body from it
+        this.commands = [];
+        const headers =
+          this.xRequestHeadersGenerators.length === 0
+            ? {}
+            : this.calculateXRequestHeaders();
+        headers["X-JEMBE"] = "commands";
+        if (fileUploadResponseId !== null) {
+          headers["X-JEMBE-RELATED-UPLOAD"] = fileUploadResponseId;
+        }
+        // fetch request and process response
+        window
+          .fetch(url, {
+            method: "POST",
+            cache: "no-cache",
+            credentials: "same-origin",
+            redirect: "follow",
+            referrer: "no-referrer",
+            headers: headers,
+            body: requestBody,
+          })
+          .then((response) => {
+            if (!response.ok) {
+              if (disableInputs) {
+                this.xRequestsInProgress -= 1;
+                this.enableInputsAfterResponse();
+              }
+              console.info("Error x-jembe response", response);
+              this.dispatchUpdatePageErrorEvent(response, null, disableInputs);
+              throw Error("errorInJembeResponse");
+            }
+            return response.json();
+          })
+          .then((json) => this.getComponentsAndGlobalsFromXResponse(json))
+          .then((componentsAndGlobals) => {
+            this.updateDocument(componentsAndGlobals);
+            if (updateLocation && disableInputs) {
+              this.updateLocation();
+            }
+            if (disableInputs) {
+              this.xRequestsInProgress -= 1;
+              this.enableInputsAfterResponse();
+            }
+            this.dispatchUpdatePageEvent(true, disableInputs, this.components);
+          })
+          .catch((error) => {
+            if (error.message != "errorInJembeResponse") {
+              console.info("Error x-jembe request", error);
+              this.dispatchUpdatePageErrorEvent(null, error, disableInputs);
+            }
+            if (disableInputs) {
+              this.xRequestsInProgress -= 1;
+              this.enableInputsAfterResponse();
+            }
+          });
+      })
+      .catch((error) => {
+        if (error.message != "errorInJembeResponse") {
+          console.info("Error x-jembe request", error);
+          this.dispatchUpdatePageErrorEvent(null, error, disableInputs);
+        }
+        if (disableInputs) {
+          this.xRequestsInProgress -= 1;
+          this.enableInputsAfterResponse();
+        }
+      });
+  }
+  updateLocation(replace = false) {
+    // TODO non blocking x request should not update location
+    let topComponent = null;
+    let level = -1;
+    let historyState = [];
+    for (const component of Object.values(this.components)) {
+      if (component.hierarchyLevel > level && component.changesUrl === true) {
+        topComponent = component;
+        level = component.hierarchyLevel;
+      }
+      // historyState.push({
+      //   execName: component.execName,
+      //   state: component.state,
+      // });
+      historyState.push(component.toJsonRequest());
+    }
+    if (topComponent !== null) {
+      if (replace) {
+        window.history.replaceState(historyState, "", topComponent.url);
+      } else {
+        window.history.pushState(historyState, "", topComponent.url);
+      }
+    }
+  }
+  onHistoryPopState(event) {
+    if (event.state === null) {
+      window.location = document.location;
+    } else {
+      for (const comp of event.state) {
+        this.jembeClient.addInitialiseCommand(comp.execName, comp.state, false);
+      }
+      let execNames = event.state.map((x) => x.execName);
+      execNames = execNames.sort(
+        (a, b) => b.split("/").length - a.split("/").length
+      );
+      for (const en of execNames) {
+        this.jembeClient.addCallCommand(en, "display");
+      }
+      this.jembeClient.executeCommands(true, false, false);
+    }
+  }
+  /**
+   * Used for geting jembeCompoentApi usually attached to document or window.jembeComponent
+   * @param {*} domNode
+   */
+  component(domNode) {
+    const componentExecName = domNode
+      .closest("[jmb-name]")
+      .getAttribute("jmb-name");
+    return new _jmb.default(this, componentExecName);
+  }
+
+  dispatchUpdatePageEvent(
+    isXUpdate = true,
+    inputsDisabled = true,
+    components = {}
+  ) {
+    window.dispatchEvent(
+      new CustomEvent("jembeUpdatePage", {
+        detail: {
+          isXUpdate: isXUpdate,
+          inputsDisabled: inputsDisabled,
+          components: Object.fromEntries(
+            Object.entries(components).map(([key, val]) => [key, val.dom])
+          ),
+        },
+      })
+    );
+  }
+  dispatchStartUpdatePageEvent(isXUpdate = true, disableInputs = true) {
+    if (disableInputs && isXUpdate) {
+      this.xRequestsInProgress += 1;
+      if (this.xRequestsInProgress === 1) {
+        this.disableInputBeforeRequestTimeoutId = window.setTimeout(() => {
+          this.disableInputsBeforeRequest();
+        }, 50);
+      }
+    }
+    window.dispatchEvent(
+      new CustomEvent("jembeStartUpdatePage", {
+        detail: {
+          isXUpdate: isXUpdate,
+          inputsDisabled: disableInputs,
+        },
+      })
+    );
+  }
+  dispatchUploadProgressEvent(progress) {
+    window.dispatchEvent(
+      new CustomEvent("jembeUploadProgress", {
+        detail: {
+          loaded: progress.loaded,
+          total: progress.total,
+          uploadedFiles: progress.uploadedFiles,
+          totalFiles: progress.totalFiles,
+        },
+      })
+    );
+  }
+  dispatchUpdatePageErrorEvent(
+    response = null,
+    error = null,
+    inputsDisabled = true
+  ) {
+    window.dispatchEvent(
+      new CustomEvent("jembeUpdatePageError", {
+        detail: {
+          inputsDisabled: inputsDisabled,
+          networkError: error !== null,
+          response: response,
+          error: error,
+        },
+      })
+    );
+  }
+  disableInputsBeforeRequest() {
+    // save currently focused element
+    if (this.document.activeElement !== null) {
+      this.xRequestActiveElement = this.document.activeElement;
+      this.xRequestActiveElementId = this.document.activeElement.id;
+    }
+    // walk over whole document and disable inputs
+    (0,_utils2.walk)(this.document.documentElement, (node) => {
+      if (node.hasAttribute("jmb-ignore")) return false;
+      if (
+        // <button>
+        node.tagName.toLowerCase() === "button" ||
+        // <select>
+        node.tagName.toLowerCase() === "select" ||
+        // <input type="checkbox|radio">
+        (node.tagName.toLowerCase() === "input" &&
+          (node.type === "checkbox" || node.type === "radio"))
+      ) {
+        node.setAttribute("jmb-node-initially-disabled", node.disabled);
+        if (!node.disabled) {
+          node.disabled = true;
+          this.xRequestDisabledElements.push(() => {
+            if (node.hasAttribute("jmb-node-initially-disabled")) {
+              node.disabled =
+                node.getAttribute("jmb-node-initially-disabled") === "true";
+              node.removeAttribute("jmb-node-initially-disabled");
+            }
+          });
+        }
+      } else if (
+        // <input type="text">
+        node.tagName.toLowerCase() === "input" ||
+        // <textarea>
+        node.tagName.toLowerCase() === "textarea"
+      ) {
+        node.setAttribute("jmb-node-initially-readonly", node.readOnly);
+        node.setAttribute("jmb-node-initially-disabled", node.disabled);
+        if (!node.readOnly) {
+          node.readOnly = true;
+          node.disabled = true;
+          this.xRequestDisabledElements.push(() => {
+            if (node.hasAttribute("jmb-node-initially-readonly")) {
+              node.readOnly =
+                node.getAttribute("jmb-node-initially-readonly") === "true";
+              node.removeAttribute("jmb-node-initially-readonly");
+            }
+            if (node.hasAttribute("jmb-node-initially-disabled")) {
+              node.disabled =
+                node.getAttribute("jmb-node-initially-disabled") === "true";
+              node.removeAttribute("jmb-node-initially-disabled");
+            }
+          });
+        }
+      }
+    });
+  }
+  enableInputsAfterResponse() {
+    window.clearTimeout(this.disableInputBeforeRequestTimeoutId);
+    if (this.xRequestsInProgress !== 0) {
+      return;
+    }
+    //enable disabled inputs (not updated by morph)
+    for (let f of this.xRequestDisabledElements) {
+      f();
+    }
+    this.xRequestDisabledElements = [];
+    // refocus active element
+    if (
+      this.xRequestActiveElement !== null &&
+      this.document.contains(this.xRequestActiveElement)
+    ) {
+      this.xRequestActiveElement.focus();
+    } else if (this.xRequestActiveElementId !== null) {
+      const focusedById = this.document.getElementById(
+        this.xRequestActiveElementId
+      );
+      if (focusedById !== null) {
+        focusedById.focus();
+      }
+    }
+
+    this.xRequestActiveElement = null;
+  }
+  addXRequestHeaderGenerator(callback) {
+    this.xRequestHeadersGenerators.push(callback);
+  }
+  calculateXRequestHeaders() {
+    let header = {};
+    for (const headerGenCallback of this.xRequestHeadersGenerators) {
+      header = { ...header, ...headerGenCallback() };
+    }
+    return header;
+  }
+  getCookie(name) {
+    return (0,_utils.getCookie)(name);
+  }
+  walkComponent(component, callback) {
+    if (component instanceof String) {
+      component = this.document.querySelector(`[jmb-name=${component}]`);
+    }
+    (0,_utils.walkComponentDom)(component, callback);
+  }
+  walkDocument(callback) {
+    (0,_utils2.walk)(this.document.documentElement, callback);
+  }
+}
+
+exports.JembeClient=JembeClient;
 },{"./componentApi/index.js":"ewYM","./utils.js":"FOZT","./morphdom/index.js":"APca","./componentApi/utils.js":"dB8V","./componentApi/magic/jmb.js":"W7MR"}],"coHq":[function(require,module,exports) {
 "use strict";var e=require("./client.js");window.jembeClient=new e.JembeClient(document),window.jembeClient.dispatchUpdatePageEvent(!1,!1);
 },{"./client.js":"IVsl"}]},{},["coHq"], null)
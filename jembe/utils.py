@@ -2,8 +2,7 @@ from functools import wraps
 from typing import List, Dict, Any, Optional
 from jembe.common import exec_name_to_full_name
 from jembe.exceptions import JembeError
-from jembe.app import get_processor
-from flask import url_for
+from jembe.app import get_processor, get_jembe
 
 
 def page_url(exec_name: str, url_params: Optional[List[Dict[str, Any]]] = None):
@@ -20,15 +19,11 @@ def page_url(exec_name: str, url_params: Optional[List[Dict[str, Any]]] = None):
     """
     if not exec_name.startswith("/"):
         exec_name = "/{}".format(exec_name)
-    root_page_name = exec_name.split("/")[1].split(".")[0]
     full_name = exec_name_to_full_name(exec_name)
     components_keys = [
         (".{}".format(cn.split(".")[1]) if len(cn.split(".")) == 2 else "")
         for cn in exec_name.split("/")[1:]
     ]
-    endpoint_name = "{bp_name}.{full_name}".format(
-        bp_name=root_page_name, full_name=full_name
-    )
     no_of_components = len(full_name.split("/")) - 1
     url_values = {}
     for i in range(no_of_components):
@@ -40,7 +35,7 @@ def page_url(exec_name: str, url_params: Optional[List[Dict[str, Any]]] = None):
                 url_key = "{}__{}".format(key, index) if index > 0 else key
                 url_values[url_key] = value
 
-    return url_for(endpoint_name, **url_values)
+    return get_jembe().component_url(full_name, url_values)
 
 
 def run_only_once(_method=None, *, for_state: Optional[str] = None):
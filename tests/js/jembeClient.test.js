@@ -630,7 +630,7 @@ test('addFilesForUploadCommand store files in jembeClient', () => {
   expect(jc.filesForUpload[keys[0]].files[1]).toBe(bar)
 })
 
-test('create file X Upload request  in jembeClient', () => {
+test('get files for upload in jembeClient', () => {
   buildDocument(`
     <html jmb-name="/page" jmb-data='{"changesUrl":true,"state":{"photo":null},"url":"/page","actions":{}}'>
       <body></body>
@@ -644,36 +644,14 @@ test('create file X Upload request  in jembeClient', () => {
   });
   const jc = window.jembeClient
 
-  // dont create upload request if no files are submited
-  let fd = jc.getXUploadRequestFormData()
-  expect(fd).toBe(null)
-
-  // create upload request when files are submited
-  jc.addFilesForUpload("/page", "photo", [foo])
-  fd = jc.getXUploadRequestFormData()
-  expect(fd).not.toBeNull()
-  let fooUploadId = Object.keys(jc.filesForUpload)[0]
-  expect(fd.has(fooUploadId)).toBe(true)
-  expect(fd.get(fooUploadId)).toBe(foo)
-
-  jc.addFilesForUpload("/page", "photo", [bar])
-  fd = jc.getXUploadRequestFormData()
-  let barUploadId = Object.keys(jc.filesForUpload)[0]
-  expect(fd.get(barUploadId)).toBe(bar)
-
-  jc.addFilesForUpload("/page", "photo", [])
-  fd = jc.getXUploadRequestFormData()
-  expect(fd).toBe(null)
-
   jc.addFilesForUpload("/page", "photo", [foo, bar])
-  fd = jc.getXUploadRequestFormData()
   let uploadId = Object.keys(jc.filesForUpload)[0]
-  expect(fd.getAll(uploadId).length).toBe(2)
+  expect(jc.filesForUpload[uploadId].getFiles()).toEqual([foo, bar])
 
   jc.addFilesForUpload("/page", "photo", foo)
-  fd = jc.getXUploadRequestFormData()
   uploadId = Object.keys(jc.filesForUpload)[0]
-  expect(fd.getAll(uploadId).length).toBe(1)
+  expect(jc.filesForUpload[uploadId].multipleFiles).toBe(false)
+  expect(jc.filesForUpload[uploadId].getFiles()).toEqual([foo])
 })
 
 test('dont merge under jmb-ignore', () => {
@@ -0,0 +1,21 @@
+import pytest
+from flask import json
+from jembe import bench
+from jembe.exceptions import JembeError
+
+
+def test_bench_scenarios_run():
+    results = bench.run(repeat=1, scale=0.05)
+    assert set(results["results"].keys()) == set(bench.SCENARIOS.keys())
+    for result in results["results"].values():
+        assert len(result["timings"]) == 1
+        assert result["min"] > 0
+
+    results = json.loads(json.dumps(results))
+    ratios = bench.compare(results, results)
+    assert set(ratios.values()) == {1.0}
+
+
+def test_bench_unknown_scenario():
+    with pytest.raises(JembeError):
+        bench.run(["unknown"], repeat=1)
@@ -0,0 +1,65 @@
+import os
+import time
+from jembe import DiskStorage, Jembe, Storage
+from jembe.cleanup import cleanup_temp_storage, scan_temp_storage
+
+
+def _create(tmp_path, path, size, age):
+    file = tmp_path / path
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    while file != tmp_path / path.split("/")[0]:
+        os.utime(file, (mtime, mtime))
+        file = file.parent
+
+
+def test_cleanup_temp_storage(app_ctx, tmp_path):
+    storage = DiskStorage("temp", str(tmp_path), type=Storage.Type.TEMP)
+    hour = 60 * 60
+    _create(tmp_path, "UPLOADS/old/file.txt", 100, 2 * hour)
+    _create(tmp_path, "UPLOADS/new/file.txt", 10, 0)
+    _create(tmp_path, "WORKINPROGRESS/s1/a/file.txt", 200, 3 * hour)
+    _create(tmp_path, "WORKINPROGRESS/s2/file.txt", 300, 2 * hour)
+    _create(tmp_path, "WORKINPROGRESS/s3/file.txt", 400, 1)
+
+    assert {(e.path, e.size, e.files) for e in scan_temp_storage(storage)} == {
+        ("UPLOADS/old", 100, 1),
+        ("UPLOADS/new", 10, 1),
+        ("WORKINPROGRESS/s1", 200, 1),
+        ("WORKINPROGRESS/s2", 300, 1),
+        ("WORKINPROGRESS/s3", 400, 1),
+    }
+
+    options = dict(uploads_max_age=hour, sessions_max_age=None, max_size=500)
+    report = cleanup_temp_storage(storage, dry_run=True, **options)
+    assert report["removed"] == 3
+    assert report["bytes_reclaimed"] == 600
+    assert (tmp_path / "UPLOADS" / "old").exists()
+
+    report = cleanup_temp_storage(storage, batch_size=1, batch_pause=0, **options)
+    assert report["removed"] == 3
+    assert report["files"] == 3
+    assert report["bytes_reclaimed"] == 600
+    assert report["size_before"] == 1010
+    assert report["size_after"] == 410
+    assert sorted(os.listdir(tmp_path / "UPLOADS")) == ["new"]
+    assert sorted(os.listdir(tmp_path / "WORKINPROGRESS")) == ["s3"]
+
+
+def test_temp_storage_sweeper(app, tmp_path):
+    app.config["JEMBE_TEMP_CLEANUP_INTERVAL"] = 3600
+    app.config["JEMBE_TEMP_UPLOADS_MAX_AGE"] = 60
+    jmb = Jembe(
+        app, storages=[DiskStorage("temp", str(tmp_path), type=Storage.Type.TEMP)]
+    )
+    _create(tmp_path, "UPLOADS/old/file.txt", 100, 120)
+    assert jmb.temp_sweeper is not None
+
+    reports = jmb.temp_sweeper.sweep()
+    assert [(r["storage"], r["removed"]) for r in reports] == [("temp", 1)]
+    assert not (tmp_path / "UPLOADS" / "old").exists()
+
+    app.test_client().get("/jembe/metrics")
+    assert jmb.temp_sweeper._thread is not None
+    jmb.temp_sweeper.stop(1)
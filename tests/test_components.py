@@ -2919,3 +2919,246 @@ def test_listen_for_event(jmb, client):
         res[0]["dom"]
         == """<div>OK<template jmb-placeholder="/main/info"></template></div>"""
     )
+
+
+def test_is_accessible_failed_init_is_tracked_once(jmb, client):
+    init_calls = []
+
+    class A(Component):
+        def __init__(self, rid: int, tags: List[str] = []):
+            init_calls.append(rid)
+            if rid > 1:
+                raise NotFound()
+            super().__init__()
+
+        def display(self) -> "DisplayResponse":
+            return self.render_template_string("A{{rid}}")
+
+    @jmb.page("page", Component.Config(components=dict(a=A)))
+    class Page(Component):
+        def display(self) -> "DisplayResponse":
+            return self.render_template_string(
+                "<html><body>"
+                "{% for i in range(3) %}"
+                "{% if component('a', rid=2, tags=['x', 'y']).is_accessible %}A2{% endif %}"
+                "{% endfor %}"
+                "{% if component('a', rid=1, tags=['x']).is_accessible %}A1{% endif %}"
+                "</body></html>"
+            )
+
+    r = client.get("/page")
+    assert r.status_code == 200
+    assert r.data == (
+        """<!DOCTYPE html PUBLIC "-//W3C//DTD HTML 4.0 Transitional//EN" "http://www.w3.org/TR/REC-html40/loose.dtd">\n"""
+        """<html jmb-name="/page" jmb-data=\'{"actions":{},"changesUrl":true,"state":{},"url":"/page"}\'><body>A1</body></html>"""
+    ).encode("utf-8")
+    # failed initialisation with same params is not repeated
+    assert init_calls == [2, 1]
+
+
+def test_when_on_page_components_are_redisplayed_or_removed(jmb, client):
+    class Item(Component):
+        def __init__(self, value: int = 0):
+            super().__init__()
+
+        @redisplay(when_on_page=True)
+        def display(self) -> "DisplayResponse":
+            return self.render_template_string("<div>{{key}}</div>")
+
+    @jmb.page("page", Component.Config(components=dict(item=Item)))
+    class Page(Component):
+        def __init__(self, size: int = 3):
+            super().__init__()
+
+        @action
+        def refresh(self):
+            return False
+
+        @action
+        def shrink(self):
+            self.state.size = 1
+
+        def display(self) -> "DisplayResponse":
+            return self.render_template_string(
+                "<div>{% for i in range(size) %}{{component('item').key(i)}}{% endfor %}</div>"
+            )
+
+    def x_jembe_call(action_name: str):
+        return client.post(
+            "/page",
+            data=json.dumps(
+                dict(
+                    components=[dict(execName="/page", state=dict(size=3))]
+                    + [
+                        dict(execName="/page/item.{}".format(i), state=dict(value=0))
+                        for i in range(3)
+                    ],
+                    commands=[
+                        dict(
+                            type="call",
+                            componentExecName="/page",
+                            actionName=action_name,
+                            args=list(),
+                            kwargs=dict(),
+                        )
+                    ],
+                )
+            ),
+            headers={"x-jembe": True},
+        )
+
+    r = x_jembe_call("refresh")
+    assert r.status_code == 200
+    res = json.loads(r.data)
+    assert [c["execName"] for c in res] == [
+        "/page/item.0",
+        "/page/item.1",
+        "/page/item.2",
+    ]
+
+    r = x_jembe_call("shrink")
+    assert r.status_code == 200
+    res = json.loads(r.data)
+    assert [c.get("execName") for c in res] == ["/page", "/page/item.0", None]
+    assert res[2]["removeComponents"] == ["/page/item.1", "/page/item.2"]
+
+
+def test_processor_additional_components_do_not_change_registry(app, jmb: "Jembe"):
+    class A(Component):
+        pass
+
+    @jmb.page("page", Component.Config(components=dict(a=A)))
+    class Page(Component):
+        def display(self) -> "DisplayResponse":
+            return self.render_template_string("<html><body></body></html>")
+
+    with app.test_request_context("/page"):
+        processor = get_processor()
+        processor.process_request()
+        components = processor.components
+        a = A._jembe_init_(
+            jmb.components_configs["/page/a"], "/page/a.1", [], True, None
+        )
+        with processor.additional_components(a) as registry:
+            assert processor.components is registry
+            assert registry["/page/a.1"] is a
+            assert registry["/page"] is components["/page"]
+            registry["/page/a.2"] = a
+        assert processor.components is components
+        assert list(components.keys()) == ["/page"]
+
+
+def test_component_reference_jrl(jmb, client):
+    class A(Component):
+        def __init__(self, rid: int = 0, name: str = ""):
+            super().__init__()
+
+    @jmb.page("page", Component.Config(components=dict(a=A)))
+    class Page(Component):
+        @action
+        def select(self, rid: int):
+            pass
+
+        def display(self) -> "DisplayResponse":
+            return self.render_template_string(
+                "<html><body>"
+                "<a>{{component('a', rid=1).jrl}}</a>"
+                "<a>{{component('a', rid=1).key(1).jrl}}</a>"
+                "<a>{{component_reset('a', name='x\"y').jrl}}</a>"
+                "<a>{{component('select()', rid=2).jrl}}</a>"
+                "<a>{{component('select()', rid=2).jrl}}</a>"
+                "</body></html>"
+            )
+
+    r = client.get("/page")
+    assert r.status_code == 200
+    assert r.data == (
+        """<!DOCTYPE html PUBLIC "-//W3C//DTD HTML 4.0 Transitional//EN" "http://www.w3.org/TR/REC-html40/loose.dtd">\n"""
+        """<html jmb-name="/page" jmb-data=\'{"actions":{"select":true},"changesUrl":true,"state":{},"url":"/page"}\'><body>"""
+        """<a>$jmb.component('a',{'rid':1}).display()</a>"""
+        """<a>$jmb.component('a.1',{'rid':1}).display()</a>"""
+        """<a>$jmb.component_reset('a',{'name':'x\\"y'}).display()</a>"""
+        """<a>$jmb.call('select',{'rid':2})</a>"""
+        """<a>$jmb.call('select',{'rid':2})</a>"""
+        """</body></html>"""
+    ).encode("utf-8")
+
+
+def test_build_response_releases_rendered_html(app, jmb: "Jembe"):
+    class A(Component):
+        def display(self) -> "DisplayResponse":
+            return "<div>a</div>"
+
+    @jmb.page("page", Component.Config(components=dict(a=A, b=A)))
+    class Page(Component):
+        def display(self) -> "DisplayResponse":
+            return self.render_template_string(
+                "<html><body>{{component('a')}}</body></html>"
+            )
+
+    with app.test_request_context("/page"):
+        processor = get_processor()
+        processor.process_request()
+        # rendered but not displayed by the page
+        processor.renderers["/page/b"] = processor.renderers["/page/a"]
+        processor.components["/page/b"] = processor.components["/page/a"]
+        response = processor.build_response()
+        assert b'<div jmb-name="/page/a"' in response
+        assert processor.renderers["/page"].html is None
+        assert processor.renderers["/page/a"].html is None
+        # fragment without placeholder is never parsed
+        assert processor.renderers["/page/b"].html == "<div>a</div>"
+        assert processor.build_response() is response
+
+
+def test_conditional_get_request(jmb, client):
+    displayed = []
+    versions = dict(page="1")
+
+    class A(Component):
+        def __init__(self, id: int = 0):
+            super().__init__()
+
+        def etag(self):
+            return self.state_etag("user")
+
+        def display(self) -> "DisplayResponse":
+            displayed.append(self.exec_name)
+            return "<div>a {}</div>".format(self.state.id)
+
+    @jmb.page("page", Component.Config(components=dict(a=A)))
+    class Page(Component):
+        def etag(self):
+            return versions["page"]
+
+        def display(self) -> "DisplayResponse":
+            displayed.append(self.exec_name)
+            return self.render_template_string(
+                "<html><body>{{component('a')}}</body></html>"
+            )
+
+    r = client.get("/page/a")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert displayed == ["/page/a", "/page"]
+
+    displayed.clear()
+    r = client.get("/page/a", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["ETag"] == etag
+    assert r.data == b""
+    assert displayed == []
+
+    # page without component a has different etag
+    r = client.get("/page", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+    # component version changed
+    versions["page"] = "2"
+    displayed.clear()
+    r = client.get("/page/a", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert displayed == ["/page/a", "/page"]
@@ -0,0 +1,312 @@
+import hashlib
+import time
+from io import BytesIO, StringIO
+import pytest
+from jembe import DiskStorage, Storage
+
+
+def test_disk_storage_streams_file_objects(tmp_path):
+    content = b"0123456789" * 100
+    storage = DiskStorage(
+        "public", str(tmp_path), buffer_size=64, hash_algorithm="sha256"
+    )
+
+    file = storage.store_file(BytesIO(content), "docs", "file.bin")
+    assert file.path == "docs/file.bin"
+    assert file.size == len(content)
+    assert file.digest == hashlib.sha256(content).hexdigest()
+    assert (tmp_path / "docs" / "file.bin").read_bytes() == content
+
+    text = "čćž\n" * 50
+    file = storage.store_file(StringIO(text), "docs", "file.txt")
+    assert file.size == len(text.encode("utf-8"))
+    assert file.digest == hashlib.sha256(text.encode("utf-8")).hexdigest()
+    assert (tmp_path / "docs" / "file.txt").read_text(encoding="utf-8") == text
+
+    # copy between disk files without hash is done by the kernel
+    other = DiskStorage("other", str(tmp_path / "other"), buffer_size=64)
+    with (tmp_path / "docs" / "file.bin").open("rb") as src:
+        copied = other.store_file(src, "", "copied.bin")
+    assert copied.size == len(content)
+    assert copied.digest is None
+    assert (tmp_path / "other" / "copied.bin").read_bytes() == content
+
+    copied = storage.store_file(copied, "copies")
+    assert copied.path == "copies/copied.bin"
+    assert copied.digest == hashlib.sha256(content).hexdigest()
+
+
+def test_disk_storage_move_and_link(app_ctx, tmp_path):
+    temp = DiskStorage("temp", str(tmp_path / "temp"))
+    private = DiskStorage(
+        "private",
+        str(tmp_path / "private"),
+        copy_policy=DiskStorage.CopyPolicy.HARDLINK,
+    )
+    file = temp.store_file(BytesIO(b"content"), "UPLOADS/1", "file.txt")
+    inode = (tmp_path / "temp" / "UPLOADS" / "1" / "file.txt").stat().st_ino
+
+    moved = file.move_to(private, "docs")
+    assert moved.path == "docs/file.txt"
+    assert moved.size == len(b"content")
+    assert (tmp_path / "private" / "docs" / "file.txt").stat().st_ino == inode
+    assert not (tmp_path / "temp" / "UPLOADS").exists()
+
+    # hard link within the same device
+    linked = moved.copy_to(private, "links")
+    assert (tmp_path / "private" / "links" / "file.txt").stat().st_ino == inode
+    assert (tmp_path / "private" / "docs" / "file.txt").stat().st_nlink == 2
+    assert linked.size == len(b"content")
+
+    # reflink falls back to copy when it is not supported by file system
+    reflink = DiskStorage(
+        "reflink",
+        str(tmp_path / "reflink"),
+        copy_policy=DiskStorage.CopyPolicy.REFLINK,
+    )
+    cloned = moved.copy_to(reflink, "docs")
+    assert (tmp_path / "reflink" / "docs" / "file.txt").read_bytes() == b"content"
+    assert cloned.size == len(b"content")
+
+
+def test_disk_storage_keeps_files_with_the_same_name(tmp_path):
+    temp = DiskStorage("temp", str(tmp_path / "temp"))
+    storage = DiskStorage("public", str(tmp_path / "public"))
+
+    first = storage.store_file(BytesIO(b"first"), "docs", "file.txt")
+    second = temp.store_file(BytesIO(b"second"), "UPLOADS", "file.txt")
+    moved = second.move_to(storage, "docs")
+    assert moved.path != first.path
+    assert (tmp_path / "public" / first.path).read_bytes() == b"first"
+    assert (tmp_path / "public" / moved.path).read_bytes() == b"second"
+
+
+def test_sharded_disk_storage(app_ctx, tmp_path):
+    storage = DiskStorage("public", str(tmp_path), shard_levels=2)
+    file = storage.store_file(BytesIO(b"content"), "docs", "file.txt")
+    assert file.path == "docs/file.txt"
+    disk_files = list((tmp_path / "docs").glob("_*/_*/file.txt"))
+    assert len(disk_files) == 1
+    assert disk_files[0].read_bytes() == b"content"
+
+    assert storage.exists("docs/file.txt")
+    assert storage.exists("docs")
+    assert storage.isfile("docs/file.txt")
+    assert storage.listdir("docs") == ["file.txt"]
+    with file.open("rb") as f:
+        assert f.read() == b"content"
+    same_name = storage.store_file(BytesIO(b"other"), "docs", "file.txt")
+    assert same_name.path != file.path
+    assert sorted(storage.listdir("docs")) == sorted(["file.txt", same_name.basename])
+
+    # two hex character subdirs are not mistaken for hash prefix dirs
+    nested = storage.store_file(BytesIO(b"nested"), "docs/ab", "nested.txt")
+    assert sorted(storage.listdir("docs")) == sorted(
+        ["ab", "file.txt", same_name.basename]
+    )
+    assert storage.listdir("docs/ab") == ["nested.txt"]
+    with pytest.raises(ValueError):
+        storage.store_file(BytesIO(b"content"), "docs/_ab", "file.txt")
+
+    file.remove()
+    same_name.remove()
+    nested.remove()
+    assert not (tmp_path / "docs").exists()
+
+
+def test_disk_storage_migrate_layout(app_ctx, tmp_path):
+    flat = DiskStorage("public", str(tmp_path))
+    for i in range(5):
+        flat.store_file(BytesIO(b"content"), "docs", "file{}.txt".format(i))
+
+    sharded = DiskStorage("public", str(tmp_path), shard_levels=2)
+    assert not sharded.exists("docs/file0.txt")
+    assert sharded.migrate_layout(dry_run=True) == dict(files=5, moved=5, conflicts=0)
+    assert sharded.migrate_layout() == dict(files=5, moved=5, conflicts=0)
+    assert sharded.migrate_layout() == dict(files=5, moved=0, conflicts=0)
+    names = ["file{}.txt".format(i) for i in range(5)]
+    assert sorted(sharded.listdir("docs")) == names
+
+    # back to one level
+    resharded = DiskStorage("public", str(tmp_path), shard_levels=1)
+    assert resharded.migrate_layout() == dict(files=5, moved=5, conflicts=0)
+    assert len(list((tmp_path / "docs").glob("*/*.txt"))) == 5
+    assert not list((tmp_path / "docs").glob("*/*/*.txt"))
+    with resharded.open("docs/file3.txt", "rb") as f:
+        assert f.read() == b"content"
+
+
+def test_dedup_disk_storage(app_ctx, tmp_path):
+    from jembe import DedupDiskStorage
+
+    temp = DiskStorage("temp", str(tmp_path / "temp"))
+    storage = DedupDiskStorage("private", str(tmp_path / "private"))
+    digest = hashlib.sha256(b"content").hexdigest()
+    blob = tmp_path / "private" / "BLOBS" / digest[:2] / digest[2:4] / digest
+
+    first = storage.store_file(BytesIO(b"content"), "docs", "first.txt")
+    assert first.digest == digest
+    second = temp.store_file(BytesIO(b"content"), "UPLOADS/1", "second.txt")
+    second = second.move_to(storage, "docs")
+    third = first.copy_to(storage, "other")
+    other = storage.store_file(BytesIO(b"other"), "docs", "other.txt")
+
+    assert blob.stat().st_nlink == 4
+    for file in (first, second, third):
+        assert (tmp_path / "private" / file.path).stat().st_ino == blob.stat().st_ino
+    assert not (tmp_path / "temp" / "UPLOADS").exists()
+    assert not list((tmp_path / "private" / "BLOBS" / "tmp").iterdir())
+
+    # copy on write
+    with storage.open(third.path, "a") as f:
+        f.write("d")
+    with third.open("rb") as f:
+        assert f.read() == b"contentd"
+    with first.open("rb") as f:
+        assert f.read() == b"content"
+    assert blob.stat().st_nlink == 3
+
+    # cache versions are stored and released as other files
+    storage.store_cache_version_of_file(first.path, "copy", BytesIO(b"other"))
+    first.remove()
+    second.remove()
+    assert not blob.exists()
+    other.remove()
+    third.remove()
+    assert not list((tmp_path / "private" / "BLOBS").glob("*/*/*"))
+    assert storage.collect_garbage() == dict(blobs=0, bytes_reclaimed=0)
+
+
+def test_send_file(app, tmp_path, monkeypatch):
+    from jembe import Jembe
+
+    public = DiskStorage("public", str(tmp_path / "public"))
+    private = DiskStorage("private", str(tmp_path / "private"), Storage.Type.PRIVATE)
+    accel = DiskStorage("accel", str(tmp_path / "accel"), accel_redirect="/internal/")
+    temp = DiskStorage("temp", str(tmp_path / "temp"), Storage.Type.TEMP)
+    Jembe(app, storages=[public, private, accel, temp])
+    client = app.test_client()
+    content = b"0123456789"
+    with app.test_request_context("/"):
+        url = public.store_file(BytesIO(content), "docs", "file.txt").url
+        private_url = private.store_file(BytesIO(content), "docs", "file.txt").url
+        accel_url = accel.store_file(BytesIO(content), "docs", "a b.txt").url
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Processor is used to send file")
+
+    monkeypatch.setattr("jembe.app.Processor", fail)
+
+    assert "?v=" in url
+    r = client.get(url)
+    assert r.status_code == 200
+    assert r.data == content
+    assert r.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    # unversioned and stale urls are revalidated
+    unversioned_url = url.split("?")[0]
+    r = client.get(unversioned_url)
+    assert r.data == content
+    assert r.headers["Cache-Control"] == "no-cache, public"
+    r = client.get(unversioned_url + "?v=stale")
+    assert r.headers["Cache-Control"] == "no-cache, public"
+    etag, weak = r.get_etag()
+    assert etag and not weak
+    assert r.last_modified is not None
+
+    r = client.get(url, headers={"Range": "bytes=2-4"})
+    assert r.status_code == 206
+    assert r.data == b"234"
+    assert r.headers["Content-Range"] == "bytes 2-4/10"
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # private files are served only when access is granted
+    assert client.get(private_url).status_code == 404
+    with client.session_transaction() as session:
+        session["jembe_files_access_granted"] = {"private": ["docs/file.txt"]}
+    r = client.get(private_url)
+    assert r.status_code == 200
+    assert r.headers["Cache-Control"] == "no-cache, private"
+
+    r = client.get(accel_url)
+    assert r.status_code == 200
+    assert r.headers["X-Accel-Redirect"] == "/internal/docs/a_b.txt"
+    assert r.data == b""
+    assert client.get(unversioned_url + "x").status_code == 404
+
+    # path reused by new file gets new url
+    with app.test_request_context("/"):
+        public.remove("docs/file.txt")
+        new_file = public.store_file(BytesIO(b"new content"), "docs", "file.txt")
+        assert new_file.path == "docs/file.txt"
+        new_url = new_file.url
+    assert new_url != url
+    r = client.get(new_url)
+    assert r.data == b"new content"
+    assert r.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+
+
+def _upper_cache_version(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fdst.write(fsrc.read().upper())
+
+
+def _failing_cache_version(src, dst):
+    raise ValueError("corrupt file")
+
+
+def test_generate_cache_versions(app, tmp_path):
+    from jembe import Jembe
+
+    public = DiskStorage("public", str(tmp_path / "public"))
+    temp = DiskStorage("temp", str(tmp_path / "temp"), Storage.Type.TEMP)
+    jmb = Jembe(app, storages=[public, temp])
+    jmb.cache_version("upper", placeholder=lambda f: f.get_cache_version("tiny"))(
+        _upper_cache_version
+    )
+    jmb.cache_version("inline")(_upper_cache_version)
+    jmb.cache_version("failing")(_failing_cache_version)
+
+    with app.test_request_context("/"):
+        file = public.store_file(BytesIO(b"content"), "docs", "file.txt")
+        assert file.get_cache_version("tiny").path == "CACHE/docs/file.txt/tiny.txt"
+
+        # generated in process pool while placeholder is used
+        assert file.get_cache_version("upper").path == "CACHE/docs/file.txt/tiny.txt"
+        # generation is already started
+        assert file.get_cache_version("upper").path == "CACHE/docs/file.txt/tiny.txt"
+        assert len(jmb.cache_versions._futures) == 1
+        jmb.cache_versions.wait(30)
+        upper = file.get_cache_version("upper")
+        assert upper.path == "CACHE/docs/file.txt/upper.txt"
+        with upper.open("rb") as f:
+            assert f.read() == b"CONTENT"
+        assert sorted(public.listdir("CACHE/docs/file.txt")) == ["upper.txt"]
+
+        # failed generation is not started again until lock timeout
+        assert file.get_cache_version("failing") == file
+        jmb.cache_versions.wait(30)
+        futures = list(jmb.cache_versions._futures)
+        assert isinstance(futures[-1].exception(), ValueError)
+        assert file.get_cache_version("failing") == file
+        assert jmb.cache_versions._futures == futures
+        # markers are kept outside of served CACHE dir
+        assert sorted(public.listdir("CACHE/docs/file.txt")) == ["upper.txt"]
+        failed = ".CACHE_STATE/CACHE/docs/file.txt/failing.txt.failed"
+        with public.open(failed, "rb") as f:
+            assert f.read() == b""
+        assert not public.can_access_file(failed)
+        assert not public.can_access_file("CACHE/../{}".format(failed))
+        jmb.cache_versions.lock_timeout = 0
+        time.sleep(0.01)
+        assert file.get_cache_version("failing") == file
+        assert len(jmb.cache_versions._futures) == 1
+        assert jmb.cache_versions._futures[0] not in futures
+        jmb.cache_versions.wait(30)
+
+        jmb.cache_versions.workers = 0
+        inline = file.get_cache_version("inline")
+        assert inline.path == "CACHE/docs/file.txt/inline.txt"
+        assert inline.exists()
+        # inline failure is logged and original is returned
+        assert file.get_cache_version("failing") == file
+    jmb.cache_versions.shutdown()
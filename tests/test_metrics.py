@@ -0,0 +1,200 @@
+from flask import json, request
+from jembe import Component, Jembe, action, listener
+from jembe.metrics import Counter, Histogram
+
+
+def test_metrics_exposition_format():
+    counter = Counter("c_total", "Counter.", ("name",))
+    counter.inc('a"b')
+    counter.inc('a"b', amount=2)
+    assert counter.expose() == (
+        "# HELP c_total Counter.\n# TYPE c_total counter\n" 'c_total{name="a\\"b"} 3'
+    )
+
+    histogram = Histogram("h", "Histogram.", buckets=(1, 5))
+    histogram.observe(0.5)
+    histogram.observe(3)
+    assert histogram.expose().splitlines()[2:] == [
+        'h_bucket{le="1"} 1',
+        'h_bucket{le="5"} 2',
+        'h_bucket{le="+Inf"} 2',
+        "h_sum 3.5",
+        "h_count 2",
+    ]
+
+
+def test_metrics_are_disabled_by_default(jmb, client):
+    assert jmb.metrics is None
+    assert client.get("/jembe/metrics").status_code == 404
+
+
+def test_metrics_component(app):
+    app.config["JEMBE_METRICS"] = True
+    app.config["JEMBE_METRICS_ACCESS"] = "local"
+    jmb = Jembe(app)
+
+    class Counter(Component):
+        def __init__(self, value: int = 0):
+            super().__init__()
+
+        @listener(event="increase")
+        def on_increase(self, event):
+            self.state.value += 1
+
+        def display(self):
+            return self.render_template_string("<div>{{value}}</div>")
+
+    @jmb.page("cpage", Component.Config(components=dict(counter=Counter)))
+    class CPage(Component):
+        @action
+        def increase(self):
+            self.emit("increase")
+
+        def display(self):
+            return self.render_template_string(
+                "<html><body>{{component('counter')}}</body></html>"
+            )
+
+    client = app.test_client()
+    r = client.get("/cpage")
+    assert r.status_code == 200
+    r = client.post(
+        "/cpage",
+        data=json.dumps(
+            dict(
+                components=[
+                    dict(execName="/cpage", state=dict()),
+                    dict(execName="/cpage/counter", state=dict(value=0)),
+                ],
+                commands=[
+                    dict(
+                        type="call",
+                        componentExecName="/cpage",
+                        actionName="increase",
+                        args=list(),
+                        kwargs=dict(),
+                    )
+                ],
+            )
+        ),
+        headers={"x-jembe": True},
+    )
+    assert r.status_code == 200
+
+    metrics = jmb.metrics
+    assert metrics.requests.get("http") == 1
+    assert metrics.requests.get("x-jembe") == 1
+    assert metrics.commands.get("CallActionCommand") == 1
+    assert metrics.commands.get("CallListenerCommand") == 1
+    assert metrics.render_duration.get("/cpage/counter") == 2
+    assert metrics.emit_fan_out.get("increase") == 1
+    assert metrics.composition_duration.get("http") == 1
+    assert metrics.response_bytes.get("x-jembe") == 1
+
+    r = client.get("/jembe/metrics")
+    assert r.status_code == 200
+    assert r.content_type.startswith("text/plain; version=0.0.4")
+    body = r.data.decode()
+    assert 'jembe_requests_total{type="http"} 1' in body
+    assert 'jembe_render_duration_seconds_count{component="/cpage/counter"} 2' in body
+    assert 'jembe_emit_fan_out_bucket{event="increase",le="1"} 1' in body
+
+
+def test_metrics_access(app):
+    app.config["JEMBE_METRICS"] = True
+    jmb = Jembe(app)
+    client = app.test_client()
+    assert client.get("/jembe/metrics").status_code == 403
+
+    jmb.metrics_access = "local"
+    assert client.get("/jembe/metrics").status_code == 200
+    r = client.get("/jembe/metrics", environ_base={"REMOTE_ADDR": "10.0.0.1"})
+    assert r.status_code == 403
+
+    jmb.metrics_access = lambda: request.headers.get("Authorization") == "token"
+    assert client.get("/jembe/metrics").status_code == 403
+    r = client.get("/jembe/metrics", headers={"Authorization": "token"})
+    assert r.status_code == 200
+
+
+def test_slow_request_log(app, caplog):
+    import time
+
+    app.config["JEMBE_SLOW_REQUEST_THRESHOLD"] = 10
+    jmb = Jembe(app)
+    assert jmb.metrics is None
+
+    class Slow(Component):
+        def display(self):
+            time.sleep(0.02)
+            return "<div>slow</div>"
+
+    class Fast(Component):
+        def display(self):
+            return "<div>fast</div>"
+
+    @jmb.page("page", Component.Config(components=dict(slow=Slow, fast=Fast)))
+    class Page(Component):
+        def display(self):
+            return self.render_template_string(
+                "<html><body>{{component('fast')}}{{component('slow')}}</body></html>"
+            )
+
+    r = app.test_client().get("/page/fast")
+    assert r.status_code == 200
+    slow_logs = [r for r in caplog.records if r.msg.startswith("Jembe slow request")]
+    assert len(slow_logs) == 1
+    log = json.loads(slow_logs[0].args[0])
+    assert log["path"] == "/page/fast"
+    assert log["type"] == "http"
+    assert log["duration_ms"] >= 20
+    assert log["renders"] == 3
+    assert log["commands"]["CallDisplayCommand"] >= 3
+    assert log["response_bytes"] == len(r.data)
+    assert log["components"][0]["component"] == "/page/slow"
+    assert log["components"][0]["render_ms"] >= 20
+
+    caplog.clear()
+    jmb.slow_request_threshold = 1000
+    assert app.test_client().get("/page").status_code == 200
+    assert not [r for r in caplog.records if r.msg.startswith("Jembe slow request")]
+
+
+def test_memory_profile(app, caplog):
+    import logging
+    import tracemalloc
+
+    was_tracing = tracemalloc.is_tracing()
+    app.config["JEMBE_MEMORY_PROFILE"] = True
+    jmb = Jembe(app)
+    assert tracemalloc.is_tracing()
+
+    class Big(Component):
+        def __init__(self):
+            self.blob = "x" * 1024 * 1024
+            super().__init__()
+
+        def display(self):
+            return "<div>big</div>"
+
+    @jmb.page("page", Component.Config(components=dict(big=Big)))
+    class Page(Component):
+        def display(self):
+            return self.render_template_string(
+                "<html><body>{{component('big')}}</body></html>"
+            )
+
+    try:
+        with caplog.at_level(logging.INFO):
+            r = app.test_client().get("/page")
+        assert r.status_code == 200
+        logs = [r for r in caplog.records if r.msg.startswith("Jembe request profile")]
+        assert len(logs) == 1
+        memory = json.loads(logs[0].args[0])["memory"]
+        assert memory["components"][0]["component"] == "/page/big"
+        assert memory["components"][0]["peak_bytes"] >= 1024 * 1024
+        assert "allocated_bytes" in memory["composition"]
+        assert memory["allocations"]
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
@@ -216,3 +216,51 @@ def test_counter_on_page(jmb, client):
 #     assert r.status_code == 404
 #     r = client.get("/simple_pageeeeee")
 #     assert r.status_code == 404
+
+
+def test_preload(app, jmb, client):
+    import gc
+
+    @jmb.page("hello", Component.Config(template="simple_page.html"))
+    class HelloPage(Component):
+        @property
+        def greeting(self):
+            return "hello"
+
+    try:
+        report = jmb.preload()
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+    assert set(report["pages"].keys()) == {"jembe", "hello"}
+    assert report["templates"] >= 1
+    assert "simple_page.html" in [name for _, name in app.jinja_env.cache.keys()]
+    assert report["memory"] is None or report["memory"]["private"] > 0
+
+    r = client.get("/hello")
+    assert r.status_code == 200
+
+
+def test_compile_templates(app, jmb, tmp_path):
+    @jmb.page("hello", Component.Config(template="simple_page.html"))
+    class HelloPage(Component):
+        pass
+
+    @jmb.page("custom")
+    class CustomDisplayPage(Component):
+        def display(self):
+            return self.render_template_string("<html></html>")
+
+    jmb.set_template_bytecode_cache(str(tmp_path))
+    templates, missing = jmb.compile_templates()
+    assert templates["/hello"] == "simple_page.html"
+    assert "/custom" not in templates
+    assert missing == []
+    assert len(list(tmp_path.iterdir())) == len(set(templates.values()))
+
+    @jmb.page("missing")
+    class MissingTemplatePage(Component):
+        pass
+
+    templates, missing = jmb.compile_templates()
+    assert missing == ["/missing"]
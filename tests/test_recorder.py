@@ -0,0 +1,89 @@
+import os
+from flask import json
+from jembe import Component, Jembe, action
+from jembe.recorder import read_records, redact, replay
+
+
+def create_page(jmb):
+    class Counter(Component):
+        def __init__(self, value: int = 0, title: str = "counter"):
+            super().__init__()
+
+        @action
+        def increase(self):
+            self.state.value += 1
+
+        def display(self):
+            return self.render_template_string("<div>{{value}}</div>")
+
+    @jmb.page("cpage", Component.Config(components=dict(c=Counter)))
+    class CPage(Component):
+        def display(self):
+            return self.render_template_string("<html>{{component('c')}}</html>")
+
+
+def x_jembe_data(title: str) -> str:
+    return json.dumps(
+        dict(
+            components=[
+                dict(execName="/cpage", state=dict()),
+                dict(execName="/cpage/c", state=dict(value=1, title=title)),
+            ],
+            commands=[
+                dict(
+                    type="call",
+                    componentExecName="/cpage/c",
+                    actionName="increase",
+                    args=list(),
+                    kwargs=dict(),
+                )
+            ],
+        )
+    )
+
+
+def test_redact():
+    assert redact(dict(a="secret", b=[1, "xy", None], c=True)) == dict(
+        a="xxxxxx", b=[1, "xx", None], c=True
+    )
+
+
+def test_record_and_replay(app, tmp_path):
+    app.config["JEMBE_REQUEST_RECORDER"] = str(tmp_path / "records.jsonl")
+    app.config["JEMBE_REQUEST_RECORDER_REDACT"] = True
+    jmb = Jembe(app)
+    create_page(jmb)
+    client = app.test_client()
+
+    assert client.get("/cpage/c").status_code == 200
+    for _ in range(3):
+        r = client.post(
+            "/cpage/c",
+            data=x_jembe_data("secret"),
+            headers={"x-jembe": True, "Cookie": "session=1"},
+        )
+        assert r.status_code == 200
+
+    process_file = "{}.{}".format(jmb.recorder.filename, os.getpid())
+    assert len(list(read_records(process_file))) == 3
+    # records of other worker process are merged by time
+    with open("{}.1".format(jmb.recorder.filename), "w") as f:
+        f.write(json.dumps(dict(time="2000-01-01T00:00:00+00:00", path="/")))
+    records = list(read_records(jmb.recorder.filename))
+    assert len(records) == 4
+    assert records.pop(0)["path"] == "/"
+    record = records[0]
+    assert record["path"] == "/cpage/c"
+    assert record["status"] == 200
+    assert record["commands"] == 1
+    assert record["response_size"] == len(r.data)
+    assert record["duration"] > 0
+    assert "Cookie" not in record["headers"]
+    assert record["data"]["components"][1]["state"] == dict(value=1, title="xxxxxx")
+
+    report = replay(app, records, repeat=2)
+    assert report["requests"] == 6
+    assert report["statuses"] == {"200": 6}
+    assert report["status_mismatches"] == 0
+    assert report["commands"]["total"] == 6
+    assert 0 < report["latency"]["p50"] <= report["latency"]["max"]
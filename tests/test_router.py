@@ -0,0 +1,216 @@
+from typing import TYPE_CHECKING
+import pytest
+from flask import json
+from jembe import Component, Jembe, action, page_url
+from jembe.component_config import UrlPath
+from jembe.router import ComponentRouter
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+
+def register_pages(jmb: "Jembe"):
+    class Counter(Component):
+        def __init__(self, value: int = 0):
+            super().__init__()
+
+        @action
+        def increase(self):
+            self.state.value += 1
+
+        def display(self):
+            return self.render_template_string(
+                """<div>Count: {{value}}</div> <a jmb:click="increase()">increase</a>"""
+            )
+
+    class Doc(Component):
+        def __init__(self, path: UrlPath):
+            super().__init__()
+
+        @classmethod
+        def dump_init_param(cls, name, value):
+            if name == "path":
+                return str(value)
+            return super().dump_init_param(name, value)
+
+        @classmethod
+        def load_init_param(cls, config, name, value):
+            if name == "path":
+                return UrlPath(value)
+            return super().load_init_param(config, name, value)
+
+        def display(self):
+            return self.render_template_string("<div>{{path}}</div>")
+
+    class Folder(Component):
+        def __init__(self, id: int):
+            super().__init__()
+
+        def display(self):
+            return self.render_template_string("<div>{{id}}{{component('doc')}}</div>")
+
+    @jmb.page(
+        "cpage",
+        Component.Config(
+            components=dict(
+                counter=Counter,
+                folder=(Folder, Component.Config(components=dict(doc=Doc))),
+            )
+        ),
+    )
+    class CPage(Component):
+        def display(self):
+            return self.render_template_string(
+                """<html><head></head><body>{{component("counter")}}</body></html>"""
+            )
+
+
+@pytest.fixture
+def router_app(app: "Flask"):
+    app.config["JEMBE_COMPONENT_ROUTER"] = True
+    jmb = Jembe(app)
+    register_pages(jmb)
+    yield app
+
+
+def test_router_registers_single_rule_per_page(router_app: "Flask"):
+    endpoints = [r.endpoint for r in router_app.url_map.iter_rules()]
+    assert "cpage.{}".format(ComponentRouter.ENDPOINT) in endpoints
+    assert "cpage./cpage/counter" not in endpoints
+    assert "jembe./jembe/file" not in endpoints
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/cpage",
+        "/cpage.1",
+        "/cpage/counter",
+        "/cpage/counter.a",
+        "/cpage/folder/1/doc/a",
+        "/cpage.2/folder.3/4/doc/a/b/c.txt",
+    ],
+)
+def test_router_responses_match_url_rules(app: "Flask", jmb: "Jembe", url: str):
+    register_pages(jmb)
+    expected = app.test_client().get(url)
+    assert expected.status_code == 200
+
+    from tests.conftest import Flask
+
+    router_app = Flask("flask_test", root_path=app.root_path)
+    router_app.config["JEMBE_COMPONENT_ROUTER"] = True
+    register_pages(Jembe(router_app))
+    r = router_app.test_client().get(url)
+    assert r.status_code == 200
+    assert r.data == expected.data
+
+
+@pytest.mark.parametrize(
+    "url", ["/cpagex", "/cpage/", "/cpage/unknown", "/cpage/folder/x/doc/a"]
+)
+def test_router_not_found(router_app: "Flask", url: str):
+    assert router_app.test_client().get(url).status_code == 404
+
+
+def test_router_urls_and_ajax(router_app: "Flask"):
+    client = router_app.test_client()
+    with router_app.test_request_context("/"):
+        assert page_url("cpage") == "/cpage"
+        assert page_url("cpage.1/counter") == "/cpage.1/counter"
+        assert (
+            page_url("cpage/folder/doc", [{}, {"id": 1}, {"path": "a/b c"}])
+            == "/cpage/folder/1/doc/a/b%20c"
+        )
+
+    r = client.post(
+        "/cpage/counter",
+        data=json.dumps(
+            dict(
+                components=[
+                    dict(execName="/cpage", state=dict()),
+                    dict(execName="/cpage/counter", state=dict(value=0)),
+                ],
+                commands=[
+                    dict(
+                        type="call",
+                        componentExecName="/cpage/counter",
+                        actionName="increase",
+                        args=list(),
+                        kwargs=dict(),
+                    )
+                ],
+            )
+        ),
+        headers={"x-jembe": True},
+    )
+    assert r.status_code == 200
+    ajax_response_data = json.loads(r.data)
+    assert ajax_response_data[0]["state"] == {"value": 1}
+    assert ajax_response_data[0]["url"] == "/cpage/counter"
+
+
+def test_lazy_components_are_registred_on_first_use(app: "Flask"):
+    app.config["JEMBE_LAZY_COMPONENTS"] = True
+    jmb = Jembe(app)
+    register_pages(jmb)
+    jmb.add_page("broken", "tests.not_existing_module.Page")
+
+    assert jmb.router is not None
+    assert jmb.components_configs == {}
+    assert jmb.pages_startup_time == {}
+
+    r = app.test_client().get("/cpage/counter")
+    assert r.status_code == 200
+    assert b"Count: 0" in r.data
+    assert "/cpage/counter" in jmb.components_configs
+    assert "/jembe" not in jmb.components_configs
+    assert list(jmb.pages_startup_time.keys()) == ["cpage"]
+
+    with pytest.raises(ValueError):
+        jmb.warmup()
+    del jmb._lazy_pages["broken"]
+    assert set(jmb.warmup().keys()) == {"cpage", "jembe"}
+    assert "/jembe/file" in jmb.components_configs
+
+
+def test_lazy_components_are_registred_on_lookup(app: "Flask"):
+    app.config["JEMBE_LAZY_COMPONENTS"] = True
+    jmb = Jembe(app)
+    register_pages(jmb)
+
+    @jmb.page("links")
+    class Links(Component):
+        def display(self):
+            return self.render_template_string(
+                "<html><body>"
+                "{% if component('/cpage').is_accessible %}cpage link{% endif %}"
+                "</body></html>"
+            )
+
+    r = app.test_client().get("/links")
+    assert r.status_code == 200
+    assert b"cpage link" in r.data
+    assert "/cpage/folder/doc" in jmb.components_configs
+
+
+def test_lazy_page_registration_is_rolled_back_on_error(app: "Flask"):
+    app.config["JEMBE_LAZY_COMPONENTS"] = True
+    jmb = Jembe(app)
+    jmb.add_page(
+        "broken",
+        (
+            Component,
+            Component.Config(
+                components=dict(bad="tests.not_existing_module.Component")
+            ),
+        ),
+    )
+    assert jmb.router is not None
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            jmb.warmup()
+        assert "/broken" not in jmb.components_configs
+        assert "broken" not in jmb.router.pages
+        assert "broken" in jmb._lazy_pages
@@ -1,4 +1,6 @@
 from io import BytesIO
+from typing import Optional
+from jembe.files import File
 from flask import json
 
 
@@ -43,3 +45,243 @@ def test_upload_files(jmb, client):
 
     rd = json.loads(r.data)
     assert rd["files"]["uploadId1"][0]["path"] != rd["files"]["uploadId2"][0]["path"]
+
+
+def test_upload_file_in_chunks(jmb, client):
+    from jembe import Component
+
+    @jmb.page("page")
+    class Page(Component):
+        def __init__(self, file: Optional[File] = None):
+            super().__init__()
+
+        def display(self):
+            content = self.state.file.open("rb").read() if self.state.file else b""
+            return self.render_template_string(
+                "<html><body>{{content}}</body></html>", content=content.decode()
+            )
+
+    content = b"0123456789" * 3
+
+    def upload_chunk(start, end, upload_id=None, data=None):
+        headers = {
+            "x-jembe": "upload",
+            "X-Jembe-Upload-File": "uploadId1",
+            "X-Jembe-Upload-Filename": "big%20file.txt",
+            "Content-Range": "bytes {}-{}/{}".format(start, end - 1, len(content))
+            if start is not None
+            else "bytes */{}".format(len(content)),
+        }
+        if upload_id is not None:
+            headers["X-Jembe-Upload-Id"] = upload_id
+        return client.post(
+            "/jembe/upload_files",
+            data=content[start:end] if data is None else data,
+            headers=headers,
+        )
+
+    r = upload_chunk(0, 10)
+    assert r.status_code == 200
+    rd = json.loads(r.data)
+    upload_id = rd["fileUploadResponseId"]
+    assert upload_id is not None
+    assert rd["offset"] == 10
+    assert rd["files"] == {}
+
+    # chunk out of order is rejected with received offset
+    r = upload_chunk(20, 30, upload_id)
+    assert r.status_code == 409
+    assert json.loads(r.data)["offset"] == 10
+
+    # resume interrupted upload
+    r = upload_chunk(None, None, upload_id, data=b"")
+    assert r.status_code == 200
+    assert json.loads(r.data)["offset"] == 10
+
+    assert upload_chunk(10, 20, upload_id).status_code == 200
+    r = upload_chunk(20, 30, upload_id)
+    assert r.status_code == 200
+    rd = json.loads(r.data)
+    assert rd["offset"] == 30
+    assert rd["files"] == dict(
+        uploadId1=[
+            dict(path="UPLOADS/{}/big_file.txt".format(upload_id), storage="temp")
+        ]
+    )
+
+    # unknown upload
+    assert upload_chunk(0, 10, "unknown").status_code == 404
+    # upload of other session
+    r = client.application.test_client().post(
+        "/jembe/upload_files",
+        data=content[0:10],
+        headers={
+            "x-jembe": "upload",
+            "X-Jembe-Upload-File": "uploadId2",
+            "X-Jembe-Upload-Id": upload_id,
+            "Content-Range": "bytes 0-9/30",
+        },
+    )
+    assert r.status_code == 404
+
+    # chunk must contain exactly the bytes of its range
+    r = upload_chunk(0, 10)
+    upload_id = json.loads(r.data)["fileUploadResponseId"]
+    assert upload_chunk(10, 20, upload_id, data=b"0123").status_code == 400
+    assert upload_chunk(10, 20, upload_id, data=content).status_code == 400
+    r = upload_chunk(None, None, upload_id, data=b"")
+    assert json.loads(r.data)["offset"] == 10
+    headers = {
+        "x-jembe": "upload",
+        "X-Jembe-Upload-File": "uploadId1",
+        "X-Jembe-Upload-Id": upload_id,
+        "Content-Range": "bytes 10-39/30",
+    }
+    r = client.post("/jembe/upload_files", data=b"0" * 30, headers=headers)
+    assert r.status_code == 400
+
+    # uploaded file is used by related x-jembe request
+    r = client.post(
+        "/page",
+        data=json.dumps(
+            dict(
+                components=[dict(execName="/page", state=dict(file=None))],
+                commands=[
+                    dict(
+                        type="init",
+                        componentExecName="/page",
+                        initParams=dict(file=rd["files"]["uploadId1"][0]),
+                        mergeExistingParams=True,
+                    )
+                ],
+            )
+        ),
+        headers={"x-jembe": "commands", "X-Jembe-Related-Upload": upload_id},
+    )
+    assert r.status_code == 200
+    assert content.decode() in json.loads(r.data)[0]["dom"]
+
+
+def test_upload_files_are_readable_from_request(app, jmb, client):
+    from flask import request
+
+    contents = []
+
+    @app.after_request
+    def read_files(response):
+        contents.extend(f.read() for f in request.files.values())
+        return response
+
+    r = client.post(
+        "/jembe/upload_files",
+        data=dict(uploadId1=(BytesIO(b"FILE1 CONTENT"), "file1.txt")),
+        headers={"x-jembe": "upload"},
+    )
+    assert r.status_code == 200
+    assert contents == [b"FILE1 CONTENT"]
+
+
+def test_upload_files_limits(app, client):
+    from jembe import Jembe, get_temp_storage
+
+    app.config["JEMBE_UPLOAD_MAX_FILE_SIZE"] = 10
+    app.config["JEMBE_UPLOAD_ALLOWED_EXTENSIONS"] = ["txt", ".PNG"]
+    app.config["JEMBE_UPLOAD_ALLOWED_CONTENT_TYPES"] = ["text/plain", "image/*"]
+    Jembe(app)
+
+    def upload(**files):
+        return client.post(
+            "/jembe/upload_files", data=files, headers={"x-jembe": "upload"}
+        )
+
+    r = upload(
+        uploadId1=(BytesIO(b"0123456789"), "file.txt", "text/plain"),
+        uploadId2=(BytesIO(b"PNG"), "image.png", "image/png"),
+    )
+    assert r.status_code == 200
+    rd = json.loads(r.data)
+    with app.app_context():
+        temp_storage = get_temp_storage()
+        upload_dir = "UPLOADS/{}".format(rd["fileUploadResponseId"])
+        assert temp_storage.exists("{}/image.png".format(upload_dir))
+        with temp_storage.open("{}/file.txt".format(upload_dir), "rb") as f:
+            assert f.read() == b"0123456789"
+
+    assert upload(uploadId1=(BytesIO(b"01234567890"), "file.txt")).status_code == 413
+    assert upload(uploadId1=(BytesIO(b"exe"), "file.exe")).status_code == 403
+    assert (
+        upload(uploadId1=(BytesIO(b"html"), "file.txt", "text/html")).status_code == 403
+    )
+    r = upload(
+        uploadId1=(BytesIO(b"0123"), "file.txt", "text/plain"),
+        uploadId2=(BytesIO(b"0123456789X"), "file.txt", "text/plain"),
+    )
+    assert r.status_code == 413
+
+
+def test_upload_chunk_limits(app, client):
+    from jembe import Jembe
+
+    app.config["JEMBE_UPLOAD_MAX_REQUEST_SIZE"] = 5
+    Jembe(app)
+
+    def upload_chunk(data, content_range):
+        return client.post(
+            "/jembe/upload_files",
+            data=data,
+            headers={
+                "x-jembe": "upload",
+                "X-Jembe-Upload-File": "uploadId1",
+                "Content-Range": content_range,
+            },
+        )
+
+    assert upload_chunk(b"01234", "bytes 0-4/20").status_code == 200
+    assert upload_chunk(b"0123456789", "bytes 0-9/20").status_code == 413
+
+
+def test_upload_files_after_form_is_parsed(app, jmb, client):
+    from flask import request
+    from jembe import get_temp_storage
+
+    forms = []
+    contents = []
+
+    @app.before_request
+    def read_form():
+        forms.append(request.form.to_dict())
+
+    @app.after_request
+    def read_files(response):
+        contents.extend(f.read() for f in request.files.values())
+        return response
+
+    r = client.post(
+        "/jembe/upload_files",
+        data=dict(
+            csrf_token="token",
+            uploadId1=(BytesIO(b"FILE1 CONTENT"), "file1.txt"),
+        ),
+        headers={"x-jembe": "upload"},
+    )
+    assert r.status_code == 200
+    assert forms == [dict(csrf_token="token")]
+    assert contents == [b"FILE1 CONTENT"]
+    rd = json.loads(r.data)
+    path = "UPLOADS/{}/file1.txt".format(rd["fileUploadResponseId"])
+    assert rd["files"]["uploadId1"] == [dict(path=path, storage="temp")]
+    with app.app_context():
+        with get_temp_storage().open(path, "rb") as f:
+            assert f.read() == b"FILE1 CONTENT"
+
+
+def test_upload_files_max_form_parts(jmb, client):
+    r = client.post(
+        "/jembe/upload_files",
+        data=dict(
+            uploadId1=(BytesIO(b"FILE1 CONTENT"), "file1.txt"),
+            **{"field{}".format(i): "value" for i in range(3000)}
+        ),
+        headers={"x-jembe": "upload"},
+    )
+    assert r.status_code == 413